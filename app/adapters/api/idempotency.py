@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from app.adapters.cache.ttl_cache import TTLCache
+from app.config import settings
+from app.domain.entities.idempotency import IdempotencyRecord
+from app.domain.interfaces.idempotency_repository import IdempotencyRepository
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENT_REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(operation: str, request: BaseModel) -> str:
+    """Identifies what was asked, so a key reused for a different request is rejected"""
+    return hashlib.sha256(f"{operation}:{request.model_dump_json()}".encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Runs a request at most once per idempotency key and replays its stored
+    response to retries. Completed records are kept in a per-worker LRU in
+    front of the repository, so most replays touch neither the database nor
+    the orders service. Only successful responses are stored; when the first
+    request fails its claim is released and a retry runs it again. A claim is
+    held for `claim_lease` seconds, and its record for `ttl` once completed,
+    so a claim left behind by a crashed worker frees its key soon.
+    """
+
+    def __init__(self, cache: TTLCache, ttl: float, purge_interval: float, claim_lease: float):
+        self.cache = cache
+        self.ttl = ttl
+        self.claim_lease = claim_lease
+        self.purge_interval = purge_interval
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self._last_purge = time.monotonic()
+
+    async def run(
+        self,
+        repository: IdempotencyRepository,
+        key: str,
+        fingerprint: str,
+        status_code: int,
+        operation: Callable[[], Awaitable[Any]],
+    ) -> Response:
+        record = self.cache.get(key)
+        if record is not None:
+            return self._replay(record, fingerprint)
+
+        # Retries reaching this worker while the first request runs wait for its response
+        async with self._key_lock(key):
+            record = self.cache.get(key)
+            if record is not None:
+                return self._replay(record, fingerprint)
+
+            now = datetime.utcnow()
+            record = await repository.claim(key, fingerprint, now + timedelta(seconds=self.claim_lease))
+            if record is not None:
+                self._remember(record, now)
+                return self._replay(record, fingerprint)
+
+            try:
+                result = await operation()
+            except BaseException:
+                await repository.release(key)
+                raise
+
+            completed_at = datetime.utcnow()
+            record = await repository.complete(
+                key, status_code, to_json(result).decode(), completed_at + timedelta(seconds=self.ttl)
+            )
+            self._remember(record, completed_at)
+
+        await self._purge_expired(repository)
+        return self._response(record)
+
+    def _replay(self, record: IdempotencyRecord, fingerprint: str) -> Response:
+        if record.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{IDEMPOTENCY_KEY_HEADER} was already used for a different request"
+            )
+        if not record.completed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with this {IDEMPOTENCY_KEY_HEADER} is still being processed"
+            )
+        response = self._response(record)
+        response.headers[IDEMPOTENT_REPLAY_HEADER] = "true"
+        return response
+
+    def _response(self, record: IdempotencyRecord) -> Response:
+        return Response(content=record.body, status_code=record.status_code, media_type="application/json")
+
+    def _remember(self, record: IdempotencyRecord, now: datetime) -> None:
+        # In-progress records are not cached: their outcome is still unknown
+        if record.completed:
+            self.cache.set(record.key, record, ttl=(record.expires_at - now).total_seconds())
+
+    @asynccontextmanager
+    async def _key_lock(self, key: str) -> AsyncIterator[None]:
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    async def _purge_expired(self, repository: IdempotencyRepository) -> None:
+        if time.monotonic() - self._last_purge >= self.purge_interval:
+            self._last_purge = time.monotonic()
+            await repository.purge_expired(datetime.utcnow())
+
+
+idempotency_store = IdempotencyStore(
+    cache=TTLCache(max_size=settings.IDEMPOTENCY_CACHE_MAX_SIZE, ttl=settings.IDEMPOTENCY_KEY_TTL),
+    ttl=settings.IDEMPOTENCY_KEY_TTL,
+    purge_interval=settings.IDEMPOTENCY_PURGE_INTERVAL,
+    claim_lease=settings.IDEMPOTENCY_CLAIM_LEASE,
+)
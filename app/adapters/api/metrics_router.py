@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.adapters.metrics.instruments import registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Request, repository and orders service metrics in the Prometheus text format"""
+    # Rendered on the event loop, which is the only thread updating the metrics
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,110 +1,393 @@
-from typing import Dict, List
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from pymongo.errors import DuplicateKeyError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
 
-from app.adapters.http.service_client import ServiceClient
-from app.adapters.models.sql.session import get_db
-from app.adapters.repositories import RepositoryType, get_payment_repository
+from app.adapters.api.idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    IdempotencyStore,
+    idempotency_store,
+    request_fingerprint,
+)
+from app.adapters.events.payment_events import Subscription, TooManySubscribers, payment_events
+from app.adapters.http.deadline import start_deadline
+from app.adapters.http.service_client import (
+    DeadlineExceeded,
+    OrdersServiceUnavailable,
+    ServiceClient,
+    service_client as app_service_client,
+)
+from app.adapters.models.sql.session import ReplicaSessionLocal, SessionLocal, get_db, get_replica_db
+from app.adapters.repositories import RepositoryType, get_idempotency_repository, get_payment_repository
+from app.adapters.workers.outbox_dispatcher import outbox_dispatcher
 from app.application.use_cases.payment_use_cases import PaymentUseCases
-from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus, QRCodeRequest
+from app.domain.interfaces.idempotency_repository import IdempotencyRepository
+from app.config import settings
+from app.domain.entities.payment import (
+    Payment,
+    PaymentCallback,
+    PaymentCallbackResult,
+    PaymentCreateResult,
+    PaymentDb,
+    PaymentFilter,
+    PaymentReport,
+    PaymentStatus,
+    QRCodeRequest,
+)
 
 router = APIRouter()
 
-# Helper function to get payment use cases with SQL repository
-def get_payment_use_cases(db: Session = Depends(get_db)) -> PaymentUseCases:
-    repository = get_payment_repository(RepositoryType.SQL, db)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_BATCH_SIZE = 1000
+REPOSITORY_TYPE = RepositoryType(settings.REPOSITORY_TYPE)
+
+# Streamed lines are sent in chunks of this many payments instead of one send per row
+STREAM_CHUNK_SIZE = 100
+
+# Read endpoints serialize the repository's payments straight to JSON bytes;
+# `response_model` is kept on those routes for the OpenAPI schema only.
+_payment_list_adapter = TypeAdapter(List[PaymentDb])
+
+# Helper function to get payment use cases with the configured repository
+def get_payment_use_cases(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    replica_db: Optional[AsyncSession] = Depends(get_replica_db)
+) -> PaymentUseCases:
+    # GET requests read from the replica, when there is one; other requests
+    # read what they are about to change from the primary
+    read_db = None
+    if replica_db is not None:
+        read_db = replica_db if request.method == "GET" else db
+    repository = get_payment_repository(REPOSITORY_TYPE, db, read_db)
     return PaymentUseCases(repository)
 
-# Helper function to get service client
+# Helper function to get the application-scoped service client
 def get_service_client() -> ServiceClient:
-    return ServiceClient()
+    return app_service_client
+
+# Starts the route's budget for calls to the orders service; must be async to set it in the route's context
+async def orders_service_deadline() -> None:
+    if settings.ORDERS_SERVICE_REQUEST_DEADLINE > 0:
+        start_deadline(settings.ORDERS_SERVICE_REQUEST_DEADLINE)
+
+# Helper function to get the idempotency records, sharing the request's session
+def get_idempotency_repository_for_request(db: AsyncSession = Depends(get_db)) -> IdempotencyRepository:
+    return get_idempotency_repository(REPOSITORY_TYPE, db)
+
+# Helper function to get the application-scoped idempotency store
+def get_idempotency_store() -> IdempotencyStore:
+    return idempotency_store
+
+async def _stream_payment_lines(filters: PaymentFilter) -> AsyncIterator[str]:
+    # The request-scoped session from get_db is closed before the body is
+    # streamed, so the stream owns a session for as long as it is iterated.
+    async with (ReplicaSessionLocal or SessionLocal)() as db:
+        use_cases = PaymentUseCases(get_payment_repository(REPOSITORY_TYPE, db))
+        lines = []
+        async for payment in use_cases.stream_payments(filters, STREAM_BATCH_SIZE):
+            lines.append(payment.model_dump_json())
+            if len(lines) == STREAM_CHUNK_SIZE:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+# Helper function to get an order, answering 503/504 when the orders service can't answer in time
+async def _get_order(service_client: ServiceClient, order_id: int) -> Optional[Dict]:
+    try:
+        return await service_client.get_order(order_id)
+    except OrdersServiceUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Orders service is unavailable, retry later"
+        )
+    except DeadlineExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Orders service did not answer in time for order ID {order_id}"
+        )
+
+async def _check_order_ids(order_ids: Set[int], service_client: ServiceClient) -> Tuple[Set[int], Set[int]]:
+    """The orders that don't exist, and those the orders service couldn't answer about in time"""
+    # Bounded so a large batch doesn't take every connection to the orders service
+    semaphore = asyncio.Semaphore(settings.PAYMENT_BATCH_ORDER_LOOKUP_CONCURRENCY)
+
+    async def exists(order_id: int) -> Optional[bool]:
+        async with semaphore:
+            try:
+                return bool(await service_client.get_order(order_id))
+            except (OrdersServiceUnavailable, DeadlineExceeded):
+                return None
+
+    ordered = list(order_ids)
+    found = await asyncio.gather(*(exists(order_id) for order_id in ordered))
+    missing = {order_id for order_id, order_exists in zip(ordered, found) if order_exists is False}
+    unavailable = {order_id for order_id, order_exists in zip(ordered, found) if order_exists is None}
+    return missing, unavailable
+
+def _is_newer(payment: PaymentDb, last: Optional[PaymentDb]) -> bool:
+    return last is None or (payment != last and payment.updated_at >= last.updated_at)
+
+async def _payment_event_stream(
+    subscription: Subscription, lookup: Callable[[PaymentUseCases], Awaitable[Optional[PaymentDb]]]
+) -> AsyncIterator[str]:
+    # Subscribed before the first read, so a change made in between is not missed.
+    # Only the first read opens a session; a waiting client holds no connection
+    # and costs no queries, since changes from other workers are published by
+    # the payment event poller.
+    async def read() -> Optional[PaymentDb]:
+        async with SessionLocal() as db:
+            return await lookup(PaymentUseCases(get_payment_repository(REPOSITORY_TYPE, db)))
+
+    try:
+        last = await read()
+        if last:
+            yield f"event: payment\ndata: {last.model_dump_json()}\n\n"
+        while True:
+            try:
+                payment = await asyncio.wait_for(subscription.get(), settings.PAYMENT_EVENTS_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if _is_newer(payment, last):
+                last = payment
+                yield f"event: payment\ndata: {payment.model_dump_json()}\n\n"
+    finally:
+        payment_events.unsubscribe(subscription)
+
+def _event_stream_response(key: Hashable, lookup: Callable) -> StreamingResponse:
+    try:
+        subscription = payment_events.subscribe(key)
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many clients are waiting for payment updates"
+        )
+    return StreamingResponse(
+        _payment_event_stream(subscription, lookup),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also released when the client leaves before the stream starts
+        background=BackgroundTask(payment_events.unsubscribe, subscription),
+    )
+
+def _json_response(content: bytes) -> Response:
+    return Response(content=content, media_type="application/json")
 
 @router.get("/", response_model=List[PaymentDb])
-def get_all_payments(use_cases: PaymentUseCases = Depends(get_payment_use_cases)):
-    return use_cases.get_all_payments()
+async def get_all_payments(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[int] = Query(None, description="Last payment ID of the previous page"),
+    filters: PaymentFilter = Depends(),
+    use_cases: PaymentUseCases = Depends(get_payment_use_cases)
+):
+    page = await use_cases.get_payments_page(limit, cursor, filters)
+    response = _json_response(_payment_list_adapter.dump_json(page.items))
+    if page.next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(page.next_cursor)
+    return response
+
+@router.get("/stream")
+async def stream_payments(filters: PaymentFilter = Depends()):
+    """
+    Stream every payment matching the filters as newline-delimited JSON.
+    Rows are read from a server-side cursor, so memory use does not grow with the table.
+    """
+    return StreamingResponse(_stream_payment_lines(filters), media_type="application/x-ndjson")
+
+@router.get("/report", response_model=PaymentReport)
+async def get_payment_report(
+    filters: PaymentFilter = Depends(),
+    use_cases: PaymentUseCases = Depends(get_payment_use_cases)
+):
+    """
+    Payment counts and amounts per status, and per UTC day and status, for
+    the payments matching the filters. Aggregated by the database, so only
+    the totals are read back, never the payments themselves.
+    """
+    return await use_cases.get_payment_report(filters)
 
 @router.get("/{payment_id}", response_model=PaymentDb)
-def get_payment(payment_id: int, use_cases: PaymentUseCases = Depends(get_payment_use_cases)):
-    payment = use_cases.get_payment_by_id(payment_id)
+async def get_payment(payment_id: int, use_cases: PaymentUseCases = Depends(get_payment_use_cases)):
+    payment = await use_cases.get_payment_by_id(payment_id)
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Payment with ID {payment_id} not found"
         )
-    return payment
+    return _json_response(payment.model_dump_json().encode())
 
 @router.get("/order/{order_id}", response_model=PaymentDb)
-def get_payment_by_order(order_id: int, use_cases: PaymentUseCases = Depends(get_payment_use_cases)):
-    payment = use_cases.get_payment_by_order_id(order_id)
+async def get_payment_by_order(order_id: int, use_cases: PaymentUseCases = Depends(get_payment_use_cases)):
+    payment = await use_cases.get_payment_by_order_id(order_id)
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Payment for order ID {order_id} not found"
         )
-    return payment
+    return _json_response(payment.model_dump_json().encode())
+
+@router.get("/{payment_id}/events")
+async def payment_events_by_id(payment_id: int, use_cases: PaymentUseCases = Depends(get_payment_use_cases)):
+    """
+    Server-sent events with the payment's current state, then one `payment`
+    event every time it changes, instead of polling GET /payments/{id}.
+    """
+    if not await use_cases.get_payment_by_id(payment_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Payment with ID {payment_id} not found"
+        )
+    return _event_stream_response(
+        ("payment", payment_id), lambda use_cases: use_cases.get_payment_by_id(payment_id)
+    )
+
+@router.get("/order/{order_id}/events")
+async def payment_events_by_order(order_id: int):
+    """
+    Server-sent events with the order's payment, then one `payment` event
+    every time it changes. The order doesn't need a payment yet: the first
+    event is then sent when one is created.
+    """
+    return _event_stream_response(
+        ("order", order_id), lambda use_cases: use_cases.get_payment_by_order_id(order_id)
+    )
 
-@router.post("/", response_model=PaymentDb, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=PaymentDb,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(orders_service_deadline)],
+)
 async def create_payment(
     payment: Payment, 
     use_cases: PaymentUseCases = Depends(get_payment_use_cases),
+    service_client: ServiceClient = Depends(get_service_client),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
+    idempotency_repository: IdempotencyRepository = Depends(get_idempotency_repository_for_request),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store)
+):
+    async def create() -> PaymentDb:
+        # Validate that the order exists
+        order = await _get_order(service_client, payment.order_id)
+        if not order:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Order with ID {payment.order_id} not found"
+            )
+        
+        # Check if payment already exists for this order
+        existing = await use_cases.get_payment_by_order_id(payment.order_id)
+        if existing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Payment for order ID {payment.order_id} already exists"
+            )
+        
+        try:
+            return await use_cases.create_payment(payment)
+        except (IntegrityError, DuplicateKeyError):
+            # Another request created it after the check above
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Payment for order ID {payment.order_id} already exists"
+            )
+
+    if idempotency_key is None:
+        return await create()
+    # Retries with the same key get the first response back without running it again
+    return await idempotency.run(
+        idempotency_repository,
+        idempotency_key,
+        request_fingerprint("create_payment", payment),
+        status.HTTP_201_CREATED,
+        create,
+    )
+
+@router.post("/batch", response_model=List[PaymentCreateResult], dependencies=[Depends(orders_service_deadline)])
+async def create_payments_batch(
+    payments: List[Payment] = Body(..., max_length=settings.PAYMENT_BATCH_MAX_SIZE),
+    use_cases: PaymentUseCases = Depends(get_payment_use_cases),
     service_client: ServiceClient = Depends(get_service_client)
 ):
-    # Validate that the order exists
-    order = await service_client.get_order(payment.order_id)
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Order with ID {payment.order_id} not found"
-        )
-    
-    # Check if payment already exists for this order
-    existing = use_cases.get_payment_by_order_id(payment.order_id)
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Payment for order ID {payment.order_id} already exists"
-        )
-    
-    return use_cases.create_payment(payment)
+    """
+    Create payments for many orders in one request, e.g. when onboarding migrated orders.
+    Orders are validated concurrently, existing payments are found with one
+    query and the new ones are inserted in one transaction. Each item reports
+    whether it was created, or skipped as order_not_found, order_unavailable
+    (the orders service was unreachable, failing or too slow; retry those), already_exists
+    or duplicate (an order repeated within the batch).
+    """
+    missing, unavailable = await _check_order_ids({payment.order_id for payment in payments}, service_client)
+    return await use_cases.create_payments(payments, missing, unavailable)
 
-@router.post("/qrcode", response_model=Dict[str, str])
+@router.post("/qrcode", response_model=Dict[str, str], dependencies=[Depends(orders_service_deadline)])
 async def generate_qr_code(
     request: QRCodeRequest, 
     use_cases: PaymentUseCases = Depends(get_payment_use_cases),
-    service_client: ServiceClient = Depends(get_service_client)
+    service_client: ServiceClient = Depends(get_service_client),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_KEY_HEADER, max_length=255),
+    idempotency_repository: IdempotencyRepository = Depends(get_idempotency_repository_for_request),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store)
 ):
-    # Validate that the order exists
-    order = await service_client.get_order(request.order_id)
-    if not order:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Order with ID {request.order_id} not found"
-        )
-    
-    # Generate QR code
-    qr_code = use_cases.generate_qr_code(request)
-    return {"qr_code": qr_code}
+    async def generate() -> Dict[str, str]:
+        # Validate that the order exists
+        order = await _get_order(service_client, request.order_id)
+        if not order:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Order with ID {request.order_id} not found"
+            )
+        
+        # Generate QR code
+        try:
+            qr_code = await use_cases.generate_qr_code(request)
+        except (IntegrityError, DuplicateKeyError):
+            # A concurrent request created the order's payment first
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Payment for order ID {request.order_id} is being created, retry the request"
+            )
+        if qr_code is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Payment for order ID {request.order_id} is settled and archived"
+            )
+        return {"qr_code": qr_code}
+
+    if idempotency_key is None:
+        return await generate()
+    # Retries with the same key get the first QR code back without running it again
+    return await idempotency.run(
+        idempotency_repository,
+        idempotency_key,
+        request_fingerprint("generate_qr_code", request),
+        status.HTTP_200_OK,
+        generate,
+    )
 
 @router.patch("/{payment_id}/status/{status_name}", response_model=PaymentDb)
 async def update_payment_status(
     payment_id: int, 
     status_name: PaymentStatus, 
-    use_cases: PaymentUseCases = Depends(get_payment_use_cases),
-    service_client: ServiceClient = Depends(get_service_client)
+    use_cases: PaymentUseCases = Depends(get_payment_use_cases)
 ):
-    updated_payment = use_cases.update_payment_status(payment_id, status_name)
+    updated_payment = await use_cases.update_payment_status(payment_id, status_name)
     if not updated_payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Payment with ID {payment_id} not found"
         )
     
-    # Notify the orders service about the payment status update
-    await service_client.update_order_payment_status(
-        updated_payment.order_id, 
-        updated_payment.status
-    )
+    # The orders service is notified from the outbox written with the status change
+    outbox_dispatcher.wake()
     
     return updated_payment
 
@@ -112,24 +395,37 @@ async def update_payment_status(
 async def payment_webhook(
     external_id: str, 
     is_approved: bool, 
-    use_cases: PaymentUseCases = Depends(get_payment_use_cases),
-    service_client: ServiceClient = Depends(get_service_client)
+    use_cases: PaymentUseCases = Depends(get_payment_use_cases)
 ):
     """
     Simulate a payment gateway webhook callback.
     This endpoint would receive notifications from payment gateways.
     """
-    payment = use_cases.process_payment_callback(external_id, is_approved)
+    payment = await use_cases.process_payment_callback(external_id, is_approved)
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Payment with external ID {external_id} not found"
         )
     
-    # Notify the orders service about the payment status update
-    await service_client.update_order_payment_status(
-        payment.order_id, 
-        payment.status
-    )
+    # The orders service is notified from the outbox written with the status change
+    outbox_dispatcher.wake()
+    
+    return {"status": "processed", "payment_id": str(payment.id)} 
+
+@router.post("/webhook/batch", response_model=List[PaymentCallbackResult])
+async def payment_webhook_batch(
+    callbacks: List[PaymentCallback] = Body(..., max_length=settings.WEBHOOK_BATCH_MAX_SIZE),
+    use_cases: PaymentUseCases = Depends(get_payment_use_cases)
+):
+    """
+    Receive a burst of payment gateway callbacks in one request.
+    Payments are resolved with one indexed query and updated set-wise; each
+    item reports whether its payment was processed or not found.
+    """
+    results = await use_cases.process_payment_callbacks(callbacks)
+    
+    # The orders service is notified from the outbox written with the status changes
+    outbox_dispatcher.wake()
     
-    return {"status": "processed", "payment_id": str(payment.id)} 
\ No newline at end of file
+    return results
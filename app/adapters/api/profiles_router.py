@@ -0,0 +1,43 @@
+import hmac
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from app.adapters.profiling.store import profile_store
+from app.config import settings
+
+
+class ProfileKind(str, Enum):
+    TREE = "tree"
+    COLLAPSED = "collapsed"
+
+
+# Helper dependency guarding profiles behind the profiling token; without one nothing is served
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    if not settings.PROFILING_TOKEN or not hmac.compare_digest(
+        (x_profile_token or "").encode(), settings.PROFILING_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+
+
+router = APIRouter(dependencies=[Depends(require_profiling_token)])
+
+
+@router.get("/", response_model=List[Dict[str, Any]])
+def list_profiles(limit: int = Query(20, ge=1, le=100)):
+    """Most recent request profiles, newest first"""
+    return profile_store.list(limit)
+
+
+@router.get("/{profile_id}/{kind}")
+def download_profile(profile_id: str, kind: ProfileKind):
+    """The call tree (`tree`) or flamegraph collapsed stacks (`collapsed`) of one profile"""
+    path = profile_store.path(profile_id, kind.value)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found"
+        )
+    return FileResponse(path, media_type="text/plain", filename=path.name)
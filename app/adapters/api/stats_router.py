@@ -0,0 +1,28 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.adapters.cache.payment_cache import payment_cache
+from app.adapters.http.service_client import service_client
+from app.adapters.models.sql.pool import pool_stats
+from app.adapters.models.sql.session import engine
+
+router = APIRouter()
+
+
+@router.get("/orders-cache", response_model=Dict[str, Any])
+def get_orders_cache_stats():
+    """Hit/miss counters and occupancy of the orders service lookup cache"""
+    return service_client.order_cache_stats()
+
+
+@router.get("/payments-cache", response_model=Dict[str, Any])
+def get_payments_cache_stats():
+    """Hit ratio, evictions and occupancy of the payment lookup cache"""
+    return payment_cache.stats()
+
+
+@router.get("/sql-pool", response_model=Dict[str, Any])
+def get_sql_pool_stats():
+    """Live connection pool usage and checkout wait times of the SQL engine"""
+    return pool_stats(engine)
@@ -0,0 +1,46 @@
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.adapters.cache.ttl_cache import TTLCache
+from app.config import settings
+from app.domain.entities.payment import PaymentDb
+
+NOT_CACHED = object()
+
+
+class PaymentCache:
+    """
+    Payments by ID and by order ID, shared by the repositories of every request.
+
+    Reads started before an invalidation don't store what they read: every
+    invalidation bumps `generation`, and `set` is skipped when it changed
+    since the read began, so a slow read can't put back a value a concurrent
+    write just replaced.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.entries = TTLCache(max_size=max_size, ttl=ttl, clock=clock)
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Any:
+        """The cached payment (or None for a cached miss), or NOT_CACHED"""
+        return self.entries.get(key, NOT_CACHED)
+
+    def set(self, key: Hashable, payment: Optional[PaymentDb], generation: int) -> None:
+        if generation == self.generation:
+            self.entries.set(key, payment)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        self.generation += 1
+        for key in keys:
+            self.entries.delete(key)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.entries.stats()
+
+
+payment_cache = PaymentCache(max_size=settings.PAYMENT_CACHE_MAX_SIZE, ttl=settings.PAYMENT_CACHE_TTL)
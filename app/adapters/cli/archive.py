@@ -0,0 +1,61 @@
+"""
+Move settled payments older than PAYMENT_ARCHIVE_AFTER_DAYS out of the hot
+payments table (or collection) into the archive, in batches. Meant to run
+periodically, e.g. nightly from cron; rerunning it is safe.
+
+Archived payments are only visible to the API while PAYMENT_ARCHIVE_ENABLED
+is true, so the job refuses to run otherwise.
+
+Usage: python -m app.adapters.cli.archive [--nosql] [--days N] [--batch-size N]
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from app.adapters.repositories import RepositoryType, get_payment_archiver
+from app.config import settings
+
+
+async def archive(nosql: bool, days: int, batch_size: int) -> int:
+    settled_before = datetime.utcnow() - timedelta(days=days)
+    archived = 0
+    if nosql:
+        from app.adapters.models.nosql.connection import close_mongo_client
+
+        archiver = get_payment_archiver(RepositoryType.NOSQL)
+        while moved := await archiver.archive_batch(settled_before, batch_size):
+            archived += moved
+        close_mongo_client()
+        return archived
+
+    from app.adapters.models.sql.session import SessionLocal, engine
+
+    async with SessionLocal() as session:
+        archiver = get_payment_archiver(RepositoryType.SQL, session)
+        while moved := await archiver.archive_batch(settled_before, batch_size):
+            archived += moved
+    await engine.dispose()
+    return archived
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive settled payments")
+    parser.add_argument("--nosql", action="store_true", help="archive the MongoDB payments instead of SQL")
+    parser.add_argument(
+        "--days", type=int, default=settings.PAYMENT_ARCHIVE_AFTER_DAYS,
+        help="archive payments settled more than this many days ago",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.PAYMENT_ARCHIVE_BATCH_SIZE,
+        help="payments moved per transaction",
+    )
+    args = parser.parse_args()
+    if not settings.PAYMENT_ARCHIVE_ENABLED:
+        parser.error("set PAYMENT_ARCHIVE_ENABLED=true first, or archived payments can't be read")
+
+    archived = asyncio.run(archive(args.nosql, args.days, args.batch_size))
+    print(f"Archived {archived} payments")
+
+
+if __name__ == "__main__":
+    main()
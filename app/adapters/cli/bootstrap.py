@@ -0,0 +1,41 @@
+"""
+Create the database schema ahead of deployment, so application workers
+don't run DDL on startup (set SQL_CREATE_SCHEMA_ON_STARTUP=false).
+
+Usage: python -m app.adapters.cli.bootstrap [--nosql]
+"""
+import argparse
+import asyncio
+
+from app.adapters.models.sql.schema import create_schema
+from app.adapters.models.sql.session import engine
+
+
+async def bootstrap(nosql: bool) -> None:
+    await create_schema(engine)
+    await engine.dispose()
+    print("SQL schema is up to date")
+
+    if nosql:
+        from app.adapters.models.nosql.connection import (
+            close_mongo_client,
+            ensure_indexes,
+            get_payment_archive_collection,
+            get_payment_collection,
+        )
+
+        await ensure_indexes(get_payment_collection())
+        await ensure_indexes(get_payment_archive_collection())
+        close_mongo_client()
+        print("MongoDB indexes are up to date")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create the payments service database schema")
+    parser.add_argument("--nosql", action="store_true", help="also create the MongoDB indexes")
+    args = parser.parse_args()
+    asyncio.run(bootstrap(args.nosql))
+
+
+if __name__ == "__main__":
+    main()
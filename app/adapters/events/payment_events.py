@@ -0,0 +1,94 @@
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Hashable, Set
+
+from app.adapters.metrics.instruments import (
+    payment_event_subscribers,
+    payment_events_dropped,
+    payment_events_published,
+)
+from app.config import settings
+from app.domain.entities.payment import PaymentDb
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscription:
+    """
+    Payments published for one key, queued for one subscriber.
+
+    The queue is bounded; when a slow subscriber falls behind, the oldest
+    queued payment is dropped. Each payment is a full snapshot, so the
+    newest one is all a subscriber needs.
+    """
+
+    def __init__(self, key: Hashable, queue_size: int):
+        self.key = key
+        self.queue: Deque[PaymentDb] = deque(maxlen=queue_size)
+        self.dropped = 0
+        self._ready = asyncio.Event()
+
+    def put(self, payment: PaymentDb) -> None:
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+            payment_events_dropped.inc()
+        self.queue.append(payment)
+        self._ready.set()
+
+    async def get(self) -> PaymentDb:
+        while not self.queue:
+            self._ready.clear()
+            await self._ready.wait()
+        return self.queue.popleft()
+
+
+class PaymentEvents:
+    """
+    In-process pub/sub of payment changes, keyed by ("payment", id) and
+    ("order", order_id). Waiting subscribers cost a small queue each and
+    no database work. Writes made through this process are published as
+    they commit, and those of other workers by `PaymentEventPoller`.
+    """
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscriptions: Dict[Hashable, Set[Subscription]] = {}
+        self._count = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def subscribe(self, key: Hashable) -> Subscription:
+        if self._count >= self.max_subscribers:
+            raise TooManySubscribers(f"{self._count} subscribers already waiting")
+        subscription = Subscription(key, self.queue_size)
+        self._subscriptions.setdefault(key, set()).add(subscription)
+        self._count += 1
+        payment_event_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.key)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.key]
+        self._count -= 1
+        payment_event_subscribers.dec()
+
+    def publish(self, payment: PaymentDb) -> None:
+        payment_events_published.inc()
+        for key in (("payment", payment.id), ("order", payment.order_id)):
+            for subscription in self._subscriptions.get(key, ()):
+                subscription.put(payment)
+
+
+payment_events = PaymentEvents(
+    queue_size=settings.PAYMENT_EVENTS_QUEUE_SIZE,
+    max_subscribers=settings.PAYMENT_EVENTS_MAX_SUBSCRIBERS,
+)
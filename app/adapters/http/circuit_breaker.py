@@ -0,0 +1,60 @@
+import time
+from typing import Callable, Optional
+
+
+class CircuitBreaker:
+    """
+    Fails calls to a dependency fast once it looks down.
+
+    Closed, calls go through and consecutive failures are counted. After
+    `failure_threshold` of them the circuit opens and `allow()` refuses calls
+    for `reset_timeout` seconds. Then it is half-open: a single probe call goes
+    through and the others are refused until it is recorded; its success
+    closes the circuit and its failure reopens it. A probe that is never
+    recorded, e.g. because it was cancelled, is replaced after another
+    `reset_timeout`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self._opened_at = 0.0
+        self._open = False
+        # When the half-open circuit's probe call was let through, while it is in flight
+        self._probe_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if not self._open:
+            return self.CLOSED
+        if self.clock() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != self.HALF_OPEN:
+            return state == self.CLOSED
+        now = self.clock()
+        if self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout:
+            return False
+        self._probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._open = False
+        self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        self._probe_started_at = None
+        self.failures += 1
+        if self._open or self.failures >= self.failure_threshold:
+            self._open = True
+            self._opened_at = self.clock()
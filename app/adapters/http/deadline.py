@@ -0,0 +1,35 @@
+"""
+Deadline budget for calls to other services, carried in the request's context.
+A route starts the budget once; every outbound call made while serving the
+request then waits at most for what is left of it.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator, Optional
+
+_expires_at: ContextVar[Optional[float]] = ContextVar("deadline_expires_at", default=None)
+
+
+def start_deadline(seconds: float) -> Token:
+    """Give the rest of the current context `seconds` from now, or less if an outer deadline ends sooner"""
+    expires_at = time.monotonic() + seconds
+    current = _expires_at.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    return _expires_at.set(expires_at)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    token = start_deadline(seconds)
+    try:
+        yield
+    finally:
+        _expires_at.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (negative once it has passed), or None without a deadline"""
+    expires_at = _expires_at.get()
+    return None if expires_at is None else expires_at - time.monotonic()
@@ -1,33 +1,261 @@
-from typing import Any, Dict, Optional
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
 
 import httpx
 
+from app.adapters.cache.ttl_cache import TTLCache
+from app.adapters.http.circuit_breaker import CircuitBreaker
+from app.adapters.http.deadline import remaining as deadline_remaining
+from app.adapters.metrics.instruments import (
+    orders_service_circuit_open,
+    orders_service_errors,
+    orders_service_hedged_requests,
+    orders_service_request_duration,
+    orders_service_requests_in_flight,
+)
 from app.config import settings
 from app.domain.entities.payment import PaymentStatus
 
 
+_NOT_CACHED = object()
+
+# Recent latencies kept per operation, and how many are needed before hedging uses their p95
+LATENCY_WINDOW_SIZE = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+class OrdersServiceUnavailable(httpx.RequestError):
+    """The orders service could not be reached, or failed to answer"""
+
+
+class CircuitOpenError(OrdersServiceUnavailable):
+    """The orders service failed too often recently, so the call was not attempted"""
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """The request's deadline left no time for the call, or ran out during it"""
+
+
 class ServiceClient:
-    def __init__(self):
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        order_cache: Optional[TTLCache] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
         self.orders_url = settings.ORDERS_SERVICE_URL
-    
+        self._http_client = http_client
+        if order_cache is None:
+            order_cache = TTLCache(max_size=settings.ORDER_CACHE_MAX_SIZE, ttl=settings.ORDER_CACHE_TTL)
+        self.order_cache = order_cache
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker(
+                settings.ORDERS_SERVICE_CIRCUIT_FAILURE_THRESHOLD, settings.ORDERS_SERVICE_CIRCUIT_RESET_TIMEOUT
+            )
+        self.circuit_breaker = circuit_breaker
+        self.hedge_get_order = settings.ORDERS_SERVICE_HEDGE_ENABLED
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW_SIZE))
+        self._order_lookups: Dict[int, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+        self.coalesced_lookups = 0
+
+    async def start(self) -> None:
+        """Open the pooled HTTP client; called once on application startup"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = self._build_http_client()
+
+    async def close(self) -> None:
+        """Close pooled connections; called once on application shutdown"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        # Started lazily when used outside the application lifespan (scripts, tests)
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = self._build_http_client()
+        return self._http_client
+
     async def get_order(self, order_id: int) -> Optional[Dict[str, Any]]:
-        """Get order information from the orders service"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(f"{self.orders_url}/api/v1/orders/{order_id}")
-                if response.status_code == 200:
-                    return response.json()
-                return None
-            except httpx.RequestError:
-                return None
-    
+        """
+        Get order information from the orders service, through the order cache.
+        None when the order doesn't exist; raises `OrdersServiceUnavailable`
+        when the orders service is unreachable or failing, and
+        `DeadlineExceeded` when it could not answer in time, since neither
+        says anything about the order.
+        """
+        cached = self.order_cache.get(order_id, _NOT_CACHED)
+        if cached is not _NOT_CACHED:
+            return cached
+
+        # Concurrent lookups of the same order share a single request
+        lookup = self._order_lookups.get(order_id)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._fetch_order(order_id))
+            self._order_lookups[order_id] = lookup
+
+            def forget(done: asyncio.Future) -> None:
+                self._order_lookups.pop(order_id, None)
+                # Retrieved here, so an error raised after every caller gave up isn't reported as unhandled
+                if not done.cancelled():
+                    done.exception()
+
+            lookup.add_done_callback(forget)
+        else:
+            self.coalesced_lookups += 1
+
+        # Shielded so a cancelled caller doesn't cancel the lookup for the others. A lookup
+        # started by another request runs to that request's deadline, so wait only to ours
+        try:
+            return await asyncio.wait_for(asyncio.shield(lookup), deadline_remaining())
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Deadline reached waiting for order {order_id}") from None
+
+    def order_cache_stats(self) -> Dict[str, Any]:
+        return {**self.order_cache.stats(), "coalesced_lookups": self.coalesced_lookups}
+
     async def update_order_payment_status(self, order_id: int, payment_status: PaymentStatus) -> bool:
         """Update payment status in the orders service"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.patch(
-                    f"{self.orders_url}/api/v1/orders/{order_id}/payment-status/{payment_status}"
-                )
-                return response.status_code == 200
-            except httpx.RequestError:
-                return False 
\ No newline at end of file
+        try:
+            response = await self._request(
+                "update_order_payment_status",
+                "PATCH",
+                f"{self.orders_url}/api/v1/orders/{order_id}/payment-status/{PaymentStatus(payment_status).value}",
+                settings.ORDERS_SERVICE_UPDATE_STATUS_TIMEOUT,
+            )
+            return response.status_code == 200
+        except httpx.RequestError:
+            return False
+
+    async def _fetch_order(self, order_id: int) -> Optional[Dict[str, Any]]:
+        request = self._hedged_request if self.hedge_get_order else self._request
+        try:
+            response = await request(
+                "get_order",
+                "GET",
+                f"{self.orders_url}/api/v1/orders/{order_id}",
+                settings.ORDERS_SERVICE_GET_ORDER_TIMEOUT,
+            )
+        except (OrdersServiceUnavailable, DeadlineExceeded):
+            raise
+        except httpx.RequestError as error:
+            # Transport errors are transient, so they are not cached
+            raise OrdersServiceUnavailable(f"Orders service unreachable looking up order {order_id}") from error
+
+        if response.status_code == 200:
+            order = response.json()
+            self.order_cache.set(order_id, order)
+            return order
+        if response.status_code == 404:
+            self.order_cache.set(order_id, None, ttl=settings.ORDER_CACHE_NEGATIVE_TTL)
+        elif response.status_code >= 500:
+            raise OrdersServiceUnavailable(
+                f"Orders service answered {response.status_code} looking up order {order_id}"
+            )
+        return None
+
+    async def _hedged_request(self, operation: str, method: str, url: str, timeout: float) -> httpx.Response:
+        """
+        `_request`, sent again if no answer arrives within the p95 latency of
+        recent calls; the first answer wins and the other attempt is cancelled.
+        Only for idempotent requests.
+        """
+        attempts = [asyncio.ensure_future(self._request(operation, method, url, timeout))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self._hedge_delay(operation))
+            if not done:
+                orders_service_hedged_requests.labels(operation).inc()
+                attempts.append(asyncio.ensure_future(self._request(operation, method, url, timeout)))
+
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+            # Both attempts failed; report the first one's error
+            return attempts[0].result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+
+    async def _request(self, operation: str, method: str, url: str, timeout: float) -> httpx.Response:
+        """
+        Send a request to the orders service, recording its latency and failures.
+        It waits `timeout` seconds at most, less if the request's deadline is
+        closer, and fails fast while the circuit breaker is open.
+        """
+        budget = deadline_remaining()
+        if budget is not None and budget <= 0:
+            orders_service_errors.labels(operation, "deadline").inc()
+            raise DeadlineExceeded(f"No time left before the deadline for {operation}")
+        if not self.circuit_breaker.allow():
+            orders_service_errors.labels(operation, "circuit_open").inc()
+            raise CircuitOpenError(f"Circuit to the orders service is open, {operation} not attempted")
+        cut_by_deadline = budget is not None and budget < timeout
+        if cut_by_deadline:
+            timeout = budget
+
+        orders_service_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            # httpx times each connect and read separately; wait_for bounds the whole call
+            response = await asyncio.wait_for(
+                self.http_client.request(method, url, timeout=self._timeout(timeout)), timeout
+            )
+        except (httpx.RequestError, asyncio.TimeoutError) as error:
+            timed_out = isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError))
+            if timed_out and cut_by_deadline:
+                # The caller ran out of time, which says nothing about the orders service
+                orders_service_errors.labels(operation, "deadline").inc()
+                raise DeadlineExceeded(f"Deadline reached during {operation}") from error
+            orders_service_errors.labels(operation, "transport").inc()
+            self._record_failure()
+            if isinstance(error, asyncio.TimeoutError):
+                raise httpx.TimeoutException(f"{operation} timed out after {timeout}s") from error
+            raise
+        finally:
+            orders_service_requests_in_flight.dec()
+            duration = time.perf_counter() - started
+            orders_service_request_duration.labels(operation).observe(duration)
+
+        # A missing order is an answer, not a failure
+        if response.status_code >= 400 and response.status_code != 404:
+            orders_service_errors.labels(operation, "status").inc()
+        if response.status_code >= 500:
+            self._record_failure()
+        else:
+            self.latencies[operation].append(duration)
+            self.circuit_breaker.record_success()
+            orders_service_circuit_open.set(0)
+        return response
+
+    def _record_failure(self) -> None:
+        self.circuit_breaker.record_failure()
+        if self.circuit_breaker.state != CircuitBreaker.CLOSED:
+            orders_service_circuit_open.set(1)
+
+    def _hedge_delay(self, operation: str) -> float:
+        latencies = self.latencies[operation]
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return settings.ORDERS_SERVICE_HEDGE_DELAY
+        return sorted(latencies)[int(len(latencies) * 0.95)]
+
+    def _build_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.ORDERS_SERVICE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ORDERS_SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.ORDERS_SERVICE_KEEPALIVE_EXPIRY,
+            ),
+            timeout=self._timeout(settings.ORDERS_SERVICE_GET_ORDER_TIMEOUT),
+        )
+
+    def _timeout(self, total: float) -> httpx.Timeout:
+        return httpx.Timeout(total, connect=min(total, settings.ORDERS_SERVICE_CONNECT_TIMEOUT))
+
+
+service_client = ServiceClient()
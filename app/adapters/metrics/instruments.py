@@ -0,0 +1,94 @@
+from app.adapters.metrics.registry import MetricsRegistry
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "payments_http_request_duration_seconds",
+    "Latency of HTTP requests by method and route template",
+    ("method", "route"),
+)
+http_requests = registry.counter(
+    "payments_http_requests_total",
+    "HTTP requests by method, route template and response status",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "payments_http_requests_in_flight",
+    "HTTP requests currently being served",
+).labels()
+
+repository_call_duration = registry.histogram(
+    "payments_repository_call_duration_seconds",
+    "Latency of PaymentRepository calls by backend and method",
+    ("backend", "method"),
+)
+repository_call_errors = registry.counter(
+    "payments_repository_call_errors_total",
+    "PaymentRepository calls that raised, by backend and method",
+    ("backend", "method"),
+)
+
+orders_service_request_duration = registry.histogram(
+    "payments_orders_service_request_duration_seconds",
+    "Latency of calls to the orders service by operation",
+    ("operation",),
+)
+orders_service_errors = registry.counter(
+    "payments_orders_service_errors_total",
+    "Failed calls to the orders service by operation and reason "
+    "(transport, status, deadline or circuit_open)",
+    ("operation", "reason"),
+)
+orders_service_hedged_requests = registry.counter(
+    "payments_orders_service_hedged_requests_total",
+    "Calls to the orders service sent a second time because the first was slow, by operation",
+    ("operation",),
+)
+orders_service_circuit_open = registry.gauge(
+    "payments_orders_service_circuit_open",
+    "1 while calls to the orders service are failing fast, 0 otherwise",
+).labels()
+orders_service_requests_in_flight = registry.gauge(
+    "payments_orders_service_requests_in_flight",
+    "Calls to the orders service currently waiting for a response",
+).labels()
+
+outbox_dead_letters = registry.counter(
+    "payments_outbox_dead_letters_total",
+    "Payment status notifications given up on after OUTBOX_MAX_ATTEMPTS failed deliveries",
+).labels()
+
+payment_event_subscribers = registry.gauge(
+    "payments_event_subscribers",
+    "Clients currently waiting for payment updates",
+).labels()
+payment_events_published = registry.counter(
+    "payments_events_published_total",
+    "Payment changes published to waiting clients",
+).labels()
+payment_events_dropped = registry.counter(
+    "payments_events_dropped_total",
+    "Payment updates dropped because a subscriber's queue was full",
+).labels()
+
+group_commit_batch_size = registry.histogram(
+    "payments_group_commit_batch_size",
+    "Payment writes committed together per group commit",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+).labels()
+group_commit_flush_duration = registry.histogram(
+    "payments_group_commit_flush_duration_seconds",
+    "Time spent writing and committing one group commit batch",
+).labels()
+group_commit_flush_failures = registry.counter(
+    "payments_group_commit_flush_failures_total",
+    "Group commit batches that failed and were retried one write at a time",
+).labels()
+group_commit_interval = registry.gauge(
+    "payments_group_commit_interval_seconds",
+    "Longest time a payment write waits for others to join its batch",
+).labels()
+group_commit_max_batch = registry.gauge(
+    "payments_group_commit_max_batch",
+    "Payment writes committed together at most",
+).labels()
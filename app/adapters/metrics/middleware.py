@@ -0,0 +1,45 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.adapters.metrics.instruments import http_request_duration, http_requests, http_requests_in_flight
+
+# Label for requests that matched no route, so unknown paths can't grow the label set
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and in-flight count of every HTTP request,
+    labelled with the route template (`/api/v1/payments/{payment_id}`)
+    rather than the raw path.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            path = route.path if route is not None else UNMATCHED_ROUTE
+            http_request_duration.labels(scope["method"], path).observe(elapsed)
+            http_requests.labels(scope["method"], path, str(status_code)).inc()
@@ -1,12 +1,80 @@
-from pymongo import MongoClient
+import logging
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
 
 from app.config import settings
 
-mongo_client = MongoClient(
-    host=settings.NOSQL_HOST,
-    port=settings.NOSQL_PORT,
-)
+logger = logging.getLogger(__name__)
+
+ORDER_ID_INDEX = "order_id_1"
+
+_mongo_client: Optional[AsyncIOMotorClient] = None
+
+
+def get_mongo_client() -> AsyncIOMotorClient:
+    """Create the Mongo client on first use, so SQL-only processes never open one"""
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = AsyncIOMotorClient(
+            host=settings.NOSQL_HOST,
+            port=settings.NOSQL_PORT,
+        )
+    return _mongo_client
+
+
+def get_payment_collection() -> AsyncIOMotorCollection:
+    return get_mongo_client()[settings.NOSQL_DB]["payments"]
+
+
+def get_payment_archive_collection() -> AsyncIOMotorCollection:
+    return get_mongo_client()[settings.NOSQL_DB]["payments_archive"]
+
+
+def get_outbox_dead_letter_collection() -> AsyncIOMotorCollection:
+    return get_mongo_client()[settings.NOSQL_DB]["payment_outbox_dead_letters"]
+
+
+def get_idempotency_collection() -> AsyncIOMotorCollection:
+    return get_mongo_client()[settings.NOSQL_DB]["idempotency_keys"]
+
+
+def close_mongo_client() -> None:
+    global _mongo_client
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
+
+
+async def ensure_indexes(collection: AsyncIOMotorCollection) -> None:
+    await _ensure_unique_order_id_index(collection)
+    # Only string external IDs take part in the unique index, so payments
+    # created before a QR code is generated (external_id=None) don't collide.
+    await collection.create_index(
+        [("external_id", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"external_id": {"$type": "string"}},
+    )
+    await collection.create_index([("outbox.next_attempt_at", ASCENDING)], sparse=True)
+    await collection.create_index([("created_at", ASCENDING)])
+    await collection.create_index([("updated_at", ASCENDING)])
 
-db = mongo_client[settings.NOSQL_DB]
 
-payment_collection = db["payments"] 
\ No newline at end of file
+async def _ensure_unique_order_id_index(collection: AsyncIOMotorCollection) -> None:
+    # One payment per order, like the SQL unique index. Collections indexed before
+    # that have a non-unique index of the same name, which is replaced
+    existing = (await collection.index_information()).get(ORDER_ID_INDEX)
+    if existing is not None and existing.get("unique"):
+        return
+    if existing is not None:
+        await collection.drop_index(ORDER_ID_INDEX)
+    try:
+        await collection.create_index([("order_id", ASCENDING)], unique=True)
+    except DuplicateKeyError:
+        # Left for an operator to clean up; lookups by order keep a non-unique index
+        logger.error(
+            "Could not create unique index %s: %s has duplicate values", ORDER_ID_INDEX, collection.full_name
+        )
+        await collection.create_index([("order_id", ASCENDING)])
@@ -0,0 +1,55 @@
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import DESCENDING, ReturnDocument
+
+
+class SequenceAllocator:
+    """
+    Hands out increasing integer IDs for a collection from blocks reserved
+    atomically on a counter document (`$inc` by `block_size`), so most IDs
+    cost no round trip and concurrent writers never get the same ID.
+    IDs left in a block when the process exits are skipped, not reused.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, block_size: int):
+        self.collection = collection
+        self.counters = collection.database["counters"]
+        self.name = collection.name
+        self.block_size = block_size
+        self._next_id = 1
+        self._last_id = 0
+        self._seeded = False
+        self._lock = asyncio.Lock()
+
+    async def next_id(self) -> int:
+        if self._next_id > self._last_id:
+            async with self._lock:
+                if self._next_id > self._last_id:
+                    await self._reserve_block()
+
+        next_id = self._next_id
+        self._next_id += 1
+        return next_id
+
+    async def _reserve_block(self) -> None:
+        if not self._seeded:
+            await self._seed()
+
+        counter = await self.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"seq": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._last_id = counter["seq"]
+        self._next_id = self._last_id - self.block_size + 1
+
+    async def _seed(self) -> None:
+        # Collections populated before the counter existed start after their highest ID
+        last = await self.collection.find_one(sort=[("_id", DESCENDING)], projection={"_id": 1})
+        if last:
+            await self.counters.update_one(
+                {"_id": self.name}, {"$max": {"seq": last["_id"]}}, upsert=True
+            )
+        self._seeded = True
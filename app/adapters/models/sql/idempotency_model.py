@@ -0,0 +1,13 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.adapters.models.sql.base import BaseModel
+
+
+class IdempotencyKeyModel(BaseModel):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), nullable=False, unique=True, index=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    body = Column(Text, nullable=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+from app.adapters.models.sql.base import BaseModel
+
+
+class OutboxModel(BaseModel):
+    __tablename__ = "payment_outbox"
+    __table_args__ = (Index("ix_payment_outbox_order_id_id", "order_id", "id"),)
+
+    order_id = Column(Integer, nullable=False)
+    payment_id = Column(Integer, nullable=False)
+    payment_status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class OutboxDeadLetterModel(BaseModel):
+    """Outbox messages given up on after OUTBOX_MAX_ATTEMPTS; created_at is when that happened"""
+
+    __tablename__ = "payment_outbox_dead_letters"
+
+    order_id = Column(Integer, nullable=False, index=True)
+    payment_id = Column(Integer, nullable=False)
+    payment_status = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False)
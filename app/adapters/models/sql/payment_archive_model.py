@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Index, Integer, Numeric, String
+
+from app.adapters.models.sql.base import BaseModel
+
+
+class PaymentArchiveModel(BaseModel):
+    """Settled payments moved out of `payments` by the archival job, keeping their IDs"""
+
+    __tablename__ = "payments_archive"
+    __table_args__ = (Index("ix_payments_archive_created_at_status_amount", "created_at", "status", "amount"),)
+
+    order_id = Column(Integer, nullable=False, index=True)
+    amount = Column(Numeric(precision=10, scale=2), nullable=False)
+    status = Column(String, nullable=False)
+    external_id = Column(String, nullable=True, unique=True, index=True)
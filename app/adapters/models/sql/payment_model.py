@@ -1,12 +1,20 @@
-from sqlalchemy import Column, Integer, Numeric, String
+from sqlalchemy import Column, Index, Integer, Numeric, String
 
 from app.adapters.models.sql.base import BaseModel
 
 
 class PaymentModel(BaseModel):
     __tablename__ = "payments"
+    __table_args__ = (
+        # Covers the reporting query, so totals by day and status are read from the index alone
+        Index("ix_payments_created_at_status_amount", "created_at", "status", "amount"),
+        # One payment per order, even when two workers both found none before inserting
+        Index("uq_payments_order_id", "order_id", unique=True),
+        # Read by every worker's payment event poller for the changes made since its last poll
+        Index("ix_payments_updated_at", "updated_at"),
+    )
 
-    order_id = Column(Integer, nullable=False, index=True)
+    order_id = Column(Integer, nullable=False)
     amount = Column(Numeric(precision=10, scale=2), nullable=False)
     status = Column(String, nullable=False)
-    external_id = Column(String, nullable=True) 
\ No newline at end of file
+    external_id = Column(String, nullable=True, unique=True, index=True) 
\ No newline at end of file
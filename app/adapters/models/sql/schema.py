@@ -0,0 +1,41 @@
+import logging
+
+from sqlalchemy import Connection, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.adapters.models.sql.base import Base
+from app.adapters.models.sql import (  # noqa: F401
+    idempotency_model,
+    outbox_model,
+    payment_archive_model,
+    payment_model,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def create_schema(engine: AsyncEngine) -> None:
+    """Create missing tables, and indexes missing from existing tables; safe to run repeatedly"""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.run_sync(_create_missing_indexes)
+
+
+def _create_missing_indexes(connection: Connection) -> None:
+    # create_all skips tables that already exist, so indexes added to their models later
+    # (e.g. the unique external_id index webhooks look payments up by) are created here
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                with connection.begin_nested():
+                    index.create(connection)
+            except IntegrityError:
+                # Left for an operator to clean up; the service still starts
+                logger.error("Could not create unique index %s: %s has duplicate values", index.name, table.name)
+            else:
+                logger.info("Created index %s on %s", index.name, table.name)
@@ -1,15 +1,76 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 
+from app.adapters.models.sql.pool import InstrumentedQueuePool
 from app.config import settings
 
-engine = create_engine(settings.SQL_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async drivers used when SQL_DATABASE_URL names a plain dialect
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+def async_database_url(database_url: str) -> str:
+    url = make_url(database_url)
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+
+def build_engine(database_url: str) -> AsyncEngine:
+    url = make_url(async_database_url(database_url))
+    is_sqlite = url.get_backend_name() == "sqlite"
+
+    if is_sqlite and url.database in (None, "", ":memory:"):
+        # In-memory SQLite keeps the driver's single shared connection
+        engine = create_async_engine(url)
+    else:
+        engine = create_async_engine(
+            url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.SQL_POOL_SIZE,
+            max_overflow=settings.SQL_MAX_OVERFLOW,
+            pool_timeout=settings.SQL_POOL_TIMEOUT,
+            pool_recycle=settings.SQL_POOL_RECYCLE,
+            pool_pre_ping=settings.SQL_POOL_PRE_PING,
+        )
+
+    if is_sqlite:
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL lets readers proceed while a writer commits; NORMAL sync is durable in WAL mode
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+engine = build_engine(settings.SQL_DATABASE_URL)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+# Optional read replica, with the same pool settings as the primary
+replica_engine = build_engine(settings.SQL_REPLICA_URL) if settings.SQL_REPLICA_URL else None
+ReplicaSessionLocal = (
+    async_sessionmaker(bind=replica_engine, autoflush=False, expire_on_commit=False) if replica_engine else None
+)
+
+
+async def get_replica_db():
+    """Session on the read replica, or None when no replica is configured"""
+    if ReplicaSessionLocal is None:
+        yield None
+        return
+    async with ReplicaSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
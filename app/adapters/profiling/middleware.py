@@ -0,0 +1,107 @@
+import asyncio
+import hmac
+import random
+import time
+from datetime import datetime
+from typing import Iterable, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.adapters.profiling.profiler import RequestProfiler, render_call_tree, render_collapsed_stacks
+from app.adapters.profiling.store import ProfileStore, new_profile_id
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_ID_HEADER = b"x-profile-id"
+STREAMED_MEDIA_TYPES = (b"text/event-stream", b"application/x-ndjson")
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that carry the profiling token header, plus a random
+    sample of `sample_rate` of all requests, and saves each profile to the
+    store. The profile ID is returned in the `X-Profile-Id` response header.
+
+    The profiler hooks `sys.setprofile`, which fires for every call made on
+    the event loop thread, so while a profile runs every other request on
+    that loop is slowed down by the hook even though its calls are not
+    recorded. To bound that cost only one request is profiled at a time per
+    process; requests arriving while a profile is running are served
+    unprofiled. Streamed responses (server-sent events, NDJSON) can stay open
+    for hours, so their profile ends when the response starts. Only install
+    this middleware when profiling is enabled: when it is not installed it
+    costs nothing.
+    """
+
+    # Shared by every instance: the profile hook is process-wide, not per app
+    _profiling = False
+
+    def __init__(self, app: ASGIApp, store: ProfileStore, token: str = "", sample_rate: float = 0.0):
+        self.app = app
+        self.store = store
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or ProfilingMiddleware._profiling or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id()
+        status_code = 500
+        streamed = False
+        profiler = RequestProfiler()
+
+        async def finish() -> None:
+            nonlocal profiler
+            if profiler is None:
+                return
+            root = profiler.stop()
+            profiler = None
+            duration = time.perf_counter() - started
+            ProfilingMiddleware._profiling = False
+            metadata = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status_code,
+                "duration_ms": round(duration * 1000, 3),
+                "streamed": streamed,
+                "created_at": created_at.isoformat(),
+            }
+            # Rendering and writing happen off the event loop
+            await asyncio.to_thread(
+                self.store.save, profile_id, metadata, render_call_tree(root), render_collapsed_stacks(root)
+            )
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code, streamed
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())]
+                streamed = _is_streamed(message["headers"])
+                if streamed:
+                    # Profiled up to the start of the stream only, to release the hook
+                    await finish()
+            await send(message)
+
+        ProfilingMiddleware._profiling = True
+        created_at = datetime.utcnow()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            await finish()
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_TOKEN_HEADER:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+def _is_streamed(headers: Iterable[Tuple[bytes, bytes]]) -> bool:
+    for name, value in headers:
+        if name.lower() == b"content-type":
+            return value.split(b";", 1)[0].strip().lower() in STREAMED_MEDIA_TYPES
+    return False
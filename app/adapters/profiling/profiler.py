@@ -0,0 +1,208 @@
+import asyncio
+import dis
+import os
+import sys
+import time
+from types import CodeType, FrameType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_YIELD_VALUE = dis.opmap["YIELD_VALUE"]
+_AWAIT_KEY = ("", 0, "<await>")
+
+Key = Tuple[str, int, str]
+
+
+class CallNode:
+    __slots__ = ("key", "children", "total", "calls")
+
+    def __init__(self, key: Key):
+        self.key = key
+        self.children: Dict[Key, "CallNode"] = {}
+        self.total = 0.0
+        self.calls = 0
+
+    def child(self, key: Key) -> "CallNode":
+        node = self.children.get(key)
+        if node is None:
+            node = self.children[key] = CallNode(key)
+        return node
+
+    @property
+    def self_time(self) -> float:
+        return max(0.0, self.total - sum(child.total for child in self.children.values()))
+
+
+def _code_key(code: CodeType) -> Key:
+    return code.co_filename, code.co_firstlineno, code.co_qualname
+
+
+def _builtin_key(function: Any) -> Key:
+    return "", 0, f"<built-in {getattr(function, '__qualname__', repr(function))}>"
+
+
+def _is_yield(frame: FrameType) -> bool:
+    """Whether a generator or coroutine frame is returning because it yielded"""
+    code = frame.f_code
+    return frame.f_lasti >= 0 and code.co_code[frame.f_lasti] == _YIELD_VALUE
+
+
+class RequestProfiler:
+    """
+    Deterministic call-tree profiler for the coroutine chain of one request.
+
+    Profiling starts inside the calling coroutine's frame, which becomes the
+    root of the tree. Only events from the task that started the profile are
+    recorded, so concurrent requests don't leak into it. When the task is
+    suspended on an await, its frames stay open and the wait is recorded as
+    an `<await>` child of the innermost frame, so time spent on I/O shows up
+    where it was awaited instead of disappearing from the tree.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self.root: Optional[CallNode] = None
+        self._task: Optional[asyncio.Task] = None
+        # Open frames as [frame, node, started]; frames at or above `_depth` are suspended
+        self._stack: List[list] = []
+        self._depth = 0
+        self._yielded_at: Optional[float] = None
+        self._task_suspended = False
+
+    def start(self) -> None:
+        caller = sys._getframe(1)
+        self._task = asyncio.current_task()
+        self.root = CallNode(_code_key(caller.f_code))
+        self.root.calls = 1
+        self._stack = [[caller, self.root, self._clock()]]
+        self._depth = 1
+        sys.setprofile(self._event)
+
+    def stop(self) -> CallNode:
+        sys.setprofile(None)
+        now = self._clock()
+        while self._stack:
+            self._close(self._stack.pop(), now)
+        self._depth = 0
+        return self.root
+
+    def _event(self, frame: FrameType, event: str, arg: Any) -> None:
+        if asyncio.current_task() is not self._task:
+            return
+        now = self._clock()
+
+        if event == "call":
+            if self._depth < len(self._stack):
+                if self._stack[self._depth][0] is frame:
+                    self._resume(now)
+                    return
+                if self._depth == 0:
+                    # Frames outside the profiled coroutine resuming the task
+                    return
+                self._settle(now)
+            self._push(frame, _code_key(frame.f_code), now)
+
+        elif event == "return":
+            if self._depth == 0:
+                return
+            top = self._stack[self._depth - 1]
+            if top[0] is frame and _is_yield(frame):
+                if self._depth == len(self._stack):
+                    self._yielded_at = now
+                self._depth -= 1
+                if self._depth == 0:
+                    self._task_suspended = True
+                return
+            self._settle(now)
+            self._pop_to(frame, now)
+
+        elif event == "c_call":
+            if self._depth == 0:
+                return
+            self._settle(now)
+            self._push(None, _builtin_key(arg), now)
+
+        else:  # c_return, c_exception
+            if self._depth == 0:
+                return
+            self._settle(now)
+            if self._stack and self._stack[-1][0] is None:
+                self._close(self._stack.pop(), now)
+                self._depth = len(self._stack)
+
+    def _push(self, frame: Optional[FrameType], key: Key, now: float) -> None:
+        parent = self._stack[-1][1]
+        node = parent.child(key)
+        node.calls += 1
+        self._stack.append([frame, node, now])
+        self._depth = len(self._stack)
+
+    def _pop_to(self, frame: FrameType, now: float) -> None:
+        for index in range(len(self._stack) - 1, 0, -1):
+            if self._stack[index][0] is frame:
+                while len(self._stack) > index:
+                    self._close(self._stack.pop(), now)
+                break
+        self._depth = len(self._stack)
+
+    def _resume(self, now: float) -> None:
+        self._depth += 1
+        if self._depth == len(self._stack):
+            if self._task_suspended and self._yielded_at is not None:
+                waited = self._stack[-1][1].child(_AWAIT_KEY)
+                waited.calls += 1
+                waited.total += now - self._yielded_at
+            self._yielded_at = None
+            self._task_suspended = False
+
+    def _settle(self, now: float) -> None:
+        """Frames that yielded to a caller that kept running were generators that finished a step"""
+        while len(self._stack) > self._depth:
+            self._close(self._stack.pop(), now)
+        self._yielded_at = None
+        self._task_suspended = False
+
+    def _close(self, entry: list, now: float) -> None:
+        entry[1].total += now - entry[2]
+
+
+def _label(key: Key) -> str:
+    filename, line, name = key
+    if not filename:
+        return name
+    if "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    else:
+        filename = os.path.relpath(filename)
+    return f"{name} ({filename}:{line})"
+
+
+def render_call_tree(root: CallNode, min_fraction: float = 0.001) -> str:
+    """Indented call tree with total/self milliseconds, skipping nodes under `min_fraction` of the root"""
+    lines = [f"{'total ms':>10} {'self ms':>10} {'calls':>7}  function"]
+    threshold = root.total * min_fraction
+
+    def walk(node: CallNode, depth: int) -> None:
+        lines.append(
+            f"{node.total * 1000:>10.3f} {node.self_time * 1000:>10.3f} {node.calls:>7}  "
+            f"{'  ' * depth}{_label(node.key)}"
+        )
+        for child in sorted(node.children.values(), key=lambda child: child.total, reverse=True):
+            if child.total >= threshold:
+                walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines) + "\n"
+
+
+def render_collapsed_stacks(root: CallNode) -> str:
+    """Self time per call stack in microseconds, in the collapsed format flamegraph tools read"""
+
+    def walk(node: CallNode, path: List[str]) -> Iterator[str]:
+        path = [*path, _label(node.key).replace(";", ":")]
+        self_us = int(node.self_time * 1_000_000)
+        if self_us > 0:
+            yield f"{';'.join(path)} {self_us}"
+        for child in node.children.values():
+            yield from walk(child, path)
+
+    return "\n".join(walk(root, [])) + "\n"
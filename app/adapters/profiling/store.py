@@ -0,0 +1,66 @@
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from app.config import settings
+
+PROFILE_ID_PATTERN = re.compile(r"^\d{8}T\d{12}-[0-9a-f]{8}$")
+PROFILE_FILES = {"tree": ".txt", "collapsed": ".collapsed"}
+
+
+def new_profile_id() -> str:
+    """Sortable by creation time, so the newest profiles list first"""
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{uuid4().hex[:8]}"
+
+
+class ProfileStore:
+    """
+    Request profiles on local disk: a call tree (`.txt`), collapsed stacks
+    for flamegraph tools (`.collapsed`) and metadata (`.json`) per profile.
+    Only the newest `max_profiles` are kept.
+    """
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def save(self, profile_id: str, metadata: Dict[str, Any], call_tree: str, collapsed_stacks: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile_id}{PROFILE_FILES['tree']}").write_text(call_tree)
+        (self.directory / f"{profile_id}{PROFILE_FILES['collapsed']}").write_text(collapsed_stacks)
+        (self.directory / f"{profile_id}.json").write_text(json.dumps({"id": profile_id, **metadata}))
+        self._prune()
+
+    def list(self, limit: int) -> List[Dict[str, Any]]:
+        profiles = []
+        for path in self._metadata_files()[:limit]:
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, profile_id: str, kind: str) -> Optional[Path]:
+        if not PROFILE_ID_PATTERN.match(profile_id) or kind not in PROFILE_FILES:
+            return None
+        path = self.directory / f"{profile_id}{PROFILE_FILES[kind]}"
+        return path if path.is_file() else None
+
+    def _metadata_files(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            (path for path in self.directory.glob("*.json") if PROFILE_ID_PATTERN.match(path.stem)),
+            reverse=True,
+        )
+
+    def _prune(self) -> None:
+        for path in self._metadata_files()[self.max_profiles:]:
+            for suffix in (".json", *PROFILE_FILES.values()):
+                path.with_suffix(suffix).unlink(missing_ok=True)
+
+
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
@@ -1,11 +1,23 @@
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.adapters.models.sql.payment_archive_model import PaymentArchiveModel
+from app.config import settings
+from app.domain.interfaces.idempotency_repository import IdempotencyRepository
+from app.domain.interfaces.outbox_repository import OutboxRepository
+from app.domain.interfaces.payment_archiver import PaymentArchiver
 from app.domain.interfaces.payment_repository import PaymentRepository
+from .archive_fallback_payment_repository import ArchiveFallbackPaymentRepository
+from .caching_payment_repository import CachingPaymentRepository
+from .instrumented_payment_repository import InstrumentedPaymentRepository
+from .publishing_payment_repository import PublishingPaymentRepository
+from .routing_payment_repository import RoutingPaymentRepository
+from .sql_idempotency_repository import SQLIdempotencyRepository
+from .sql_outbox_repository import SQLOutboxRepository
+from .sql_payment_archiver import SQLPaymentArchiver
 from .sql_payment_repository import SQLPaymentRepository
-from .nosql_payment_repository import NoSQLPaymentRepository
 
 
 class RepositoryType(str, Enum):
@@ -14,11 +26,86 @@ class RepositoryType(str, Enum):
 
 
 def get_payment_repository(
-    repository_type: RepositoryType, db_session: Optional[Session] = None
+    repository_type: RepositoryType,
+    db_session: Optional[AsyncSession] = None,
+    read_session: Optional[AsyncSession] = None,
 ) -> PaymentRepository:
+    """
+    `read_session` is given when a SQL replica is configured: reads go to it
+    (it may be `db_session` itself, for requests that must read the primary)
+    and writes are remembered for the read-your-writes window.
+    """
     if repository_type == RepositoryType.SQL:
         if not db_session:
             raise ValueError("DB session is required for SQL repository")
-        return SQLPaymentRepository(db_session)
+        repository = SQLPaymentRepository(db_session)
+        if settings.GROUP_COMMIT_ENABLED:
+            # Imported on demand: the writer module imports this package's SQL repository
+            from app.adapters.workers.group_commit_writer import group_commit_writer
+            from .group_commit_payment_repository import GroupCommitPaymentRepository
+
+            repository = GroupCommitPaymentRepository(repository, group_commit_writer)
     else:
-        return NoSQLPaymentRepository()
+        # Imported on demand so SQL-only processes never load the Mongo driver
+        from .nosql_payment_repository import NoSQLPaymentRepository
+
+        repository = NoSQLPaymentRepository()
+
+    # Cache hits never reach the instrumented repository, so its metrics count database calls
+    repository = InstrumentedPaymentRepository(repository, repository_type.value)
+    if repository_type == RepositoryType.SQL and read_session is not None:
+        replica = repository
+        if read_session is not db_session:
+            replica = InstrumentedPaymentRepository(SQLPaymentRepository(read_session), "sql_replica")
+        repository = RoutingPaymentRepository(repository, replica)
+    if settings.PAYMENT_ARCHIVE_ENABLED:
+        if repository_type == RepositoryType.SQL:
+            # Archived payments never change, so replication lag doesn't matter for them
+            archive = SQLPaymentRepository(read_session or db_session, PaymentArchiveModel)
+        else:
+            from app.adapters.models.nosql.connection import get_payment_archive_collection
+            from .nosql_payment_repository import NoSQLPaymentRepository
+
+            archive = NoSQLPaymentRepository(get_payment_archive_collection())
+        archive = InstrumentedPaymentRepository(archive, f"{repository_type.value}_archive")
+        repository = ArchiveFallbackPaymentRepository(repository, archive)
+    return PublishingPaymentRepository(CachingPaymentRepository(repository))
+
+
+def get_payment_archiver(
+    repository_type: RepositoryType, db_session: Optional[AsyncSession] = None
+) -> PaymentArchiver:
+    if repository_type == RepositoryType.SQL:
+        if not db_session:
+            raise ValueError("DB session is required for SQL repository")
+        return SQLPaymentArchiver(db_session)
+    else:
+        from .nosql_payment_archiver import NoSQLPaymentArchiver
+
+        return NoSQLPaymentArchiver()
+
+
+def get_outbox_repository(
+    repository_type: RepositoryType, db_session: Optional[AsyncSession] = None
+) -> OutboxRepository:
+    if repository_type == RepositoryType.SQL:
+        if not db_session:
+            raise ValueError("DB session is required for SQL repository")
+        return SQLOutboxRepository(db_session)
+    else:
+        from .nosql_outbox_repository import NoSQLOutboxRepository
+
+        return NoSQLOutboxRepository()
+
+
+def get_idempotency_repository(
+    repository_type: RepositoryType, db_session: Optional[AsyncSession] = None
+) -> IdempotencyRepository:
+    if repository_type == RepositoryType.SQL:
+        if not db_session:
+            raise ValueError("DB session is required for SQL repository")
+        return SQLIdempotencyRepository(db_session)
+    else:
+        from .nosql_idempotency_repository import NoSQLIdempotencyRepository
+
+        return NoSQLIdempotencyRepository()
@@ -0,0 +1,103 @@
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.domain.entities.payment import PaymentDailyTotal, PaymentDb, PaymentFilter
+from app.domain.interfaces.payment_repository import PaymentRepository
+from .delegating_payment_repository import DelegatingPaymentRepository
+
+
+def _merge_by_id(hot: Iterable[PaymentDb], archived: Iterable[PaymentDb]) -> List[PaymentDb]:
+    """Payments from both, by ID; a payment found in both (archived, then changed) is taken from `hot`"""
+    payments = {payment.id: payment for payment in archived}
+    payments.update((payment.id, payment) for payment in hot)
+    return [payments[payment_id] for payment_id in sorted(payments)]
+
+
+class ArchiveFallbackPaymentRepository(DelegatingPaymentRepository):
+    """
+    Reads payments from the hot repository and, on a miss, from the archive
+    of settled payments (see `PaymentArchiver`). Listings, streams and
+    reports include both. Archived payments are settled and read-only, so
+    writes only go to the hot repository: a write to a payment found in the
+    archive returns None, as for a missing payment.
+    """
+
+    def __init__(self, repository: PaymentRepository, archive: PaymentRepository):
+        super().__init__(repository)
+        self.archive = archive
+
+    async def get_all(self) -> List[PaymentDb]:
+        return _merge_by_id(await self.repository.get_all(), await self.archive.get_all())
+
+    async def list_page(
+        self, limit: int, after_id: Optional[int] = None, filters: Optional[PaymentFilter] = None
+    ) -> List[PaymentDb]:
+        hot = await self.repository.list_page(limit, after_id, filters)
+        archived = await self.archive.list_page(limit, after_id, filters)
+        return _merge_by_id(hot, archived)[:limit]
+
+    async def iter_all(
+        self, filters: Optional[PaymentFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[PaymentDb]:
+        archived = self._iter_archive(filters, batch_size)
+        older = await anext(archived, None)
+        async for payment in self.repository.iter_all(filters, batch_size):
+            while older is not None and older.id <= payment.id:
+                if older.id < payment.id:
+                    yield older
+                older = await anext(archived, None)
+            yield payment
+        while older is not None:
+            yield older
+            older = await anext(archived, None)
+
+    async def daily_totals(self, filters: Optional[PaymentFilter] = None) -> List[PaymentDailyTotal]:
+        totals: Dict[Tuple, PaymentDailyTotal] = {}
+        for total in await self.repository.daily_totals(filters) + await self.archive.daily_totals(filters):
+            key = (total.day, total.status)
+            if key in totals:
+                combined = totals[key]
+                total = PaymentDailyTotal(
+                    day=total.day,
+                    status=total.status,
+                    count=combined.count + total.count,
+                    amount=combined.amount + total.amount,
+                )
+            totals[key] = total
+        return [totals[key] for key in sorted(totals)]
+
+    async def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        payment = await self.repository.get_by_id(payment_id)
+        if payment is None:
+            payment = await self.archive.get_by_id(payment_id)
+        return payment
+
+    async def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        payment = await self.repository.get_by_order_id(order_id)
+        if payment is None:
+            payment = await self.archive.get_by_order_id(order_id)
+        return payment
+
+    async def get_by_order_ids(self, order_ids: List[int]) -> List[PaymentDb]:
+        payments = await self.repository.get_by_order_ids(order_ids)
+        found = {payment.order_id for payment in payments}
+        missing = [order_id for order_id in order_ids if order_id not in found]
+        if missing:
+            payments.extend(await self.archive.get_by_order_ids(missing))
+        return payments
+
+    async def get_by_external_id(self, external_id: str) -> Optional[PaymentDb]:
+        payment = await self.repository.get_by_external_id(external_id)
+        if payment is None:
+            payment = await self.archive.get_by_external_id(external_id)
+        return payment
+
+    async def _iter_archive(self, filters: Optional[PaymentFilter], batch_size: int) -> AsyncIterator[PaymentDb]:
+        # Read a page at a time, so only the hot stream holds a cursor open
+        after_id = None
+        while True:
+            page = await self.archive.list_page(batch_size, after_id, filters)
+            for payment in page:
+                yield payment
+            if len(page) < batch_size:
+                return
+            after_id = page[-1].id
@@ -0,0 +1,75 @@
+from typing import Dict, List, Optional
+
+from app.adapters.cache.payment_cache import NOT_CACHED, PaymentCache, payment_cache
+from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+from .delegating_payment_repository import DelegatingPaymentRepository
+
+
+class CachingPaymentRepository(DelegatingPaymentRepository):
+    """
+    Read-through cache for lookups by payment ID and by order ID.
+    Writes go to the wrapped repository and then invalidate both keys of
+    every payment they touched. Cached payments are shared between requests
+    and must not be mutated.
+
+    Orders without a payment are never cached: the cache is per process, so
+    a cached miss would hide a payment another worker just created, and
+    "no payment yet" is what guards creating one.
+    """
+
+    def __init__(self, repository: PaymentRepository, cache: PaymentCache = payment_cache):
+        super().__init__(repository)
+        self.cache = cache
+
+    async def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        key = ("id", payment_id)
+        payment = self.cache.get(key)
+        if payment is NOT_CACHED:
+            generation = self.cache.generation
+            payment = await self.repository.get_by_id(payment_id)
+            self.cache.set(key, payment, generation)
+        return payment
+
+    async def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        key = ("order", order_id)
+        payment = self.cache.get(key)
+        if payment is NOT_CACHED:
+            generation = self.cache.generation
+            payment = await self.repository.get_by_order_id(order_id)
+            if payment is not None:
+                self.cache.set(key, payment, generation)
+        return payment
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        created = await self.repository.create(payment)
+        self._invalidate(created)
+        return created
+
+    async def create_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        created = await self.repository.create_many(payments)
+        for payment in created:
+            self._invalidate(payment)
+        return created
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        updated = await self.repository.update_status(payment_id, status)
+        self._invalidate(updated, payment_id)
+        return updated
+
+    async def update_statuses_by_external_id(self, statuses: Dict[str, PaymentStatus]) -> List[PaymentDb]:
+        updated = await self.repository.update_statuses_by_external_id(statuses)
+        for payment in updated:
+            self._invalidate(payment)
+        return updated
+
+    async def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        updated = await self.repository.update_external_id(payment_id, external_id)
+        self._invalidate(updated, payment_id)
+        return updated
+
+    def _invalidate(self, payment: Optional[PaymentDb], payment_id: Optional[int] = None) -> None:
+        if payment is None:
+            self.cache.invalidate(("id", payment_id))
+        else:
+            self.cache.invalidate(("id", payment.id), ("order", payment.order_id))
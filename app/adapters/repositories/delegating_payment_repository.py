@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.domain.entities.payment import Payment, PaymentDailyTotal, PaymentDb, PaymentFilter, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+
+
+class DelegatingPaymentRepository(PaymentRepository):
+    """
+    Passes every call through to the wrapped repository. Base class of the
+    repository decorators, which override only the calls they change.
+    """
+
+    def __init__(self, repository: PaymentRepository):
+        self.repository = repository
+
+    async def get_all(self) -> List[PaymentDb]:
+        return await self.repository.get_all()
+
+    async def list_page(
+        self, limit: int, after_id: Optional[int] = None, filters: Optional[PaymentFilter] = None
+    ) -> List[PaymentDb]:
+        return await self.repository.list_page(limit, after_id, filters)
+
+    def iter_all(
+        self, filters: Optional[PaymentFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[PaymentDb]:
+        return self.repository.iter_all(filters, batch_size)
+
+    async def daily_totals(self, filters: Optional[PaymentFilter] = None) -> List[PaymentDailyTotal]:
+        return await self.repository.daily_totals(filters)
+
+    async def list_updated_since(self, since: datetime, limit: int) -> List[PaymentDb]:
+        return await self.repository.list_updated_since(since, limit)
+
+    async def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        return await self.repository.get_by_id(payment_id)
+
+    async def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        return await self.repository.get_by_order_id(order_id)
+
+    async def get_by_order_ids(self, order_ids: List[int]) -> List[PaymentDb]:
+        return await self.repository.get_by_order_ids(order_ids)
+
+    async def get_by_external_id(self, external_id: str) -> Optional[PaymentDb]:
+        return await self.repository.get_by_external_id(external_id)
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        return await self.repository.create(payment)
+
+    async def create_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        return await self.repository.create_many(payments)
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        return await self.repository.update_status(payment_id, status)
+
+    async def update_statuses_by_external_id(self, statuses: Dict[str, PaymentStatus]) -> List[PaymentDb]:
+        return await self.repository.update_statuses_by_external_id(statuses)
+
+    async def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        return await self.repository.update_external_id(payment_id, external_id)
@@ -0,0 +1,25 @@
+from typing import Optional
+
+from app.adapters.workers.group_commit_writer import GroupCommitWriter
+from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+from .delegating_payment_repository import DelegatingPaymentRepository
+
+
+class GroupCommitPaymentRepository(DelegatingPaymentRepository):
+    """
+    Sends single payment creations and status changes to a `GroupCommitWriter`,
+    which commits them together with those of other requests. They are
+    committed in the writer's own session, not the request's. Everything
+    else goes to the wrapped repository.
+    """
+
+    def __init__(self, repository: PaymentRepository, writer: GroupCommitWriter):
+        super().__init__(repository)
+        self.writer = writer
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        return await self.writer.create(payment)
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        return await self.writer.update_status(payment_id, status)
@@ -0,0 +1,81 @@
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.adapters.metrics.instruments import repository_call_duration, repository_call_errors
+from app.domain.entities.payment import Payment, PaymentDailyTotal, PaymentDb, PaymentFilter, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+from .delegating_payment_repository import DelegatingPaymentRepository
+
+
+class InstrumentedPaymentRepository(DelegatingPaymentRepository):
+    """Records the latency and failures of every call to the wrapped repository"""
+
+    def __init__(self, repository: PaymentRepository, backend: str):
+        super().__init__(repository)
+        self.backend = backend
+
+    async def get_all(self) -> List[PaymentDb]:
+        return await self._call("get_all")
+
+    async def list_page(
+        self, limit: int, after_id: Optional[int] = None, filters: Optional[PaymentFilter] = None
+    ) -> List[PaymentDb]:
+        return await self._call("list_page", limit, after_id, filters)
+
+    async def iter_all(
+        self, filters: Optional[PaymentFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[PaymentDb]:
+        # Timed over the whole iteration, including time the consumer spends between rows
+        started = time.perf_counter()
+        try:
+            async for payment in self.repository.iter_all(filters, batch_size):
+                yield payment
+        except Exception:
+            repository_call_errors.labels(self.backend, "iter_all").inc()
+            raise
+        finally:
+            repository_call_duration.labels(self.backend, "iter_all").observe(time.perf_counter() - started)
+
+    async def daily_totals(self, filters: Optional[PaymentFilter] = None) -> List[PaymentDailyTotal]:
+        return await self._call("daily_totals", filters)
+
+    async def list_updated_since(self, since: datetime, limit: int) -> List[PaymentDb]:
+        return await self._call("list_updated_since", since, limit)
+
+    async def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        return await self._call("get_by_id", payment_id)
+
+    async def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        return await self._call("get_by_order_id", order_id)
+
+    async def get_by_order_ids(self, order_ids: List[int]) -> List[PaymentDb]:
+        return await self._call("get_by_order_ids", order_ids)
+
+    async def get_by_external_id(self, external_id: str) -> Optional[PaymentDb]:
+        return await self._call("get_by_external_id", external_id)
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        return await self._call("create", payment)
+
+    async def create_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        return await self._call("create_many", payments)
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        return await self._call("update_status", payment_id, status)
+
+    async def update_statuses_by_external_id(self, statuses: Dict[str, PaymentStatus]) -> List[PaymentDb]:
+        return await self._call("update_statuses_by_external_id", statuses)
+
+    async def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        return await self._call("update_external_id", payment_id, external_id)
+
+    async def _call(self, method: str, *args):
+        started = time.perf_counter()
+        try:
+            return await getattr(self.repository, method)(*args)
+        except Exception:
+            repository_call_errors.labels(self.backend, method).inc()
+            raise
+        finally:
+            repository_call_duration.labels(self.backend, method).observe(time.perf_counter() - started)
@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Optional, Set
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.adapters.models.nosql.connection import get_idempotency_collection
+from app.domain.entities.idempotency import IdempotencyRecord
+from app.domain.interfaces.idempotency_repository import IdempotencyRepository
+
+
+class NoSQLIdempotencyRepository(IdempotencyRepository):
+    """Records keyed by `_id`; a TTL index lets the server drop expired ones"""
+
+    _indexed_collections: Set[str] = set()
+
+    def __init__(self, collection: Optional[AsyncIOMotorCollection] = None):
+        if collection is None:
+            collection = get_idempotency_collection()
+        self.collection = collection
+
+    async def claim(self, key: str, fingerprint: str, expires_at: datetime) -> Optional[IdempotencyRecord]:
+        await self._ensure_indexes()
+        try:
+            await self.collection.insert_one(
+                {"_id": key, "fingerprint": fingerprint, "status_code": None, "body": None, "expires_at": expires_at}
+            )
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # Expired records, including claims whose lease ran out, are taken over.
+        # The TTL monitor runs about once a minute, so they can linger
+        replaced = await self.collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$lte": datetime.utcnow()}},
+            {"$set": {"fingerprint": fingerprint, "status_code": None, "body": None, "expires_at": expires_at}},
+        )
+        if replaced is not None:
+            return None
+        record = await self.collection.find_one({"_id": key})
+        return self._map_to_entity(record) if record else None
+
+    async def complete(self, key: str, status_code: int, body: str, expires_at: datetime) -> IdempotencyRecord:
+        record = await self.collection.find_one_and_update(
+            {"_id": key},
+            {"$set": {"status_code": status_code, "body": body, "expires_at": expires_at}},
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._map_to_entity(record)
+
+    async def release(self, key: str) -> None:
+        await self.collection.delete_one({"_id": key, "status_code": None})
+
+    async def purge_expired(self, now: datetime) -> int:
+        result = await self.collection.delete_many({"expires_at": {"$lte": now}})
+        return result.deleted_count
+
+    async def _ensure_indexes(self) -> None:
+        if self.collection.full_name not in self._indexed_collections:
+            await self.collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+            self._indexed_collections.add(self.collection.full_name)
+
+    def _map_to_entity(self, data: dict) -> IdempotencyRecord:
+        return IdempotencyRecord(
+            key=data["_id"],
+            fingerprint=data["fingerprint"],
+            status_code=data.get("status_code"),
+            body=data.get("body"),
+            expires_at=data["expires_at"],
+        )
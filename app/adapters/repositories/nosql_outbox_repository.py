@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.adapters.models.nosql.connection import get_outbox_dead_letter_collection, get_payment_collection
+from app.domain.entities.outbox import OutboxMessage
+from app.domain.entities.payment import PaymentStatus
+from app.domain.interfaces.outbox_repository import OutboxRepository
+
+
+class NoSQLOutboxRepository(OutboxRepository):
+    """
+    Reads the outbox embedded in payment documents (the `outbox` array).
+    There is one payment per order, so keeping the array in insertion order
+    and only delivering its head preserves per-order ordering.
+    """
+
+    def __init__(
+        self,
+        collection: Optional[AsyncIOMotorCollection] = None,
+        dead_letters: Optional[AsyncIOMotorCollection] = None,
+    ):
+        if collection is None:
+            collection = get_payment_collection()
+        if dead_letters is None:
+            dead_letters = get_outbox_dead_letter_collection()
+        self.collection = collection
+        self.dead_letters = dead_letters
+
+    async def claim_due(self, now: datetime, limit: int, claimed_until: datetime) -> List[OutboxMessage]:
+        payments = self.collection.find(
+            {"outbox.next_attempt_at": {"$lte": now}},
+            {"order_id": 1, "outbox": 1},
+        ).limit(limit)
+        due = [
+            (payment, payment["outbox"][0])
+            async for payment in payments
+            if payment["outbox"][0]["next_attempt_at"] <= now
+        ]
+
+        async def claim(payment: dict, head: dict) -> bool:
+            # Conditional on the head still being due, so only one dispatcher wins it
+            result = await self.collection.update_one(
+                {"_id": payment["_id"], "outbox.0.id": head["id"], "outbox.0.next_attempt_at": {"$lte": now}},
+                {"$set": {"outbox.0.next_attempt_at": claimed_until}},
+            )
+            return result.modified_count == 1
+
+        claimed = await asyncio.gather(*(claim(payment, head) for payment, head in due))
+        return [self._map_to_entity(payment, head) for (payment, head), won in zip(due, claimed) if won]
+
+    async def mark_delivered(self, messages: List[OutboxMessage]) -> None:
+        if not messages:
+            return
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": message.payment_id, "outbox.0.id": message.id},
+                    {"$pop": {"outbox": -1}},
+                )
+                for message in messages
+            ],
+            ordered=False,
+        )
+
+    async def reschedule(self, message: OutboxMessage, next_attempt_at: datetime) -> None:
+        await self.collection.update_one(
+            {"_id": message.payment_id, "outbox.0.id": message.id},
+            {
+                "$set": {"outbox.0.next_attempt_at": next_attempt_at},
+                "$inc": {"outbox.0.attempts": 1},
+            },
+        )
+
+    async def dead_letter(self, message: OutboxMessage) -> None:
+        # Copied first and keyed by the message, so a retry after a crash in between is harmless
+        try:
+            await self.dead_letters.insert_one(
+                {
+                    "_id": message.id,
+                    "order_id": message.order_id,
+                    "payment_id": message.payment_id,
+                    "payment_status": message.payment_status.value,
+                    "attempts": message.attempts + 1,
+                    "created_at": datetime.utcnow(),
+                }
+            )
+        except DuplicateKeyError:
+            pass
+        await self.collection.update_one(
+            {"_id": message.payment_id, "outbox.0.id": message.id},
+            {"$pop": {"outbox": -1}},
+        )
+
+    def _map_to_entity(self, payment: dict, message: dict) -> OutboxMessage:
+        return OutboxMessage(
+            id=message["id"],
+            order_id=payment["order_id"],
+            payment_id=payment["_id"],
+            payment_status=PaymentStatus(message["payment_status"]),
+            attempts=message["attempts"],
+            next_attempt_at=message["next_attempt_at"],
+        )
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReplaceOne
+
+from app.adapters.models.nosql.connection import get_payment_archive_collection, get_payment_collection
+from app.domain.interfaces.payment_archiver import SETTLED_STATUSES, PaymentArchiver
+
+
+class NoSQLPaymentArchiver(PaymentArchiver):
+    def __init__(
+        self,
+        collection: Optional[AsyncIOMotorCollection] = None,
+        archive: Optional[AsyncIOMotorCollection] = None,
+    ):
+        self.collection = collection if collection is not None else get_payment_collection()
+        self.archive = archive if archive is not None else get_payment_archive_collection()
+
+    async def archive_batch(self, settled_before: datetime, limit: int) -> int:
+        query = {
+            "status": {"$in": [status.value for status in SETTLED_STATUSES]},
+            "created_at": {"$lt": settled_before},
+            "updated_at": {"$lt": settled_before},
+            # No notification left in the embedded outbox (an empty or missing array);
+            # the outbox dispatcher drains it when REPOSITORY_TYPE is "nosql"
+            "outbox.0": {"$exists": False},
+        }
+        payments = await self.collection.find(query, projection={"outbox": False}).limit(limit).to_list(length=None)
+        if not payments:
+            return 0
+
+        # Upserts, so a run that stopped between the copy and the delete can be repeated
+        await self.archive.bulk_write(
+            [ReplaceOne({"_id": payment["_id"]}, payment, upsert=True) for payment in payments],
+            ordered=False,
+        )
+        # Payments changed since they were read stay (and are copied again by the next run)
+        result = await self.collection.delete_many({**query, "_id": {"$in": [payment["_id"] for payment in payments]}})
+        return result.deleted_count
@@ -1,38 +1,125 @@
+import uuid
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Set
 
-from pymongo.collection import Collection
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
 
-from app.adapters.models.nosql.connection import payment_collection
-from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+from app.adapters.models.nosql.connection import ensure_indexes, get_payment_collection
+from app.adapters.models.nosql.sequence import SequenceAllocator
+from app.config import settings
+from app.domain.entities.payment import Payment, PaymentDailyTotal, PaymentDb, PaymentFilter, PaymentStatus
 from app.domain.interfaces.payment_repository import PaymentRepository
 
 
+CENTS = Decimal("0.01")
+
+
 class NoSQLPaymentRepository(PaymentRepository):
-    def __init__(self, collection: Collection = payment_collection):
+    _indexed_collections: Set[str] = set()
+    _id_allocators: Dict[str, SequenceAllocator] = {}
+
+    def __init__(self, collection: Optional[AsyncIOMotorCollection] = None):
+        if collection is None:
+            collection = get_payment_collection()
         self.collection = collection
+        if collection.full_name not in self._id_allocators:
+            self._id_allocators[collection.full_name] = SequenceAllocator(
+                collection, settings.NOSQL_ID_BLOCK_SIZE
+            )
+        self.id_allocator = self._id_allocators[collection.full_name]
+
+    async def get_all(self) -> List[PaymentDb]:
+        await self._ensure_indexes()
+        payments = await self.collection.find().to_list(length=None)
+        return [self._map_to_entity(payment) for payment in payments]
+
+    async def list_page(
+        self, limit: int, after_id: Optional[int] = None, filters: Optional[PaymentFilter] = None
+    ) -> List[PaymentDb]:
+        await self._ensure_indexes()
+        query = self._build_query(filters)
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        payments = await self.collection.find(query).sort("_id", ASCENDING).limit(limit).to_list(length=None)
+        return [self._map_to_entity(payment) for payment in payments]
+
+    async def iter_all(
+        self, filters: Optional[PaymentFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[PaymentDb]:
+        await self._ensure_indexes()
+        cursor = self.collection.find(self._build_query(filters)).sort("_id", ASCENDING)
+        async for payment in cursor.batch_size(batch_size):
+            yield self._map_to_entity(payment)
+
+    async def daily_totals(self, filters: Optional[PaymentFilter] = None) -> List[PaymentDailyTotal]:
+        await self._ensure_indexes()
+        pipeline = [
+            {"$match": self._build_query(filters)},
+            {
+                "$group": {
+                    "_id": {
+                        "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                        "status": "$status",
+                    },
+                    "count": {"$sum": 1},
+                    "amount": {"$sum": "$amount"},
+                }
+            },
+            {"$sort": {"_id.day": ASCENDING, "_id.status": ASCENDING}},
+        ]
+        groups = await self.collection.aggregate(pipeline).to_list(length=None)
+        return [
+            PaymentDailyTotal(
+                day=group["_id"]["day"],
+                status=group["_id"]["status"],
+                count=group["count"],
+                # Amounts are stored as doubles, so their sum is rounded back to cents
+                amount=Decimal(str(group["amount"])).quantize(CENTS),
+            )
+            for group in groups
+        ]
 
-    def get_all(self) -> List[PaymentDb]:
-        payments = list(self.collection.find())
+    async def list_updated_since(self, since: datetime, limit: int) -> List[PaymentDb]:
+        await self._ensure_indexes()
+        payments = await (
+            self.collection.find({"updated_at": {"$gte": since}}, projection={"outbox": False})
+            .sort("updated_at", ASCENDING)
+            .limit(limit)
+            .to_list(length=None)
+        )
         return [self._map_to_entity(payment) for payment in payments]
 
-    def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
-        payment = self.collection.find_one({"_id": payment_id})
+    async def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        await self._ensure_indexes()
+        payment = await self.collection.find_one({"_id": payment_id})
         return self._map_to_entity(payment) if payment else None
 
-    def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
-        payment = self.collection.find_one({"order_id": order_id})
+    async def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        await self._ensure_indexes()
+        payment = await self.collection.find_one({"order_id": order_id})
         return self._map_to_entity(payment) if payment else None
 
-    def create(self, payment: Payment) -> PaymentDb:
-        # Find the highest id to simulate auto-increment
-        last_payment = self.collection.find_one(sort=[("_id", -1)])
-        next_id = 1 if not last_payment else last_payment["_id"] + 1
-        
+    async def get_by_order_ids(self, order_ids: List[int]) -> List[PaymentDb]:
+        if not order_ids:
+            return []
+        await self._ensure_indexes()
+        payments = await self.collection.find(
+            {"order_id": {"$in": list(order_ids)}}, projection={"outbox": False}
+        ).to_list(length=None)
+        return [self._map_to_entity(payment) for payment in payments]
+
+    async def get_by_external_id(self, external_id: str) -> Optional[PaymentDb]:
+        await self._ensure_indexes()
+        payment = await self.collection.find_one({"external_id": external_id})
+        return self._map_to_entity(payment) if payment else None
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        await self._ensure_indexes()
         now = datetime.utcnow()
         payment_dict = {
-            "_id": next_id,
+            "_id": await self.id_allocator.next_id(),
             "order_id": payment.order_id,
             "amount": float(payment.amount),
             "status": payment.status,
@@ -41,35 +128,117 @@ class NoSQLPaymentRepository(PaymentRepository):
             "updated_at": now
         }
         
-        self.collection.insert_one(payment_dict)
+        await self.collection.insert_one(payment_dict)
         return self._map_to_entity(payment_dict)
 
-    def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+    async def create_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        if not payments:
+            return []
+
+        await self._ensure_indexes()
+        now = datetime.utcnow()
+        payment_dicts = [
+            {
+                "_id": await self.id_allocator.next_id(),
+                "order_id": payment.order_id,
+                "amount": float(payment.amount),
+                "status": payment.status,
+                "external_id": payment.external_id,
+                "created_at": now,
+                "updated_at": now
+            }
+            for payment in payments
+        ]
+
+        await self.collection.insert_many(payment_dicts)
+        return [self._map_to_entity(payment) for payment in payment_dicts]
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        await self._ensure_indexes()
         now = datetime.utcnow()
-        result = self.collection.update_one(
+        # Pending notifications to the orders service are embedded in the payment
+        # document, so the status change and its outbox entry are written atomically
+        payment = await self.collection.find_one_and_update(
             {"_id": payment_id},
-            {"$set": {"status": status, "updated_at": now}}
+            {
+                "$set": {"status": status, "updated_at": now},
+                "$push": {"outbox": self._outbox_message(status, now)},
+            },
+            projection={"outbox": False},
+            return_document=ReturnDocument.AFTER,
         )
-        
-        if result.modified_count == 0:
-            return None
-            
-        return self.get_by_id(payment_id)
-    
-    def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        return self._map_to_entity(payment) if payment else None
+
+    async def update_statuses_by_external_id(self, statuses: Dict[str, PaymentStatus]) -> List[PaymentDb]:
+        if not statuses:
+            return []
+
+        await self._ensure_indexes()
+        payments = await self.collection.find({"external_id": {"$in": list(statuses)}}).to_list(length=None)
+        if not payments:
+            return []
+
+        now = datetime.utcnow()
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": payment["_id"]},
+                    {
+                        "$set": {"status": statuses[payment["external_id"]], "updated_at": now},
+                        "$push": {"outbox": self._outbox_message(statuses[payment["external_id"]], now)},
+                    },
+                )
+                for payment in payments
+            ],
+            ordered=False,
+        )
+
+        for payment in payments:
+            payment.update(status=statuses[payment["external_id"]], updated_at=now)
+        return [self._map_to_entity(payment) for payment in payments]
+
+    async def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        await self._ensure_indexes()
         now = datetime.utcnow()
-        result = self.collection.update_one(
+        payment = await self.collection.find_one_and_update(
             {"_id": payment_id},
-            {"$set": {"external_id": external_id, "updated_at": now}}
+            {"$set": {"external_id": external_id, "updated_at": now}},
+            projection={"outbox": False},
+            return_document=ReturnDocument.AFTER,
         )
-        
-        if result.modified_count == 0:
-            return None
-            
-        return self.get_by_id(payment_id)
-    
+        return self._map_to_entity(payment) if payment else None
+
+    async def _ensure_indexes(self) -> None:
+        if self.collection.full_name not in self._indexed_collections:
+            await ensure_indexes(self.collection)
+            self._indexed_collections.add(self.collection.full_name)
+
+    def _outbox_message(self, status: PaymentStatus, now: datetime) -> dict:
+        return {
+            "id": uuid.uuid4().hex,
+            "payment_status": status,
+            "attempts": 0,
+            "next_attempt_at": now,
+        }
+
+    def _build_query(self, filters: Optional[PaymentFilter]) -> dict:
+        query = {}
+        if not filters:
+            return query
+        if filters.status:
+            query["status"] = filters.status.value
+        created_at = {}
+        if filters.created_from:
+            created_at["$gte"] = filters.created_from
+        if filters.created_to:
+            created_at["$lt"] = filters.created_to
+        if created_at:
+            query["created_at"] = created_at
+        return query
+
     def _map_to_entity(self, data: dict) -> PaymentDb:
-        return PaymentDb(
+        # Documents are written by this repository only, so they are not validated again
+        return PaymentDb.from_stored(
             id=data["_id"],
             order_id=data["order_id"],
             amount=Decimal(str(data["amount"])),
@@ -0,0 +1,43 @@
+from typing import Dict, List, Optional
+
+from app.adapters.events.payment_events import PaymentEvents, payment_events
+from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+from .delegating_payment_repository import DelegatingPaymentRepository
+
+
+class PublishingPaymentRepository(DelegatingPaymentRepository):
+    """Publishes every payment a write returns, once the wrapped repository has committed it"""
+
+    def __init__(self, repository: PaymentRepository, events: PaymentEvents = payment_events):
+        super().__init__(repository)
+        self.events = events
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        created = await self.repository.create(payment)
+        self.events.publish(created)
+        return created
+
+    async def create_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        created = await self.repository.create_many(payments)
+        for payment in created:
+            self.events.publish(payment)
+        return created
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        updated = await self.repository.update_status(payment_id, status)
+        if updated:
+            self.events.publish(updated)
+        return updated
+
+    async def update_statuses_by_external_id(self, statuses: Dict[str, PaymentStatus]) -> List[PaymentDb]:
+        updated = await self.repository.update_statuses_by_external_id(statuses)
+        for payment in updated:
+            self.events.publish(payment)
+        return updated
+
+    async def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        updated = await self.repository.update_external_id(payment_id, external_id)
+        if updated:
+            self.events.publish(updated)
+        return updated
@@ -0,0 +1,109 @@
+import time
+from typing import AsyncIterator, Callable, Dict, Hashable, List, Optional
+
+from app.adapters.cache.ttl_cache import TTLCache
+from app.config import settings
+from app.domain.entities.payment import Payment, PaymentDailyTotal, PaymentDb, PaymentFilter, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+from .delegating_payment_repository import DelegatingPaymentRepository
+
+# Writes remembered at most; under heavier write bursts the oldest are forgotten early
+RECENT_WRITES_MAX_SIZE = 100000
+
+
+class RecentWrites:
+    """
+    Payments written through this process in the last `window` seconds, by
+    ("id", id) and ("order", order_id). Reads of those keys go to the
+    primary until the replica has had `window` seconds to catch up.
+    """
+
+    def __init__(self, window: float, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.entries = TTLCache(max_size=RECENT_WRITES_MAX_SIZE if window > 0 else 0, ttl=window, clock=clock)
+
+    def add(self, payment: PaymentDb) -> None:
+        self.entries.set(("id", payment.id), True)
+        self.entries.set(("order", payment.order_id), True)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.entries.get(key, False)
+
+
+recent_writes = RecentWrites(settings.SQL_READ_YOUR_WRITES_WINDOW)
+
+
+class RoutingPaymentRepository(DelegatingPaymentRepository):
+    """
+    Sends reads to a replica and everything else to the primary (the
+    wrapped repository).
+
+    Listing, streaming and reporting always read the replica. Lookups by
+    payment or order ID read the primary when that payment was written
+    recently (see `RecentWrites`), so clients see their own changes.
+    Lookups that precede a write (by external ID for webhooks, by order IDs
+    for bulk creation) always read the primary.
+    """
+
+    def __init__(
+        self,
+        primary: PaymentRepository,
+        replica: PaymentRepository,
+        recent: RecentWrites = recent_writes,
+    ):
+        super().__init__(primary)
+        self.replica = replica
+        self.recent = recent
+
+    async def get_all(self) -> List[PaymentDb]:
+        return await self.replica.get_all()
+
+    async def list_page(
+        self, limit: int, after_id: Optional[int] = None, filters: Optional[PaymentFilter] = None
+    ) -> List[PaymentDb]:
+        return await self.replica.list_page(limit, after_id, filters)
+
+    def iter_all(
+        self, filters: Optional[PaymentFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[PaymentDb]:
+        return self.replica.iter_all(filters, batch_size)
+
+    async def daily_totals(self, filters: Optional[PaymentFilter] = None) -> List[PaymentDailyTotal]:
+        return await self.replica.daily_totals(filters)
+
+    async def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        repository = self.repository if ("id", payment_id) in self.recent else self.replica
+        return await repository.get_by_id(payment_id)
+
+    async def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        repository = self.repository if ("order", order_id) in self.recent else self.replica
+        return await repository.get_by_order_id(order_id)
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        created = await self.repository.create(payment)
+        self.recent.add(created)
+        return created
+
+    async def create_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        created = await self.repository.create_many(payments)
+        for payment in created:
+            self.recent.add(payment)
+        return created
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        updated = await self.repository.update_status(payment_id, status)
+        if updated:
+            self.recent.add(updated)
+        return updated
+
+    async def update_statuses_by_external_id(self, statuses: Dict[str, PaymentStatus]) -> List[PaymentDb]:
+        updated = await self.repository.update_statuses_by_external_id(statuses)
+        for payment in updated:
+            self.recent.add(payment)
+        return updated
+
+    async def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        updated = await self.repository.update_external_id(payment_id, external_id)
+        if updated:
+            self.recent.add(updated)
+        return updated
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.models.sql.idempotency_model import IdempotencyKeyModel
+from app.domain.entities.idempotency import IdempotencyRecord
+from app.domain.interfaces.idempotency_repository import IdempotencyRepository
+
+
+class SQLIdempotencyRepository(IdempotencyRepository):
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def claim(self, key: str, fingerprint: str, expires_at: datetime) -> Optional[IdempotencyRecord]:
+        now = datetime.utcnow()
+        # An expired record doesn't hold its key, nor does a claim whose lease ran out
+        await self.db_session.execute(
+            delete(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.key == key, IdempotencyKeyModel.expires_at <= now
+            )
+        )
+        try:
+            await self.db_session.execute(
+                insert(IdempotencyKeyModel).values(key=key, fingerprint=fingerprint, expires_at=expires_at)
+            )
+            await self.db_session.commit()
+            return None
+        except IntegrityError:
+            # Claimed by a concurrent request, possibly in another worker
+            await self.db_session.rollback()
+
+        record = await self.db_session.scalar(select(IdempotencyKeyModel).where(IdempotencyKeyModel.key == key))
+        return self._map_to_entity(record) if record else None
+
+    async def complete(self, key: str, status_code: int, body: str, expires_at: datetime) -> IdempotencyRecord:
+        await self.db_session.execute(
+            update(IdempotencyKeyModel)
+            .where(IdempotencyKeyModel.key == key)
+            .values(status_code=status_code, body=body, expires_at=expires_at, updated_at=datetime.utcnow())
+        )
+        await self.db_session.commit()
+        record = await self.db_session.scalar(select(IdempotencyKeyModel).where(IdempotencyKeyModel.key == key))
+        return self._map_to_entity(record)
+
+    async def release(self, key: str) -> None:
+        # The failed request may have left the session mid-transaction
+        await self.db_session.rollback()
+        await self.db_session.execute(
+            delete(IdempotencyKeyModel).where(
+                IdempotencyKeyModel.key == key, IdempotencyKeyModel.status_code.is_(None)
+            )
+        )
+        await self.db_session.commit()
+
+    async def purge_expired(self, now: datetime) -> int:
+        result = await self.db_session.execute(
+            delete(IdempotencyKeyModel).where(IdempotencyKeyModel.expires_at <= now)
+        )
+        await self.db_session.commit()
+        return result.rowcount
+
+    def _map_to_entity(self, model: IdempotencyKeyModel) -> IdempotencyRecord:
+        return IdempotencyRecord(
+            key=model.key,
+            fingerprint=model.fingerprint,
+            status_code=model.status_code,
+            body=model.body,
+            expires_at=model.expires_at,
+        )
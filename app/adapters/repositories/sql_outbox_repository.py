@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import delete, exists, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.adapters.models.sql.outbox_model import OutboxDeadLetterModel, OutboxModel
+from app.domain.entities.outbox import OutboxMessage
+from app.domain.entities.payment import PaymentStatus
+from app.domain.interfaces.outbox_repository import OutboxRepository
+
+
+class SQLOutboxRepository(OutboxRepository):
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def claim_due(self, now: datetime, limit: int, claimed_until: datetime) -> List[OutboxMessage]:
+        earlier = aliased(OutboxModel)
+        has_earlier = exists().where(
+            earlier.order_id == OutboxModel.order_id, earlier.id < OutboxModel.id
+        )
+        ids = (
+            await self.db_session.scalars(
+                select(OutboxModel.id)
+                .where(OutboxModel.next_attempt_at <= now, ~has_earlier)
+                .order_by(OutboxModel.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not ids:
+            await self.db_session.commit()
+            return []
+
+        # Still due only if no other dispatcher claimed it first (where rows can't be locked)
+        claim = (
+            update(OutboxModel)
+            .where(OutboxModel.id.in_(ids), OutboxModel.next_attempt_at <= now)
+            .values(next_attempt_at=claimed_until)
+        )
+        columns = OutboxModel.__table__.columns
+        if self.db_session.get_bind().dialect.update_returning:
+            rows = (await self.db_session.execute(claim.returning(*columns))).all()
+        else:
+            await self.db_session.execute(claim)
+            rows = (
+                await self.db_session.execute(
+                    select(*columns).where(OutboxModel.id.in_(ids), OutboxModel.next_attempt_at == claimed_until)
+                )
+            ).all()
+        await self.db_session.commit()
+        return sorted((self._map_to_entity(row) for row in rows), key=lambda message: message.id)
+
+    async def mark_delivered(self, messages: List[OutboxMessage]) -> None:
+        if not messages:
+            return
+        await self.db_session.execute(
+            delete(OutboxModel).where(OutboxModel.id.in_([message.id for message in messages]))
+        )
+        await self.db_session.commit()
+
+    async def reschedule(self, message: OutboxMessage, next_attempt_at: datetime) -> None:
+        await self.db_session.execute(
+            update(OutboxModel)
+            .where(OutboxModel.id == message.id)
+            .values(attempts=OutboxModel.attempts + 1, next_attempt_at=next_attempt_at)
+        )
+        await self.db_session.commit()
+
+    async def dead_letter(self, message: OutboxMessage) -> None:
+        await self.db_session.execute(
+            insert(OutboxDeadLetterModel).values(
+                order_id=message.order_id,
+                payment_id=message.payment_id,
+                payment_status=message.payment_status.value,
+                attempts=message.attempts + 1,
+            )
+        )
+        await self.db_session.execute(delete(OutboxModel).where(OutboxModel.id == message.id))
+        await self.db_session.commit()
+
+    def _map_to_entity(self, model: OutboxModel) -> OutboxMessage:
+        return OutboxMessage(
+            id=model.id,
+            order_id=model.order_id,
+            payment_id=model.payment_id,
+            payment_status=PaymentStatus(model.payment_status),
+            attempts=model.attempts,
+            next_attempt_at=model.next_attempt_at,
+        )
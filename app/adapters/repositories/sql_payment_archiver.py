@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import delete, exists, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.models.sql.outbox_model import OutboxModel
+from app.adapters.models.sql.payment_archive_model import PaymentArchiveModel
+from app.adapters.models.sql.payment_model import PaymentModel
+from app.domain.interfaces.payment_archiver import SETTLED_STATUSES, PaymentArchiver
+
+
+class SQLPaymentArchiver(PaymentArchiver):
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def archive_batch(self, settled_before: datetime, limit: int) -> int:
+        newest_id = select(func.max(PaymentModel.id)).scalar_subquery()
+        pending_notification = exists().where(OutboxModel.payment_id == PaymentModel.id)
+        ids = (
+            await self.db_session.scalars(
+                select(PaymentModel.id)
+                .where(
+                    # Implied by updated_at, but lets the scan use the created_at index
+                    PaymentModel.created_at < settled_before,
+                    PaymentModel.updated_at < settled_before,
+                    PaymentModel.status.in_([status.value for status in SETTLED_STATUSES]),
+                    ~pending_notification,
+                    # SQLite hands the highest ID out again once its row is gone
+                    PaymentModel.id < newest_id,
+                )
+                .limit(limit)
+                # Keeps concurrent status changes from slipping in between the copy and the delete
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not ids:
+            return 0
+
+        columns = [column.name for column in PaymentModel.__table__.columns]
+        await self.db_session.execute(
+            insert(PaymentArchiveModel).from_select(
+                columns, select(*PaymentModel.__table__.columns).where(PaymentModel.id.in_(ids))
+            )
+        )
+        await self.db_session.execute(delete(PaymentModel).where(PaymentModel.id.in_(ids)))
+        await self.db_session.commit()
+        return len(ids)
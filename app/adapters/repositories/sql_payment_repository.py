@@ -1,62 +1,250 @@
-from typing import List, Optional
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple, Type, Union
 
-from sqlalchemy.orm import Session
+from sqlalchemy import ColumnElement, Row, Select, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.adapters.models.sql.base import BaseModel
+from app.adapters.models.sql.outbox_model import OutboxModel
 from app.adapters.models.sql.payment_model import PaymentModel
-from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+from app.domain.entities.payment import Payment, PaymentDailyTotal, PaymentDb, PaymentFilter, PaymentStatus
 from app.domain.interfaces.payment_repository import PaymentRepository
 
 
 class SQLPaymentRepository(PaymentRepository):
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: AsyncSession, model: Type[BaseModel] = PaymentModel):
         self.db_session = db_session
+        # PaymentArchiveModel to read archived payments; those are never written through a repository
+        self.model = model
 
-    def get_all(self) -> List[PaymentDb]:
-        payments = self.db_session.query(PaymentModel).all()
-        return [self._map_to_entity(payment) for payment in payments]
+    async def get_all(self) -> List[PaymentDb]:
+        rows = await self.db_session.execute(self._select_payments())
+        return [self._map_to_entity(row) for row in rows]
+
+    async def list_page(
+        self, limit: int, after_id: Optional[int] = None, filters: Optional[PaymentFilter] = None
+    ) -> List[PaymentDb]:
+        query = self._apply_filters(self._select_payments(), filters)
+        if after_id is not None:
+            query = query.where(self.model.id > after_id)
+        rows = await self.db_session.execute(query.order_by(self.model.id).limit(limit))
+        return [self._map_to_entity(row) for row in rows]
+
+    async def iter_all(
+        self, filters: Optional[PaymentFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[PaymentDb]:
+        query = self._apply_filters(self._select_payments(), filters).order_by(self.model.id)
+        rows = await self.db_session.stream(query.execution_options(yield_per=batch_size))
+        async for row in rows:
+            yield self._map_to_entity(row)
+
+    async def daily_totals(self, filters: Optional[PaymentFilter] = None) -> List[PaymentDailyTotal]:
+        day = self._day(self.model.created_at).label("day")
+        totals = select(
+            day,
+            self.model.status,
+            func.count().label("count"),
+            func.sum(self.model.amount).label("amount"),
+        )
+        query = self._apply_filters(totals, filters)
+        rows = await self.db_session.execute(
+            query.group_by(day, self.model.status).order_by(day, self.model.status)
+        )
+        return [
+            PaymentDailyTotal(day=row.day, status=row.status, count=row.count, amount=row.amount or Decimal("0"))
+            for row in rows
+        ]
+
+    async def list_updated_since(self, since: datetime, limit: int) -> List[PaymentDb]:
+        rows = await self.db_session.execute(
+            self._select_payments()
+            .where(self.model.updated_at >= since)
+            .order_by(self.model.updated_at, self.model.id)
+            .limit(limit)
+        )
+        return [self._map_to_entity(row) for row in rows]
 
-    def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
-        payment = self.db_session.query(PaymentModel).filter(PaymentModel.id == payment_id).first()
-        return self._map_to_entity(payment) if payment else None
+    async def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        row = (await self.db_session.execute(self._select_payments().where(self.model.id == payment_id))).first()
+        return self._map_to_entity(row) if row else None
 
-    def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
-        payment = self.db_session.query(PaymentModel).filter(PaymentModel.order_id == order_id).first()
-        return self._map_to_entity(payment) if payment else None
+    async def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        row = (
+            await self.db_session.execute(self._select_payments().where(self.model.order_id == order_id).limit(1))
+        ).first()
+        return self._map_to_entity(row) if row else None
 
-    def create(self, payment: Payment) -> PaymentDb:
-        db_payment = PaymentModel(
+    async def get_by_order_ids(self, order_ids: List[int]) -> List[PaymentDb]:
+        if not order_ids:
+            return []
+        rows = await self.db_session.execute(self._select_payments().where(self.model.order_id.in_(order_ids)))
+        return [self._map_to_entity(row) for row in rows]
+
+    async def get_by_external_id(self, external_id: str) -> Optional[PaymentDb]:
+        row = (
+            await self.db_session.execute(self._select_payments().where(self.model.external_id == external_id))
+        ).first()
+        return self._map_to_entity(row) if row else None
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        db_payment = self.model(
             order_id=payment.order_id,
             amount=payment.amount,
             status=payment.status,
             external_id=payment.external_id
         )
         self.db_session.add(db_payment)
-        self.db_session.commit()
-        self.db_session.refresh(db_payment)
+        await self.db_session.commit()
+        await self.db_session.refresh(db_payment)
         return self._map_to_entity(db_payment)
 
-    def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
-        db_payment = self.db_session.query(PaymentModel).filter(PaymentModel.id == payment_id).first()
-        if not db_payment:
-            return None
-        
-        db_payment.status = status
-        self.db_session.commit()
-        self.db_session.refresh(db_payment)
-        return self._map_to_entity(db_payment)
-    
-    def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
-        db_payment = self.db_session.query(PaymentModel).filter(PaymentModel.id == payment_id).first()
-        if not db_payment:
+    async def create_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        created = await self.insert_many(payments)
+        await self.db_session.commit()
+        return created
+
+    async def insert_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        """`create_many` within the session's transaction, without committing it"""
+        if not payments:
+            return []
+
+        now = datetime.utcnow()
+        values = [
+            {
+                "order_id": payment.order_id,
+                "amount": payment.amount,
+                "status": payment.status,
+                "external_id": payment.external_id,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for payment in payments
+        ]
+        columns = self.model.__table__.columns
+        if self.db_session.get_bind().dialect.insert_executemany_returning:
+            # Batched into multi-row INSERT ... RETURNING statements, rows back in parameter order
+            statement = insert(self.model).returning(*columns, sort_by_parameter_order=True)
+            rows = (await self.db_session.execute(statement, values)).all()
+        else:
+            # One INSERT per payment, so each generated ID is known and tied to its input
+            ids = []
+            for row_values in values:
+                result = await self.db_session.execute(insert(self.model.__table__).values(**row_values))
+                ids.append(result.inserted_primary_key[0])
+            rows_by_id = {
+                row.id: row
+                for row in await self.db_session.execute(select(*columns).where(self.model.id.in_(ids)))
+            }
+            rows = [rows_by_id[payment_id] for payment_id in ids]
+        return [self._map_to_entity(row) for row in rows]
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        updated = (await self.apply_status_updates([(payment_id, status)]))[0]
+        if updated is None:
             return None
-        
-        db_payment.external_id = external_id
-        self.db_session.commit()
-        self.db_session.refresh(db_payment)
-        return self._map_to_entity(db_payment)
-    
-    def _map_to_entity(self, model: PaymentModel) -> PaymentDb:
-        return PaymentDb(
+        await self.db_session.commit()
+        return updated
+
+    async def apply_status_updates(
+        self, updates: List[Tuple[int, PaymentStatus]]
+    ) -> List[Optional[PaymentDb]]:
+        """
+        Apply status changes in order within the session's transaction, without
+        committing it, and return each payment as it was right after its change.
+        """
+        rows = []
+        for payment_id, status in updates:
+            updated = await self._update_returning(self.model.id == payment_id, status=status)
+            rows.append(updated[0] if updated else None)
+
+        changed = [row for row in rows if row is not None]
+        if changed:
+            # The orders service is notified from the outbox, committed atomically with the status change
+            await self.db_session.execute(
+                insert(OutboxModel),
+                [
+                    {"order_id": row.order_id, "payment_id": row.id, "payment_status": row.status, "attempts": 0}
+                    for row in changed
+                ],
+            )
+        return [self._map_to_entity(row) if row is not None else None for row in rows]
+
+    async def update_statuses_by_external_id(self, statuses: Dict[str, PaymentStatus]) -> List[PaymentDb]:
+        if not statuses:
+            return []
+
+        external_ids_by_status = defaultdict(list)
+        for external_id, status in statuses.items():
+            external_ids_by_status[status].append(external_id)
+
+        payments = []
+        for status, external_ids in external_ids_by_status.items():
+            payments.extend(
+                await self._update_returning(self.model.external_id.in_(external_ids), status=status)
+            )
+        if not payments:
+            await self.db_session.rollback()
+            return []
+
+        await self.db_session.execute(
+            insert(OutboxModel),
+            [
+                {
+                    "order_id": payment.order_id,
+                    "payment_id": payment.id,
+                    "payment_status": payment.status,
+                    "attempts": 0,
+                }
+                for payment in payments
+            ],
+        )
+        await self.db_session.commit()
+        return [self._map_to_entity(payment) for payment in payments]
+
+    async def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        rows = await self._update_returning(self.model.id == payment_id, external_id=external_id)
+        await self.db_session.commit()
+        return self._map_to_entity(rows[0]) if rows else None
+
+    async def _update_returning(self, criteria: ColumnElement[bool], **values) -> Sequence[Row]:
+        """
+        Update the matching payments and return their new rows, in a single
+        UPDATE ... RETURNING round trip where the dialect supports it.
+        """
+        statement = update(self.model).where(criteria).values(updated_at=datetime.utcnow(), **values)
+        columns = self.model.__table__.columns
+        if self.db_session.get_bind().dialect.update_returning:
+            return (await self.db_session.execute(statement.returning(*columns))).all()
+
+        await self.db_session.execute(statement)
+        return (await self.db_session.execute(select(*columns).where(criteria))).all()
+
+    def _day(self, column: ColumnElement[datetime]) -> ColumnElement:
+        """The UTC day of a timestamp; SQLite and MySQL have no date_trunc, but DATE() does the same"""
+        if self.db_session.get_bind().dialect.name == "postgresql":
+            return func.date_trunc("day", column)
+        return func.date(column)
+
+    def _select_payments(self) -> Select:
+        # Plain column rows skip ORM identity-map bookkeeping; reads never modify them
+        return select(*self.model.__table__.columns)
+
+    def _apply_filters(self, query: Select, filters: Optional[PaymentFilter]) -> Select:
+        if not filters:
+            return query
+        if filters.status:
+            query = query.where(self.model.status == filters.status)
+        if filters.created_from:
+            query = query.where(self.model.created_at >= filters.created_from)
+        if filters.created_to:
+            query = query.where(self.model.created_at < filters.created_to)
+        return query
+
+    def _map_to_entity(self, model: Union[PaymentModel, Row]) -> PaymentDb:
+        # Rows come from our own schema, so they are trusted and not validated again
+        return PaymentDb.from_stored(
             id=model.id,
             order_id=model.order_id,
             amount=model.amount,
@@ -64,4 +252,4 @@ class SQLPaymentRepository(PaymentRepository):
             external_id=model.external_id,
             created_at=model.created_at,
             updated_at=model.updated_at
-        ) 
\ No newline at end of file
+        )
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.metrics.instruments import (
+    group_commit_batch_size,
+    group_commit_flush_duration,
+    group_commit_flush_failures,
+    group_commit_interval,
+    group_commit_max_batch,
+)
+from app.adapters.models.sql.session import SessionLocal
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.config import settings
+from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+
+logger = logging.getLogger(__name__)
+
+
+class _Write:
+    __slots__ = ("payment", "payment_id", "status", "future")
+
+    def __init__(self, future: asyncio.Future, payment: Optional[Payment] = None,
+                 payment_id: Optional[int] = None, status: Optional[PaymentStatus] = None):
+        self.future = future
+        self.payment = payment
+        self.payment_id = payment_id
+        self.status = status
+
+
+class GroupCommitWriter:
+    """
+    Queues payment creations and status changes from concurrent requests and
+    writes them together, one transaction (and one fsync) per batch.
+
+    A batch is flushed once it holds `max_batch` writes, or `interval`
+    seconds after its first write arrived. Batches are flushed one at a
+    time, in arrival order, so writes accumulating during a flush simply
+    join the next batch. Each caller gets its own payment back. If a batch
+    fails, its writes are retried one transaction each, so one bad write
+    only fails its own caller.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        interval: float = settings.GROUP_COMMIT_INTERVAL_MS / 1000,
+        max_batch: int = settings.GROUP_COMMIT_MAX_BATCH,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.max_batch = max_batch
+        self._pending: List[_Write] = []
+        self._arrived = asyncio.Event()
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        group_commit_interval.set(interval)
+        group_commit_max_batch.set(max_batch)
+
+    async def create(self, payment: Payment) -> PaymentDb:
+        return await self._submit(payment=payment)
+
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        return await self._submit(payment_id=payment_id, status=status)
+
+    async def stop(self) -> None:
+        """Flush what is queued, without waiting for the interval, and stop the flusher"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._arrived.set()
+        self._full.set()
+        await self._task
+        self._task = None
+        self._stopping = False
+
+    async def _submit(self, **write: Any) -> Any:
+        if self._task is None or self._task.done():
+            # Started on first use, so the events belong to the running loop
+            self._arrived = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_Write(future, **write))
+        self._arrived.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                if self._stopping:
+                    return
+                await self._arrived.wait()
+                continue
+            if len(self._pending) < self.max_batch and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush(self._take_batch())
+
+    def _take_batch(self) -> List[_Write]:
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if not self._pending:
+            self._arrived.clear()
+        if len(self._pending) < self.max_batch:
+            self._full.clear()
+        return batch
+
+    async def _flush(self, batch: List[_Write]) -> None:
+        group_commit_batch_size.observe(len(batch))
+        started = time.perf_counter()
+        try:
+            results = await self._write(batch)
+        except Exception:
+            group_commit_flush_failures.inc()
+            logger.exception("Group commit of %s writes failed, retrying them one by one", len(batch))
+            for write in batch:
+                try:
+                    result = (await self._write([write]))[0]
+                except Exception as error:
+                    if not write.future.done():
+                        write.future.set_exception(error)
+                else:
+                    if not write.future.done():
+                        write.future.set_result(result)
+        else:
+            for write, result in zip(batch, results):
+                if not write.future.done():
+                    write.future.set_result(result)
+        finally:
+            group_commit_flush_duration.observe(time.perf_counter() - started)
+
+    async def _write(self, batch: List[_Write]) -> List[Optional[PaymentDb]]:
+        """Write the batch in one transaction and return each write's payment, in batch order"""
+        creates = [write for write in batch if write.payment is not None]
+        updates = [write for write in batch if write.payment is None]
+        async with self.session_factory() as session:
+            repository = SQLPaymentRepository(session)
+            created = await repository.insert_many([write.payment for write in creates])
+            updated = await repository.apply_status_updates(
+                [(write.payment_id, write.status) for write in updates]
+            )
+            await session.commit()
+
+        results = {id(write): payment for write, payment in zip(creates, created)}
+        results.update((id(write), payment) for write, payment in zip(updates, updated))
+        return [results[id(write)] for write in batch]
+
+
+group_commit_writer = GroupCommitWriter()
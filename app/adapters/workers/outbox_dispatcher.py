@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.http.service_client import ServiceClient, service_client as app_service_client
+from app.adapters.metrics.instruments import outbox_dead_letters
+from app.adapters.models.sql.session import SessionLocal
+from app.adapters.repositories import RepositoryType, get_outbox_repository
+from app.config import settings
+from app.domain.entities.outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDispatcher:
+    """
+    Background worker that drains the payment outbox into the orders service.
+
+    Each cycle claims the due head message of up to `batch_size` orders and
+    delivers them concurrently. Claimed messages are skipped by dispatchers
+    in other workers for `claim_timeout` seconds, so an order never has two
+    messages in flight and its notifications arrive in the order they were
+    written. Failed deliveries are retried with capped exponential backoff,
+    and moved to the dead letters after `max_attempts`, so one message the
+    orders service keeps rejecting doesn't hold back its order for good.
+    """
+
+    def __init__(
+        self,
+        service_client: ServiceClient,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+        retry_base_delay: float = settings.OUTBOX_RETRY_BASE_DELAY,
+        retry_max_delay: float = settings.OUTBOX_RETRY_MAX_DELAY,
+        max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS,
+        claim_timeout: float = settings.OUTBOX_CLAIM_TIMEOUT,
+        repository_type: RepositoryType = RepositoryType(settings.REPOSITORY_TYPE),
+    ):
+        self.service_client = service_client
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.max_attempts = max_attempts
+        self.claim_timeout = claim_timeout
+        self.repository_type = repository_type
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def wake(self) -> None:
+        """Dispatch right away instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch of due messages and return how many were claimed"""
+        messages = await self._claim_due()
+        if not messages:
+            return 0
+
+        results = await asyncio.gather(
+            *(
+                self.service_client.update_order_payment_status(message.order_id, message.payment_status)
+                for message in messages
+            )
+        )
+        delivered = [message for message, ok in zip(messages, results) if ok]
+        failed = [message for message, ok in zip(messages, results) if not ok]
+        await self._record_results(delivered, failed)
+        return len(messages)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                fetched = await self.dispatch_once()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                fetched = 0
+
+            if fetched >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _claim_due(self) -> List[OutboxMessage]:
+        async with self.session_factory() as db:
+            repository = get_outbox_repository(self.repository_type, db)
+            now = datetime.utcnow()
+            return await repository.claim_due(now, self.batch_size, now + timedelta(seconds=self.claim_timeout))
+
+    async def _record_results(self, delivered: List[OutboxMessage], failed: List[OutboxMessage]) -> None:
+        async with self.session_factory() as db:
+            repository = get_outbox_repository(self.repository_type, db)
+            await repository.mark_delivered(delivered)
+            now = datetime.utcnow()
+            for message in failed:
+                if message.attempts + 1 >= self.max_attempts:
+                    logger.error(
+                        "Giving up on payment status %s for order %s after %s attempts",
+                        message.payment_status.value, message.order_id, message.attempts + 1,
+                    )
+                    await repository.dead_letter(message)
+                    outbox_dead_letters.inc()
+                    continue
+                logger.warning(
+                    "Orders service rejected payment status %s for order %s (attempt %s)",
+                    message.payment_status.value, message.order_id, message.attempts + 1,
+                )
+                await repository.reschedule(message, now + timedelta(seconds=self._backoff(message.attempts)))
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.retry_max_delay, self.retry_base_delay * (2 ** min(attempts, 32)))
+
+
+outbox_dispatcher = OutboxDispatcher(app_service_client)
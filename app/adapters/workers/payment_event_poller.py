@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.events.payment_events import PaymentEvents, payment_events
+from app.adapters.models.sql.session import SessionLocal
+from app.adapters.repositories import RepositoryType, get_payment_repository
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentEventPoller:
+    """
+    Background worker that publishes to this process's event subscribers
+    the payment changes made through other workers.
+
+    The payments store is the broker shared by all workers: while anyone is
+    subscribed, each cycle reads the payments changed since the previous
+    one, so a process makes one query per `poll_interval` however many
+    clients are waiting. Each cycle reads back `overlap` seconds before the
+    previous one started, to catch writes committed after that poll read
+    past them; payments already published at the same `updated_at` are
+    skipped. Subscribers drop snapshots that are not newer than the last one
+    they sent, so changes made through this process, which are also
+    published right away by `PublishingPaymentRepository`, are sent once.
+    """
+
+    def __init__(
+        self,
+        events: PaymentEvents = payment_events,
+        session_factory: Callable[[], AsyncSession] = SessionLocal,
+        poll_interval: float = settings.PAYMENT_EVENTS_POLL_INTERVAL,
+        overlap: float = settings.PAYMENT_EVENTS_POLL_OVERLAP,
+        batch_size: int = settings.PAYMENT_EVENTS_POLL_BATCH_SIZE,
+        repository_type: RepositoryType = RepositoryType(settings.REPOSITORY_TYPE),
+    ):
+        self.events = events
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.overlap = timedelta(seconds=overlap)
+        self.batch_size = batch_size
+        self.repository_type = repository_type
+        self._since: Optional[datetime] = None
+        # updated_at of the payments published since `_since`, by payment ID
+        self._published: Dict[int, datetime] = {}
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def poll_once(self) -> int:
+        """Publish the payments changed since the previous poll and return how many were read"""
+        if not self.events.subscriber_count:
+            # Nobody to tell; start from the present when someone subscribes
+            self._since = None
+            self._published.clear()
+            return 0
+
+        started = datetime.utcnow()
+        since = self._since if self._since is not None else started - self.overlap
+        async with self.session_factory() as db:
+            repository = get_payment_repository(self.repository_type, db)
+            payments = await repository.list_updated_since(since, self.batch_size)
+
+        for payment in payments:
+            published = self._published.get(payment.id)
+            if published is None or published < payment.updated_at:
+                self._published[payment.id] = payment.updated_at
+                self.events.publish(payment)
+
+        if len(payments) == self.batch_size and payments[-1].updated_at > since:
+            # More changes than one batch: carry on from the last one read
+            self._since = payments[-1].updated_at
+        else:
+            if len(payments) == self.batch_size:
+                logger.warning("More than %s payments changed at %s; some events were skipped", self.batch_size, since)
+            self._since = started - self.overlap
+        self._published = {
+            payment_id: updated_at for payment_id, updated_at in self._published.items() if updated_at >= self._since
+        }
+        return len(payments)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                read = await self.poll_once()
+            except Exception:
+                logger.exception("Payment event poll failed")
+                read = 0
+
+            if read >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+payment_event_poller = PaymentEventPoller()
@@ -1,8 +1,20 @@
 import uuid
 from decimal import Decimal
-from typing import List, Optional
+from typing import AsyncIterator, Collection, List, Optional
 
-from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus, QRCodeRequest
+from app.domain.entities.payment import (
+    Payment,
+    PaymentCallback,
+    PaymentCallbackResult,
+    PaymentCreateResult,
+    PaymentDb,
+    PaymentFilter,
+    PaymentPage,
+    PaymentReport,
+    PaymentStatus,
+    PaymentStatusTotal,
+    QRCodeRequest,
+)
 from app.domain.interfaces.payment_repository import PaymentRepository
 
 
@@ -10,16 +22,51 @@ class PaymentUseCases:
     def __init__(self, repository: PaymentRepository):
         self.repository = repository
 
-    def get_all_payments(self) -> List[PaymentDb]:
-        return self.repository.get_all()
+    async def get_all_payments(self) -> List[PaymentDb]:
+        return await self.repository.get_all()
 
-    def get_payment_by_id(self, payment_id: int) -> Optional[PaymentDb]:
-        return self.repository.get_by_id(payment_id)
+    async def get_payments_page(
+        self, limit: int, cursor: Optional[int] = None, filters: Optional[PaymentFilter] = None
+    ) -> PaymentPage:
+        # Fetch one extra row to know whether another page exists
+        payments = await self.repository.list_page(limit + 1, after_id=cursor, filters=filters)
+        items = payments[:limit]
+        next_cursor = items[-1].id if len(payments) > limit else None
+        return PaymentPage(items=items, next_cursor=next_cursor)
+
+    def stream_payments(
+        self, filters: Optional[PaymentFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[PaymentDb]:
+        return self.repository.iter_all(filters, batch_size)
+
+    async def get_payment_report(self, filters: Optional[PaymentFilter] = None) -> PaymentReport:
+        """
+        Totals per day and status, aggregated by the database, and per status
+        over the whole period, added up here from the (few) daily rows.
+        """
+        by_day = await self.repository.daily_totals(filters)
+        by_status = {}
+        for total in by_day:
+            current = by_status.get(total.status)
+            if current is None:
+                by_status[total.status] = PaymentStatusTotal(
+                    status=total.status, count=total.count, amount=total.amount
+                )
+            else:
+                current.count += total.count
+                current.amount += total.amount
+        return PaymentReport(
+            by_status=sorted(by_status.values(), key=lambda total: total.status.value),
+            by_day=by_day,
+        )
+
+    async def get_payment_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        return await self.repository.get_by_id(payment_id)
     
-    def get_payment_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
-        return self.repository.get_by_order_id(order_id)
+    async def get_payment_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        return await self.repository.get_by_order_id(order_id)
 
-    def create_payment(self, payment: Payment) -> PaymentDb:
+    async def create_payment(self, payment: Payment) -> PaymentDb:
         # Ensure payment has pending status
         payment_with_status = Payment(
             order_id=payment.order_id,
@@ -27,29 +74,89 @@ class PaymentUseCases:
             status=PaymentStatus.PENDING,
             external_id=payment.external_id
         )
-        return self.repository.create(payment_with_status)
+        return await self.repository.create(payment_with_status)
+
+    async def create_payments(
+        self,
+        payments: List[Payment],
+        missing_order_ids: Collection[int] = (),
+        unavailable_order_ids: Collection[int] = (),
+    ) -> List[PaymentCreateResult]:
+        """
+        Create pending payments for many orders at once, reporting a result per item.
+        Orders in `missing_order_ids` or `unavailable_order_ids` (not known to
+        exist or not), orders that already have a payment and repeats of an
+        order earlier in the list are skipped; the rest are inserted together
+        in one transaction.
+        """
+        existing = {
+            payment.order_id: payment
+            for payment in await self.repository.get_by_order_ids(
+                list({payment.order_id for payment in payments} - set(missing_order_ids) - set(unavailable_order_ids))
+            )
+        }
 
-    def update_payment_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
-        return self.repository.update_status(payment_id, status)
+        results = []
+        to_create = []
+        seen = set()
+        for payment in payments:
+            if payment.order_id in missing_order_ids:
+                results.append(PaymentCreateResult(order_id=payment.order_id, status="order_not_found"))
+            elif payment.order_id in unavailable_order_ids:
+                results.append(PaymentCreateResult(order_id=payment.order_id, status="order_unavailable"))
+            elif payment.order_id in existing:
+                results.append(
+                    PaymentCreateResult(
+                        order_id=payment.order_id, status="already_exists", payment=existing[payment.order_id]
+                    )
+                )
+            elif payment.order_id in seen:
+                results.append(PaymentCreateResult(order_id=payment.order_id, status="duplicate"))
+            else:
+                seen.add(payment.order_id)
+                result = PaymentCreateResult(order_id=payment.order_id, status="created")
+                results.append(result)
+                to_create.append(
+                    (
+                        result,
+                        Payment(
+                            order_id=payment.order_id,
+                            amount=payment.amount,
+                            status=PaymentStatus.PENDING,
+                            external_id=payment.external_id
+                        ),
+                    )
+                )
+
+        created = await self.repository.create_many([payment for _, payment in to_create])
+        for (result, _), payment in zip(to_create, created):
+            result.payment = payment
+        return results
+
+    async def update_payment_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        return await self.repository.update_status(payment_id, status)
     
-    def generate_qr_code(self, request: QRCodeRequest) -> str:
+    async def generate_qr_code(self, request: QRCodeRequest) -> Optional[str]:
         """
         Generate a QR code for payment.
         In a real application, this might integrate with a payment gateway.
+        Returns None when the order's payment can no longer be changed
+        (it was settled and archived), so no QR code would ever be paid.
         """
         # In a real application, this would generate a QR code with payment gateway
         # Here we simulate it by generating a UUID
         external_id = f"PAY-{uuid.uuid4()}"
         
         # Check if there's an existing payment for this order
-        existing_payment = self.repository.get_by_order_id(request.order_id)
+        existing_payment = await self.repository.get_by_order_id(request.order_id)
         
         if existing_payment:
             # Update existing payment with the external ID
-            self.repository.update_external_id(existing_payment.id, external_id)
+            if not await self.repository.update_external_id(existing_payment.id, external_id):
+                return None
         else:
             # Create a new payment
-            self.repository.create(
+            await self.repository.create(
                 Payment(
                     order_id=request.order_id,
                     amount=request.total,
@@ -61,21 +168,46 @@ class PaymentUseCases:
         # Return a simulated QR code (just the UUID in this mock implementation)
         return external_id
     
-    def process_payment_callback(self, external_id: str, is_approved: bool) -> Optional[PaymentDb]:
+    async def process_payment_callback(self, external_id: str, is_approved: bool) -> Optional[PaymentDb]:
         """
         Process payment gateway callback.
         This would be called when the payment gateway notifies about payment status.
         """
-        # Find all payments to look for the external ID (in a real app, this would use an index)
-        payments = self.repository.get_all()
-        matching_payment = next(
-            (p for p in payments if p.external_id == external_id), 
-            None
-        )
-        
+        matching_payment = await self.repository.get_by_external_id(external_id)
+
         if not matching_payment:
             return None
             
         # Update the payment status
         new_status = PaymentStatus.APPROVED if is_approved else PaymentStatus.DENIED
-        return self.repository.update_status(matching_payment.id, new_status) 
\ No newline at end of file
+        return await self.repository.update_status(matching_payment.id, new_status) 
+
+    async def process_payment_callbacks(self, callbacks: List[PaymentCallback]) -> List[PaymentCallbackResult]:
+        """
+        Process a burst of payment gateway callbacks with set-based updates.
+        When an external ID appears more than once, the last callback wins.
+        """
+        statuses = {
+            callback.external_id: PaymentStatus.APPROVED if callback.is_approved else PaymentStatus.DENIED
+            for callback in callbacks
+        }
+        updated = {
+            payment.external_id: payment
+            for payment in await self.repository.update_statuses_by_external_id(statuses)
+        }
+
+        results = []
+        for callback in callbacks:
+            payment = updated.get(callback.external_id)
+            if payment:
+                results.append(
+                    PaymentCallbackResult(
+                        external_id=callback.external_id,
+                        status="processed",
+                        payment_id=payment.id,
+                        payment_status=payment.status,
+                    )
+                )
+            else:
+                results.append(PaymentCallbackResult(external_id=callback.external_id, status="not_found"))
+        return results
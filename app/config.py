@@ -3,19 +3,121 @@ from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
+    # Where payments are stored: "sql" or "nosql" (MongoDB)
+    REPOSITORY_TYPE: str = os.getenv("REPOSITORY_TYPE", "sql")
+
     # SQL Database settings
     SQL_DATABASE_URL: str = os.getenv("SQL_DATABASE_URL", "sqlite:///./payments_service.db")
+    # Disable in deployments that run `python -m app.adapters.cli.bootstrap` instead
+    SQL_CREATE_SCHEMA_ON_STARTUP: bool = os.getenv("SQL_CREATE_SCHEMA_ON_STARTUP", "true").lower() == "true"
+    SQL_POOL_SIZE: int = int(os.getenv("SQL_POOL_SIZE", "5"))
+    SQL_MAX_OVERFLOW: int = int(os.getenv("SQL_MAX_OVERFLOW", "10"))
+    SQL_POOL_TIMEOUT: float = float(os.getenv("SQL_POOL_TIMEOUT", "30"))
+    SQL_POOL_RECYCLE: int = int(os.getenv("SQL_POOL_RECYCLE", "1800"))
+    SQL_POOL_PRE_PING: bool = os.getenv("SQL_POOL_PRE_PING", "true").lower() == "true"
+    # Optional read replica for GET requests. Payments written through this
+    # worker are read from the primary for the window that follows, so
+    # clients see their own changes despite replication lag.
+    SQL_REPLICA_URL: str = os.getenv("SQL_REPLICA_URL", "")
+    SQL_READ_YOUR_WRITES_WINDOW: float = float(os.getenv("SQL_READ_YOUR_WRITES_WINDOW", "5"))
+    # Group commit: payment creations and status changes from concurrent
+    # requests are queued for up to GROUP_COMMIT_INTERVAL_MS and committed
+    # together, trading a little latency for far fewer commits under load
+    GROUP_COMMIT_ENABLED: bool = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+    GROUP_COMMIT_INTERVAL_MS: float = float(os.getenv("GROUP_COMMIT_INTERVAL_MS", "5"))
+    GROUP_COMMIT_MAX_BATCH: int = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "100"))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
     
     # NoSQL Database settings (MongoDB)
     NOSQL_HOST: str = os.getenv("NOSQL_HOST", "localhost")
     NOSQL_PORT: int = int(os.getenv("NOSQL_PORT", "27017"))
     NOSQL_DB: str = os.getenv("NOSQL_DB", "payments_service")
+    NOSQL_ID_BLOCK_SIZE: int = int(os.getenv("NOSQL_ID_BLOCK_SIZE", "100"))
     
     # API settings
     API_PREFIX: str = "/api/v1"
+    WEBHOOK_BATCH_MAX_SIZE: int = int(os.getenv("WEBHOOK_BATCH_MAX_SIZE", "5000"))
+    PAYMENT_BATCH_MAX_SIZE: int = int(os.getenv("PAYMENT_BATCH_MAX_SIZE", "1000"))
+    # Orders looked up at the same time while validating a payment batch
+    PAYMENT_BATCH_ORDER_LOOKUP_CONCURRENCY: int = int(os.getenv("PAYMENT_BATCH_ORDER_LOOKUP_CONCURRENCY", "20"))
     
     # External services
     ORDERS_SERVICE_URL: str = os.getenv("ORDERS_SERVICE_URL", "http://localhost:8003")
+    ORDERS_SERVICE_MAX_CONNECTIONS: int = int(os.getenv("ORDERS_SERVICE_MAX_CONNECTIONS", "100"))
+    ORDERS_SERVICE_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("ORDERS_SERVICE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    ORDERS_SERVICE_KEEPALIVE_EXPIRY: float = float(os.getenv("ORDERS_SERVICE_KEEPALIVE_EXPIRY", "30"))
+    ORDERS_SERVICE_CONNECT_TIMEOUT: float = float(os.getenv("ORDERS_SERVICE_CONNECT_TIMEOUT", "2"))
+    ORDERS_SERVICE_GET_ORDER_TIMEOUT: float = float(os.getenv("ORDERS_SERVICE_GET_ORDER_TIMEOUT", "3"))
+    ORDERS_SERVICE_UPDATE_STATUS_TIMEOUT: float = float(os.getenv("ORDERS_SERVICE_UPDATE_STATUS_TIMEOUT", "5"))
+    # Time a request may spend in total on calls to the orders service (0 for no limit)
+    ORDERS_SERVICE_REQUEST_DEADLINE: float = float(os.getenv("ORDERS_SERVICE_REQUEST_DEADLINE", "5"))
+    # After this many consecutive failures or timeouts, calls fail fast for
+    # ORDERS_SERVICE_CIRCUIT_RESET_TIMEOUT seconds before being tried again
+    ORDERS_SERVICE_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("ORDERS_SERVICE_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    ORDERS_SERVICE_CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("ORDERS_SERVICE_CIRCUIT_RESET_TIMEOUT", "30"))
+    # Hedged order lookups: a second request is sent when the first has not
+    # answered within the p95 of recent lookups (ORDERS_SERVICE_HEDGE_DELAY
+    # until enough lookups have been seen), and the first answer wins
+    ORDERS_SERVICE_HEDGE_ENABLED: bool = os.getenv("ORDERS_SERVICE_HEDGE_ENABLED", "false").lower() == "true"
+    ORDERS_SERVICE_HEDGE_DELAY: float = float(os.getenv("ORDERS_SERVICE_HEDGE_DELAY", "0.1"))
+
+    # Order lookup cache (set ORDER_CACHE_MAX_SIZE to 0 to disable)
+    ORDER_CACHE_MAX_SIZE: int = int(os.getenv("ORDER_CACHE_MAX_SIZE", "10000"))
+    ORDER_CACHE_TTL: float = float(os.getenv("ORDER_CACHE_TTL", "30"))
+    ORDER_CACHE_NEGATIVE_TTL: float = float(os.getenv("ORDER_CACHE_NEGATIVE_TTL", "5"))
+
+    # Payment lookup cache, per worker (set PAYMENT_CACHE_MAX_SIZE to 0 to disable).
+    # Writes through this worker invalidate it; writes elsewhere show up within the TTL.
+    PAYMENT_CACHE_MAX_SIZE: int = int(os.getenv("PAYMENT_CACHE_MAX_SIZE", "10000"))
+    PAYMENT_CACHE_TTL: float = float(os.getenv("PAYMENT_CACHE_TTL", "5"))
+
+    # Idempotency-Key support on payment creation and QR code generation
+    IDEMPOTENCY_KEY_TTL: float = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+    # A key is held for IDEMPOTENCY_CLAIM_LEASE seconds while its first request runs,
+    # so a request that never completes (e.g. its worker died) doesn't block retries for long
+    IDEMPOTENCY_CLAIM_LEASE: float = float(os.getenv("IDEMPOTENCY_CLAIM_LEASE", "30"))
+    IDEMPOTENCY_CACHE_MAX_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_MAX_SIZE", "10000"))
+    IDEMPOTENCY_PURGE_INTERVAL: float = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "300"))
+
+    # Server-sent payment updates: per-client queue size (oldest updates are
+    # dropped when full), client limit, and how often an idle stream sends a
+    # keepalive comment
+    PAYMENT_EVENTS_QUEUE_SIZE: int = int(os.getenv("PAYMENT_EVENTS_QUEUE_SIZE", "16"))
+    PAYMENT_EVENTS_MAX_SUBSCRIBERS: int = int(os.getenv("PAYMENT_EVENTS_MAX_SUBSCRIBERS", "10000"))
+    PAYMENT_EVENTS_KEEPALIVE_INTERVAL: float = float(os.getenv("PAYMENT_EVENTS_KEEPALIVE_INTERVAL", "15"))
+    # Changes made by other workers are read from the payments store once per
+    # interval per process, while it has subscribers. Each poll reads back
+    # `overlap` seconds before the previous one, so writes committed late or
+    # stamped by a worker with a slightly skewed clock are not missed.
+    PAYMENT_EVENTS_POLL_INTERVAL: float = float(os.getenv("PAYMENT_EVENTS_POLL_INTERVAL", "1"))
+    PAYMENT_EVENTS_POLL_OVERLAP: float = float(os.getenv("PAYMENT_EVENTS_POLL_OVERLAP", "5"))
+    PAYMENT_EVENTS_POLL_BATCH_SIZE: int = int(os.getenv("PAYMENT_EVENTS_POLL_BATCH_SIZE", "500"))
+
+    # Archival of settled payments (python -m app.adapters.cli.archive). While
+    # enabled, reads that miss the payments table fall through to the archive,
+    # so it must stay enabled once anything has been archived.
+    PAYMENT_ARCHIVE_ENABLED: bool = os.getenv("PAYMENT_ARCHIVE_ENABLED", "false").lower() == "true"
+    PAYMENT_ARCHIVE_AFTER_DAYS: int = int(os.getenv("PAYMENT_ARCHIVE_AFTER_DAYS", "90"))
+    PAYMENT_ARCHIVE_BATCH_SIZE: int = int(os.getenv("PAYMENT_ARCHIVE_BATCH_SIZE", "1000"))
+
+    # Outbox dispatcher for order payment-status notifications
+    OUTBOX_DISPATCHER_ENABLED: bool = os.getenv("OUTBOX_DISPATCHER_ENABLED", "true").lower() == "true"
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+    OUTBOX_RETRY_BASE_DELAY: float = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "1"))
+    OUTBOX_RETRY_MAX_DELAY: float = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "300"))
+    # Messages still failing after this many attempts are moved to the dead-letter table
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "20"))
+    # How long a claimed message is skipped by other dispatchers; longer than a delivery can take
+    OUTBOX_CLAIM_TIMEOUT: float = float(os.getenv("OUTBOX_CLAIM_TIMEOUT", "60"))
+
+    # On-demand request profiling, off unless a token or a sample rate is set.
+    # Requests sending the token in X-Profile-Token are profiled; the profiles
+    # endpoints are only mounted when a token is set, and require the same header.
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "./profiles")
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
 
 
 settings = Settings() 
\ No newline at end of file
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class IdempotencyRecord(BaseModel):
+    """
+    The outcome of the first request sent with an idempotency key.
+    `status_code` and `body` are empty while that request is still running.
+    """
+
+    key: str
+    fingerprint: str
+    status_code: Optional[int] = None
+    body: Optional[str] = None
+    expires_at: datetime
+
+    @property
+    def completed(self) -> bool:
+        return self.status_code is not None
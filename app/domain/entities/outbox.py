@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Union
+
+from pydantic import BaseModel
+
+from app.domain.entities.payment import PaymentStatus
+
+
+class OutboxMessage(BaseModel):
+    """A pending notification of a payment status change to the orders service"""
+
+    id: Union[int, str]
+    order_id: int
+    payment_id: int
+    payment_status: PaymentStatus
+    attempts: int = 0
+    next_attempt_at: datetime
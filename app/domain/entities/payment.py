@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -33,4 +33,59 @@ class PaymentDb(Payment):
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+    @classmethod
+    def from_stored(cls, **fields) -> "PaymentDb":
+        """
+        Build a payment from values read back from storage, without validating them.
+        Built by `model_construct`, so it is laid out exactly like a validated payment.
+        """
+        return cls.model_construct(**fields)
+
+
+class PaymentFilter(BaseModel):
+    status: Optional[PaymentStatus] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+
+class PaymentPage(BaseModel):
+    items: List[PaymentDb]
+    next_cursor: Optional[int] = None
+
+
+class PaymentCallback(BaseModel):
+    external_id: str
+    is_approved: bool
+
+
+class PaymentCallbackResult(BaseModel):
+    external_id: str
+    status: str
+    payment_id: Optional[int] = None
+    payment_status: Optional[PaymentStatus] = None
+
+
+class PaymentCreateResult(BaseModel):
+    order_id: int
+    status: str
+    payment: Optional[PaymentDb] = None
+
+
+class PaymentDailyTotal(BaseModel):
+    day: date
+    status: PaymentStatus
+    count: int
+    amount: Decimal
+
+
+class PaymentStatusTotal(BaseModel):
+    status: PaymentStatus
+    count: int
+    amount: Decimal
+
+
+class PaymentReport(BaseModel):
+    by_status: List[PaymentStatusTotal]
+    by_day: List[PaymentDailyTotal]
@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+from app.domain.entities.idempotency import IdempotencyRecord
+
+
+class IdempotencyRepository(ABC):
+    @abstractmethod
+    async def claim(self, key: str, fingerprint: str, expires_at: datetime) -> Optional[IdempotencyRecord]:
+        """
+        Reserve `key` until `expires_at` for a request about to run. Returns None
+        when the key was free (or its record had expired, including a claim
+        whose request never completed) and is now claimed, or the existing
+        unexpired record.
+        """
+        pass
+
+    @abstractmethod
+    async def complete(self, key: str, status_code: int, body: str, expires_at: datetime) -> IdempotencyRecord:
+        """Store the claimed request's response, kept until `expires_at`"""
+        pass
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """Drop a claim whose request failed, so a retry can run it again"""
+        pass
+
+    @abstractmethod
+    async def purge_expired(self, now: datetime) -> int:
+        pass
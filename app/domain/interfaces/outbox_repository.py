@@ -0,0 +1,31 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List
+
+from app.domain.entities.outbox import OutboxMessage
+
+
+class OutboxRepository(ABC):
+    @abstractmethod
+    async def claim_due(self, now: datetime, limit: int, claimed_until: datetime) -> List[OutboxMessage]:
+        """
+        Claim messages due for delivery, at most one per order: the oldest
+        pending message of each order, and only if it is due. Later messages
+        of an order are held back until the earlier ones are delivered.
+        Claimed messages are not due again before `claimed_until`, so other
+        dispatchers skip them while they are being delivered.
+        """
+        pass
+
+    @abstractmethod
+    async def mark_delivered(self, messages: List[OutboxMessage]) -> None:
+        pass
+
+    @abstractmethod
+    async def reschedule(self, message: OutboxMessage, next_attempt_at: datetime) -> None:
+        pass
+
+    @abstractmethod
+    async def dead_letter(self, message: OutboxMessage) -> None:
+        """Move a message that keeps failing out of the outbox, unblocking its order's later messages"""
+        pass
@@ -0,0 +1,18 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from app.domain.entities.payment import PaymentStatus
+
+# Payments in these statuses no longer change, so they can be archived
+SETTLED_STATUSES = (PaymentStatus.APPROVED, PaymentStatus.DENIED, PaymentStatus.REJECTED)
+
+
+class PaymentArchiver(ABC):
+    @abstractmethod
+    async def archive_batch(self, settled_before: datetime, limit: int) -> int:
+        """
+        Move up to `limit` settled payments last changed before `settled_before`
+        into the archive, keeping their IDs, and return how many were moved.
+        Payments with undelivered status notifications are left in place.
+        """
+        pass
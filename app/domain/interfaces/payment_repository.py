@@ -1,30 +1,74 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
 
-from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+from app.domain.entities.payment import Payment, PaymentDailyTotal, PaymentDb, PaymentFilter, PaymentStatus
 
 
 class PaymentRepository(ABC):
     @abstractmethod
-    def get_all(self) -> List[PaymentDb]:
+    async def get_all(self) -> List[PaymentDb]:
         pass
 
     @abstractmethod
-    def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+    async def list_page(
+        self, limit: int, after_id: Optional[int] = None, filters: Optional[PaymentFilter] = None
+    ) -> List[PaymentDb]:
+        """Return up to `limit` payments with id greater than `after_id`, ordered by id"""
         pass
 
     @abstractmethod
-    def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+    def iter_all(
+        self, filters: Optional[PaymentFilter] = None, batch_size: int = 1000
+    ) -> AsyncIterator[PaymentDb]:
+        """Yield payments ordered by id from a server-side cursor, `batch_size` rows at a time"""
         pass
 
     @abstractmethod
-    def create(self, payment: Payment) -> PaymentDb:
+    async def daily_totals(self, filters: Optional[PaymentFilter] = None) -> List[PaymentDailyTotal]:
+        """Count and amount of payments per UTC day and status, aggregated by the database"""
         pass
 
     @abstractmethod
-    def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+    async def list_updated_since(self, since: datetime, limit: int) -> List[PaymentDb]:
+        """Return up to `limit` payments last changed at or after `since`, oldest change first"""
         pass
 
     @abstractmethod
-    def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
-        pass 
\ No newline at end of file
+    async def get_by_id(self, payment_id: int) -> Optional[PaymentDb]:
+        pass
+
+    @abstractmethod
+    async def get_by_order_id(self, order_id: int) -> Optional[PaymentDb]:
+        pass
+
+    @abstractmethod
+    async def get_by_order_ids(self, order_ids: List[int]) -> List[PaymentDb]:
+        """Return the payments of any of the given orders, in a single query"""
+        pass
+
+    @abstractmethod
+    async def get_by_external_id(self, external_id: str) -> Optional[PaymentDb]:
+        pass
+
+    @abstractmethod
+    async def create(self, payment: Payment) -> PaymentDb:
+        pass
+
+    @abstractmethod
+    async def create_many(self, payments: List[Payment]) -> List[PaymentDb]:
+        """Insert all payments in one statement and transaction, returned in the given order"""
+        pass
+
+    @abstractmethod
+    async def update_status(self, payment_id: int, status: PaymentStatus) -> Optional[PaymentDb]:
+        pass
+
+    @abstractmethod
+    async def update_statuses_by_external_id(self, statuses: Dict[str, PaymentStatus]) -> List[PaymentDb]:
+        """Apply many status changes at once and return the payments that were found"""
+        pass
+
+    @abstractmethod
+    async def update_external_id(self, payment_id: int, external_id: str) -> Optional[PaymentDb]:
+        pass
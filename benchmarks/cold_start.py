@@ -0,0 +1,98 @@
+"""
+Measure the cold-start cost of a payments service worker: time to import
+`main`, time to run the lifespan startup, and latency of the first requests.
+Each run uses a fresh interpreter and an empty SQLite database, and the
+medians are checked against the given budgets (exit code 1 when exceeded).
+
+Usage: python -m benchmarks.cold_start [--runs 5] [--budget-import-ms 2000]
+       [--budget-startup-ms 250] [--budget-first-request-ms 250] [--output cold_start.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHILD_SCRIPT = """
+import asyncio, json, time
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+import httpx
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            await client.get("/")
+            health = time.perf_counter()
+            await client.get("/api/v1/payments/", params={"limit": 1})
+            listing = time.perf_counter()
+    return ready, health, listing
+
+ready_started = time.perf_counter()
+ready, health, listing = asyncio.run(run())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - ready_started) * 1000,
+    "first_request_ms": (health - ready) * 1000,
+    "first_db_request_ms": (listing - health) * 1000,
+}))
+"""
+
+
+def measure_once() -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "SQL_DATABASE_URL": f"sqlite:///{Path(tmp) / 'cold_start.db'}",
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+        completed = subprocess.run(
+            [sys.executable, "-c", CHILD_SCRIPT],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-import-ms", type=float, default=2000)
+    parser.add_argument("--budget-startup-ms", type=float, default=250)
+    parser.add_argument("--budget-first-request-ms", type=float, default=250)
+    parser.add_argument("--output", help="write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    medians = {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+    budgets = {
+        "import_ms": args.budget_import_ms,
+        "startup_ms": args.budget_startup_ms,
+        "first_request_ms": args.budget_first_request_ms,
+        "first_db_request_ms": args.budget_first_request_ms,
+    }
+
+    over_budget = []
+    for metric, value in medians.items():
+        status = "ok" if value <= budgets[metric] else "OVER BUDGET"
+        if status != "ok":
+            over_budget.append(metric)
+        print(f"{metric:<22} {value:9.1f} ms  (budget {budgets[metric]:.0f} ms)  {status}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"runs": runs, "median": medians, "budget": budgets}, indent=2))
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
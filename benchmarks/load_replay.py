@@ -0,0 +1,275 @@
+"""
+Replay a realistic request mix against `main.app` in process over ASGI and
+report throughput and tail latency per route. The app runs inside its
+lifespan on an empty SQLite database, with the orders service replaced by
+the local stub from `benchmarks.orders_stub`.
+
+Mixes are named (see MIXES) or given inline as weights, e.g.
+`--mix create=1,qrcode=2,webhook=2,patch=1,get=4,get_by_order=3,list=1`.
+Results saved with `--output` can be compared with `--baseline`.
+
+Usage: python -m benchmarks.load_replay [--mix default] [--requests 5000]
+       [--concurrency 32] [--seed-payments 200] [--orders-latency-ms 0]
+       [--output results.json] [--baseline previous.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+MIXES: Dict[str, Dict[str, int]] = {
+    "default": {"create": 10, "qrcode": 15, "webhook": 15, "patch": 5, "get": 25, "get_by_order": 25, "list": 5},
+    "read_heavy": {"create": 2, "qrcode": 3, "webhook": 3, "patch": 2, "get": 45, "get_by_order": 40, "list": 5},
+    "write_heavy": {"create": 25, "qrcode": 30, "webhook": 30, "patch": 10, "get": 3, "get_by_order": 2},
+}
+
+STATUSES = ["Pending", "Approved", "Denied", "Rejected"]
+
+
+class ReplayState:
+    """Payments created so far, so reads and updates target rows that exist"""
+
+    def __init__(self):
+        self.next_order_id = 1
+        self.payment_ids: List[int] = []
+        self.order_ids: List[int] = []
+        self.external_ids: List[str] = []
+
+    def new_order_id(self) -> int:
+        order_id = self.next_order_id
+        self.next_order_id += 1
+        return order_id
+
+
+async def op_create(client, state: ReplayState):
+    order_id = state.new_order_id()
+    response = await client.post(
+        "/api/v1/payments/", json={"order_id": order_id, "amount": "25.90", "status": "Pending"}
+    )
+    if response.status_code == 201:
+        state.payment_ids.append(response.json()["id"])
+        state.order_ids.append(order_id)
+    return "POST /payments", response
+
+
+async def op_qrcode(client, state: ReplayState):
+    order_id = state.new_order_id()
+    response = await client.post(
+        "/api/v1/payments/qrcode", json={"description": "Order", "total": "42.50", "order_id": order_id}
+    )
+    if response.status_code == 200:
+        state.external_ids.append(response.json()["qr_code"])
+        state.order_ids.append(order_id)
+    return "POST /payments/qrcode", response
+
+
+async def op_webhook(client, state: ReplayState):
+    response = await client.post(
+        "/api/v1/payments/webhook",
+        params={"external_id": random.choice(state.external_ids), "is_approved": random.random() < 0.8},
+    )
+    return "POST /payments/webhook", response
+
+
+async def op_patch(client, state: ReplayState):
+    payment_id = random.choice(state.payment_ids)
+    response = await client.patch(f"/api/v1/payments/{payment_id}/status/{random.choice(STATUSES)}")
+    return "PATCH /payments/{id}/status/{status}", response
+
+
+async def op_get(client, state: ReplayState):
+    response = await client.get(f"/api/v1/payments/{random.choice(state.payment_ids)}")
+    return "GET /payments/{id}", response
+
+
+async def op_get_by_order(client, state: ReplayState):
+    response = await client.get(f"/api/v1/payments/order/{random.choice(state.order_ids)}")
+    return "GET /payments/order/{order_id}", response
+
+
+async def op_list(client, state: ReplayState):
+    response = await client.get("/api/v1/payments/", params={"limit": 50})
+    return "GET /payments", response
+
+
+OPERATIONS = {
+    "create": op_create,
+    "qrcode": op_qrcode,
+    "webhook": op_webhook,
+    "patch": op_patch,
+    "get": op_get,
+    "get_by_order": op_get_by_order,
+    "list": op_list,
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}, expected one of {sorted(OPERATIONS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict[str, dict]:
+    routes = {}
+    for route, latencies in sorted(samples.items()):
+        latencies.sort()
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": errors.get(route, 0),
+            "rps": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": latencies[-1],
+        }
+    return routes
+
+
+async def replay(args) -> dict:
+    # Settings are read at import time, so the app is imported once the environment is set
+    import httpx
+
+    import main
+    from app.adapters.api.payment_router import get_service_client
+    from app.adapters.workers.outbox_dispatcher import outbox_dispatcher
+    from benchmarks.orders_stub import OrdersStub
+
+    stub = OrdersStub(latency=args.orders_latency_ms / 1000, jitter=args.orders_jitter_ms / 1000)
+    stub_client = stub.service_client()
+    main.app.dependency_overrides[get_service_client] = lambda: stub_client
+    outbox_dispatcher.service_client = stub_client
+
+    state = ReplayState()
+    operations = list(args.mix)
+    weights = [args.mix[name] for name in operations]
+    samples: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    remaining = args.requests
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-replay") as client:
+            # Seed payments (not measured) so reads, PATCHes and webhooks have targets
+            for index in range(args.seed_payments):
+                await (op_create if index % 2 else op_qrcode)(client, state)
+
+            async def worker():
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    operation = OPERATIONS[random.choices(operations, weights)[0]]
+                    started = time.perf_counter()
+                    route, response = await operation(client, state)
+                    samples.setdefault(route, []).append((time.perf_counter() - started) * 1000)
+                    if response.status_code >= 400:
+                        errors[route] = errors.get(route, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    main.app.dependency_overrides.pop(get_service_client, None)
+    await stub_client.close()
+
+    total = sum(len(latencies) for latencies in samples.values())
+    every_latency = [latency for latencies in samples.values() for latency in latencies]
+    routes = summarize(samples, errors, elapsed)
+    overall = summarize({"*": every_latency}, {"*": sum(errors.values())}, elapsed)["*"]
+    return {"elapsed_s": elapsed, "requests": total, "overall": overall, "routes": routes}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(result: dict, baseline: dict = None) -> None:
+    header = f"{'route':<38} {'reqs':>6} {'errs':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    if baseline:
+        header += f" {'Δp99':>8}"
+    print(header)
+    rows = [*result["routes"].items(), ("TOTAL", result["overall"])]
+    for route, stats in rows:
+        line = (
+            f"{route:<38} {stats['requests']:>6} {stats['errors']:>5} {stats['rps']:>9.1f} "
+            f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        )
+        if baseline:
+            previous = baseline["overall"] if route == "TOTAL" else baseline["routes"].get(route)
+            if previous and previous["p99_ms"]:
+                line += f" {(stats['p99_ms'] / previous['p99_ms'] - 1) * 100:>+7.1f}%"
+        print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", type=parse_mix, default="default", help=f"one of {sorted(MIXES)} or name=weight,...")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed-payments", type=int, default=200)
+    parser.add_argument("--orders-latency-ms", type=float, default=0)
+    parser.add_argument("--orders-jitter-ms", type=float, default=0)
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results previously saved with --output")
+    args = parser.parse_args()
+    if args.seed_payments < 2:
+        parser.error("--seed-payments must be at least 2")
+    random.seed(args.random_seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SQL_DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'load_replay.db'}"
+        sys.path.insert(0, str(REPO_ROOT))
+        result = asyncio.run(replay(args))
+
+    result = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "mix": args.mix,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_payments": args.seed_payments,
+            "orders_latency_ms": args.orders_latency_ms,
+            "orders_jitter_ms": args.orders_jitter_ms,
+        },
+        **result,
+    }
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_report(result, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
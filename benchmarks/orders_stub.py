@@ -0,0 +1,73 @@
+"""
+Local stand-in for the orders service, served in process over ASGI.
+Latency can be injected to exercise timeouts and slow-dependency behaviour.
+"""
+import asyncio
+import random
+from typing import Iterable, List, Optional
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from app.adapters.http.service_client import ServiceClient
+
+ORDERS_STUB_URL = "http://orders-stub"
+
+
+class OrdersStub:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        missing_order_ids: Optional[Iterable[int]] = None,
+        failing: bool = False,
+        latencies: Optional[Iterable[float]] = None,
+    ):
+        self.latency = latency
+        # Per-call latencies, used in order before falling back to `latency` plus jitter
+        self.latencies: List[float] = list(latencies or ())
+        self.jitter = jitter
+        self.missing_order_ids = set(missing_order_ids or ())
+        self.failing = failing
+        self.get_order_calls = 0
+        self.status_updates = []
+        self.app = self._build_app()
+
+    def service_client(self) -> ServiceClient:
+        """A ServiceClient whose requests are served by this stub"""
+        client = ServiceClient(
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app))
+        )
+        client.orders_url = ORDERS_STUB_URL
+        return client
+
+    async def _delay(self) -> None:
+        if self.latencies:
+            delay = self.latencies.pop(0)
+        else:
+            delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/api/v1/orders/{order_id}")
+        async def get_order(order_id: int):
+            self.get_order_calls += 1
+            await self._delay()
+            if self.failing:
+                raise HTTPException(status_code=503, detail="Orders service unavailable")
+            if order_id in self.missing_order_ids:
+                raise HTTPException(status_code=404, detail="Order not found")
+            return {"id": order_id, "status": "RECEIVED"}
+
+        @app.patch("/api/v1/orders/{order_id}/payment-status/{payment_status}")
+        async def update_payment_status(order_id: int, payment_status: str):
+            await self._delay()
+            if self.failing:
+                raise HTTPException(status_code=503, detail="Orders service unavailable")
+            self.status_updates.append((order_id, payment_status))
+            return {"id": order_id, "payment_status": payment_status}
+
+        return app
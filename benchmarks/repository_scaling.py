@@ -0,0 +1,291 @@
+"""
+Time every `PaymentRepository` method against tables of increasing size and
+flag the ones that grow faster than they should. Each backend is seeded
+fresh per size: SQL on a temporary SQLite file, NoSQL on the in-memory
+collection from `tests.fakes.mongo`.
+
+The growth exponent is the slope of log(time) against log(rows). Point
+operations are expected to be flat (exponent 0) and full iterations linear
+(exponent 1); a method is flagged when its exponent exceeds the expected one
+by more than the tolerance, and the exit code is then 1.
+
+Usage: python -m benchmarks.repository_scaling [--sizes 1000,100000,1000000]
+       [--backends sql,nosql] [--repeat 50] [--scan-repeat 3] [--tolerance 0.3]
+       [--output scaling.json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterator, List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.adapters.models.nosql.connection import ensure_indexes
+from app.adapters.models.sql.payment_model import PaymentModel
+from app.adapters.models.sql.schema import create_schema
+from app.adapters.models.sql.session import build_engine
+from app.adapters.repositories.nosql_payment_repository import NoSQLPaymentRepository
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.domain.entities.payment import Payment, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+from tests.fakes.mongo import InMemoryDatabase
+
+SEED_CHUNK_SIZE = 10000
+UPDATE_BATCH_SIZE = 100
+PAGE_SIZE = 100
+STATUSES = [PaymentStatus.PENDING, PaymentStatus.APPROVED, PaymentStatus.DENIED, PaymentStatus.REJECTED]
+SEED_STARTED_AT = datetime(2024, 1, 1)
+
+# Methods that read the whole table; every other method should not depend on its size
+FULL_SCAN_METHODS = {"get_all", "iter_all", "daily_totals"}
+
+
+def seed_rows(size: int) -> Iterator[dict]:
+    for payment_id in range(1, size + 1):
+        created_at = SEED_STARTED_AT + timedelta(seconds=payment_id)
+        yield {
+            "id": payment_id,
+            "order_id": payment_id,
+            "amount": Decimal("25.90"),
+            "status": STATUSES[payment_id % len(STATUSES)].value,
+            "external_id": f"PAY-{payment_id:08d}",
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def chunks(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@asynccontextmanager
+async def sql_repositories(size: int, workdir: Path) -> AsyncIterator[Callable]:
+    engine = build_engine(f"sqlite:///{workdir / f'payments_{size}.db'}")
+    await create_schema(engine)
+    async with engine.begin() as connection:
+        for rows in chunks(seed_rows(size), SEED_CHUNK_SIZE):
+            await connection.execute(insert(PaymentModel), rows)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def repository() -> AsyncIterator[PaymentRepository]:
+        async with session_factory() as session:
+            yield SQLPaymentRepository(session)
+
+    try:
+        yield repository
+    finally:
+        await engine.dispose()
+
+
+@asynccontextmanager
+async def nosql_repositories(size: int, workdir: Path) -> AsyncIterator[Callable]:
+    collection = InMemoryDatabase(f"scaling_{size}_{uuid.uuid4().hex[:8]}")["payments"]
+    await ensure_indexes(collection)
+    for rows in chunks(seed_rows(size), SEED_CHUNK_SIZE):
+        await collection.insert_many(
+            [{**row, "_id": row.pop("id"), "amount": float(row["amount"])} for row in rows]
+        )
+
+    @asynccontextmanager
+    async def repository() -> AsyncIterator[PaymentRepository]:
+        yield NoSQLPaymentRepository(collection)
+
+    yield repository
+
+
+BACKENDS = {"sql": sql_repositories, "nosql": nosql_repositories}
+
+
+class Workload:
+    """One call of each repository method, aimed at random rows of a seeded table"""
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.next_order_id = size + 1
+
+    def payment_id(self) -> int:
+        return self.rng.randint(1, self.size)
+
+    async def get_all(self, repository: PaymentRepository) -> None:
+        await repository.get_all()
+
+    async def list_page(self, repository: PaymentRepository) -> None:
+        await repository.list_page(PAGE_SIZE, after_id=self.rng.randint(0, max(0, self.size - PAGE_SIZE)))
+
+    async def iter_all(self, repository: PaymentRepository) -> None:
+        async for _ in repository.iter_all():
+            pass
+
+    async def daily_totals(self, repository: PaymentRepository) -> None:
+        await repository.daily_totals()
+
+    async def get_by_id(self, repository: PaymentRepository) -> None:
+        await repository.get_by_id(self.payment_id())
+
+    async def get_by_order_id(self, repository: PaymentRepository) -> None:
+        await repository.get_by_order_id(self.payment_id())
+
+    async def get_by_order_ids(self, repository: PaymentRepository) -> None:
+        await repository.get_by_order_ids([self.payment_id() for _ in range(UPDATE_BATCH_SIZE)])
+
+    async def get_by_external_id(self, repository: PaymentRepository) -> None:
+        await repository.get_by_external_id(f"PAY-{self.payment_id():08d}")
+
+    async def create(self, repository: PaymentRepository) -> None:
+        self.next_order_id += 1
+        await repository.create(
+            Payment(order_id=self.next_order_id, amount=Decimal("25.90"), status=PaymentStatus.PENDING)
+        )
+
+    async def create_many(self, repository: PaymentRepository) -> None:
+        order_ids = range(self.next_order_id + 1, self.next_order_id + UPDATE_BATCH_SIZE + 1)
+        self.next_order_id += UPDATE_BATCH_SIZE
+        await repository.create_many(
+            [Payment(order_id=order_id, amount=Decimal("25.90"), status=PaymentStatus.PENDING) for order_id in order_ids]
+        )
+
+    async def update_status(self, repository: PaymentRepository) -> None:
+        await repository.update_status(self.payment_id(), self.rng.choice(STATUSES))
+
+    async def update_statuses_by_external_id(self, repository: PaymentRepository) -> None:
+        statuses = {
+            f"PAY-{self.payment_id():08d}": self.rng.choice(STATUSES) for _ in range(UPDATE_BATCH_SIZE)
+        }
+        await repository.update_statuses_by_external_id(statuses)
+
+    async def update_external_id(self, repository: PaymentRepository) -> None:
+        await repository.update_external_id(self.payment_id(), f"PAY-{uuid.uuid4()}")
+
+
+METHODS = [
+    name for name in vars(Workload)
+    if not name.startswith("_") and name not in ("payment_id",)
+]
+
+
+async def time_method(repositories: Callable, call: Callable, repeat: int) -> float:
+    """Median milliseconds per call, after one untimed warm-up call"""
+    timings = []
+    async with repositories() as repository:
+        await call(repository)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await call(repository)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def growth_exponent(sizes: List[int], timings: List[float]) -> float:
+    """Least-squares slope of log(time) over log(size)"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(timing, 1e-6)) for timing in timings]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+async def measure(args) -> Dict[str, Dict[str, dict]]:
+    results: Dict[str, Dict[str, dict]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            timings: Dict[str, Dict[int, float]] = {method: {} for method in METHODS}
+            for size in args.sizes:
+                print(f"seeding {backend} with {size} rows...", file=sys.stderr)
+                async with BACKENDS[backend](size, Path(tmp)) as repositories:
+                    workload = Workload(size, random.Random(args.random_seed))
+                    for method in METHODS:
+                        repeat = args.scan_repeat if method in FULL_SCAN_METHODS else args.repeat
+                        timings[method][size] = await time_method(
+                            repositories, getattr(workload, method), repeat
+                        )
+
+            results[backend] = {}
+            for method in METHODS:
+                expected = 1.0 if method in FULL_SCAN_METHODS else 0.0
+                exponent = growth_exponent(args.sizes, [timings[method][size] for size in args.sizes])
+                results[backend][method] = {
+                    "ms": {str(size): timings[method][size] for size in args.sizes},
+                    "exponent": exponent,
+                    "expected_exponent": expected,
+                    "flagged": exponent > expected + args.tolerance,
+                }
+    return results
+
+
+def print_report(results: Dict[str, Dict[str, dict]], sizes: List[int]) -> None:
+    header = f"{'backend':<7} {'method':<32}" + "".join(f" {f'{size} rows':>14}" for size in sizes)
+    print(header + f" {'exponent':>9} {'expected':>9}")
+    for backend, methods in results.items():
+        for method, result in methods.items():
+            line = f"{backend:<7} {method:<32}" + "".join(
+                f" {result['ms'][str(size)]:>11.3f} ms" for size in sizes
+            )
+            line += f" {result['exponent']:>9.2f} {result['expected_exponent']:>9.0f}"
+            if result["flagged"]:
+                line += "  GROWS TOO FAST"
+            print(line)
+
+
+def parse_sizes(value: str) -> List[int]:
+    sizes = sorted({int(size) for size in value.split(",")})
+    if len(sizes) < 2 or sizes[0] < PAGE_SIZE:
+        raise argparse.ArgumentTypeError(f"need at least two sizes of {PAGE_SIZE} rows or more")
+    return sizes
+
+
+def parse_backends(value: str) -> List[str]:
+    backends = value.split(",")
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown backends {sorted(unknown)}, expected {sorted(BACKENDS)}")
+    return backends
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=parse_sizes, default="1000,100000,1000000")
+    parser.add_argument("--backends", type=parse_backends, default="sql,nosql")
+    parser.add_argument("--repeat", type=int, default=50, help="timed calls per point operation")
+    parser.add_argument("--scan-repeat", type=int, default=3, help="timed calls per full-table operation")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--random-seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(measure(args))
+    print_report(results, args.sizes)
+    if args.output:
+        Path(args.output).write_text(json.dumps({"sizes": args.sizes, "results": results}, indent=2))
+
+    flagged = [
+        f"{backend}.{method}"
+        for backend, methods in results.items()
+        for method, result in methods.items()
+        if result["flagged"]
+    ]
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Compare the rows/sec of turning stored payments into response bytes on the
+previous path and on the fast path the read endpoints use now.
+
+The previous path validated each row into `PaymentDb`, then let FastAPI
+validate the list again against `response_model`, dump it to Python objects
+and `json.dumps` them. The fast path builds `PaymentDb` with
+`PaymentDb.from_stored` in the repositories and serializes it to JSON bytes
+in one step. Rows are fetched from a seeded SQLite table (SQL) or built as
+stored documents (NoSQL) before timing, so only mapping and serialization
+is timed.
+
+Usage: python -m benchmarks.serialization [--rows 10000] [--page-size 100]
+       [--repeat 5] [--output serialization.json]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert, select
+
+from app.adapters.api.payment_router import STREAM_CHUNK_SIZE, _payment_list_adapter
+from app.adapters.models.sql.payment_model import PaymentModel
+from app.adapters.models.sql.schema import create_schema
+from app.adapters.models.sql.session import build_engine
+from app.adapters.repositories.nosql_payment_repository import NoSQLPaymentRepository
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.domain.entities.payment import PaymentDb
+from benchmarks.repository_scaling import SEED_CHUNK_SIZE, chunks, seed_rows
+from tests.fakes.mongo import InMemoryDatabase
+
+# The same response field FastAPI builds for `response_model=List[PaymentDb]`
+RESPONSE_FIELD = create_response_field(name="Response_payments", type_=List[PaymentDb], mode="serialization")
+
+
+async def fetch_sql_rows(size: int, workdir: Path) -> list:
+    engine = build_engine(f"sqlite:///{workdir / 'serialization.db'}")
+    await create_schema(engine)
+    try:
+        async with engine.begin() as connection:
+            for rows in chunks(seed_rows(size), SEED_CHUNK_SIZE):
+                await connection.execute(insert(PaymentModel), rows)
+            return (await connection.execute(select(*PaymentModel.__table__.columns))).all()
+    finally:
+        await engine.dispose()
+
+
+def build_documents(size: int) -> List[dict]:
+    return [{**row, "_id": row.pop("id"), "amount": float(row["amount"])} for row in seed_rows(size)]
+
+
+def validated_sql(row) -> PaymentDb:
+    return PaymentDb(
+        id=row.id, order_id=row.order_id, amount=row.amount, status=row.status,
+        external_id=row.external_id, created_at=row.created_at, updated_at=row.updated_at,
+    )
+
+
+def validated_document(data: dict) -> PaymentDb:
+    return PaymentDb(
+        id=data["_id"], order_id=data["order_id"], amount=str(data["amount"]), status=data["status"],
+        external_id=data.get("external_id"), created_at=data["created_at"], updated_at=data["updated_at"],
+    )
+
+
+async def previous_page(records: list, to_entity: Callable) -> bytes:
+    payments = [to_entity(record) for record in records]
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=payments)
+    return JSONResponse(content).body
+
+
+async def fast_page(records: list, to_entity: Callable) -> bytes:
+    return _payment_list_adapter.dump_json([to_entity(record) for record in records])
+
+
+async def previous_stream(records: list, to_entity: Callable) -> int:
+    sent = 0
+    for record in records:
+        sent += len((to_entity(record).model_dump_json() + "\n").encode())
+    return sent
+
+
+async def fast_stream(records: list, to_entity: Callable) -> int:
+    sent = 0
+    for start in range(0, len(records), STREAM_CHUNK_SIZE):
+        lines = [to_entity(record).model_dump_json() for record in records[start:start + STREAM_CHUNK_SIZE]]
+        sent += len(("\n".join(lines) + "\n").encode())
+    return sent
+
+
+async def rows_per_second(records: list, page_size: int, render: Callable, to_entity: Callable, repeat: int) -> float:
+    """Median rows/sec over `repeat` passes through every record, `page_size` records per call"""
+    pages = [records[start:start + page_size] for start in range(0, len(records), page_size)]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for page in pages:
+            await render(page, to_entity)
+        timings.append(time.perf_counter() - started)
+    return len(records) / statistics.median(timings)
+
+
+async def measure(args) -> Dict[str, Dict[str, float]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        sql_rows = await fetch_sql_rows(args.rows, Path(tmp))
+    documents = build_documents(args.rows)
+
+    nosql_repository = NoSQLPaymentRepository(InMemoryDatabase("serialization")["payments"])
+    backends = {
+        "sql": (sql_rows, validated_sql, SQLPaymentRepository(None)._map_to_entity),
+        "nosql": (documents, validated_document, nosql_repository._map_to_entity),
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    for backend, (records, validated, constructed) in backends.items():
+        for kind, page_size, previous, fast in (
+            ("page", args.page_size, previous_page, fast_page),
+            ("stream", len(records), previous_stream, fast_stream),
+        ):
+            # Both paths must produce the same payload before their speed means anything
+            if kind == "page":
+                assert json.loads(await previous(records[:page_size], validated)) == json.loads(
+                    await fast(records[:page_size], constructed)
+                )
+            before = await rows_per_second(records, page_size, previous, validated, args.repeat)
+            after = await rows_per_second(records, page_size, fast, constructed, args.repeat)
+            results[f"{backend} {kind}"] = {
+                "previous_rows_s": before, "fast_rows_s": after, "speedup": after / before
+            }
+    return results
+
+
+def print_report(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'path':<14} {'previous rows/s':>16} {'fast rows/s':>12} {'speedup':>8}")
+    for path, result in results.items():
+        print(
+            f"{path:<14} {result['previous_rows_s']:>16.0f} {result['fast_rows_s']:>12.0f} "
+            f"{result['speedup']:>7.2f}x"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=100, help="payments per list response")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(measure(args))
+    print_report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps({"rows": args.rows, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
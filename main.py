@@ -1,14 +1,46 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 
+from app.adapters.api.metrics_router import router as metrics_router
 from app.adapters.api.payment_router import router as payment_router
-from app.adapters.models.sql.base import Base
-from app.adapters.models.sql.session import engine
+from app.adapters.api.profiles_router import router as profiles_router
+from app.adapters.api.stats_router import router as stats_router
+from app.adapters.http.service_client import service_client
+from app.adapters.metrics.middleware import MetricsMiddleware
+from app.adapters.models.sql.schema import create_schema
+from app.adapters.models.sql.session import engine, replica_engine
+from app.adapters.profiling.middleware import ProfilingMiddleware
+from app.adapters.profiling.store import profile_store
+from app.adapters.workers.group_commit_writer import group_commit_writer
+from app.adapters.workers.outbox_dispatcher import outbox_dispatcher
+from app.adapters.workers.payment_event_poller import payment_event_poller
 from app.config import settings
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.SQL_CREATE_SCHEMA_ON_STARTUP:
+        await create_schema(engine)
+
+    # Keep one pooled HTTP client to the orders service for the whole process
+    await service_client.start()
+    if settings.OUTBOX_DISPATCHER_ENABLED:
+        await outbox_dispatcher.start()
+    # Publishes changes made by other workers to this worker's event streams
+    await payment_event_poller.start()
+    yield
+    # Commit writes still queued for a batch before the engine goes away
+    await group_commit_writer.stop()
+    await outbox_dispatcher.stop()
+    await payment_event_poller.stop()
+    await service_client.close()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
 
 app = FastAPI(
     title="Payments Service API",
@@ -24,6 +56,7 @@ app = FastAPI(
         "name": "Apache 2.0",
         "url": "https://www.apache.org/licenses/LICENSE-2.0.html",
     },
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -34,6 +67,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(
@@ -41,6 +75,28 @@ app.include_router(
     prefix=f"{settings.API_PREFIX}/payments",
     tags=["payments"],
 )
+app.include_router(
+    stats_router,
+    prefix=f"{settings.API_PREFIX}/stats",
+    tags=["stats"],
+)
+app.include_router(metrics_router, tags=["metrics"])
+
+# Request profiling is opt-in; when it is off the middleware is not installed at all
+if settings.PROFILING_TOKEN or settings.PROFILING_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        token=settings.PROFILING_TOKEN,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+    )
+# Profiles are only served behind a token; sampling alone does not expose them
+if settings.PROFILING_TOKEN:
+    app.include_router(
+        profiles_router,
+        prefix=f"{settings.API_PREFIX}/profiles",
+        tags=["profiling"],
+    )
 
 
 @app.get("/", tags=["health"], summary="Health Check", description="Returns the health status of the service")
@@ -0,0 +1,31 @@
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.adapters.models.sql.base import Base
+from app.adapters.models.sql import (  # noqa: F401
+    idempotency_model,
+    outbox_model,
+    payment_archive_model,
+    payment_model,
+)
+
+
+@pytest_asyncio.fixture
+async def sql_engine():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def sql_session_factory(sql_engine):
+    return async_sessionmaker(bind=sql_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def sql_session(sql_session_factory):
+    async with sql_session_factory() as session:
+        yield session
@@ -0,0 +1,527 @@
+"""
+In-memory stand-in for the subset of the motor collection API used by the
+NoSQL repositories, shared by the tests and the benchmarks. Equality and
+`$in` lookups on indexed fields and `_id` range scans are served from
+indexes, like a real server would, so its timings scale the way the
+queries do rather than as full scans.
+"""
+import bisect
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+_UNHASHABLE = object()
+_RANGE_OPERATORS = {
+    "$gt": lambda value, bound: value > bound,
+    "$gte": lambda value, bound: value >= bound,
+    "$lt": lambda value, bound: value < bound,
+    "$lte": lambda value, bound: value <= bound,
+}
+_TYPES = {"string": str, "int": int, "double": float, "date": datetime, "bool": bool}
+
+
+class UnsupportedOperation(AssertionError):
+    """The code under test used a part of the Mongo API this fake does not implement"""
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _values(document: Any, path: List[str]) -> List[Any]:
+    """Every value at a dotted path, descending into arrays like Mongo does"""
+    if not path:
+        return [document]
+    head, rest = path[0], path[1:]
+    if isinstance(document, dict):
+        return _values(document[head], rest) if head in document else []
+    if isinstance(document, list):
+        if head.isdigit():
+            index = int(head)
+            return _values(document[index], rest) if index < len(document) else []
+        return [value for item in document for value in _values(item, path)]
+    return []
+
+
+def _matches_condition(values: List[Any], condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for operator, operand in condition.items():
+            if operator == "$in":
+                if not any(value in operand for value in values):
+                    return False
+            elif operator == "$exists":
+                if bool(values) != bool(operand):
+                    return False
+            elif operator == "$type":
+                if not any(isinstance(value, _TYPES[operand]) for value in values):
+                    return False
+            elif operator in _RANGE_OPERATORS:
+                compare = _RANGE_OPERATORS[operator]
+                if not any(value is not None and compare(value, operand) for value in values):
+                    return False
+            else:
+                raise UnsupportedOperation(f"query operator {operator} is not supported")
+        return True
+    if condition is None:
+        return not values or None in values
+    return condition in values
+
+
+def matches(document: dict, query: dict) -> bool:
+    return all(
+        _matches_condition(_values(document, field.split(".")), condition)
+        for field, condition in query.items()
+    )
+
+
+def _project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return _copy(document)
+    included = [field for field, flag in projection.items() if flag and field != "_id"]
+    if included:
+        projected = {field: _copy(document[field]) for field in included if field in document}
+        if projection.get("_id", True):
+            projected["_id"] = document["_id"]
+        return projected
+    excluded = {field for field, flag in projection.items() if not flag}
+    return {field: _copy(value) for field, value in document.items() if field not in excluded}
+
+
+def _parent(document: dict, path: List[str], create: bool = True) -> Tuple[Any, str]:
+    target = document
+    for part in path[:-1]:
+        if isinstance(target, list):
+            target = target[int(part)]
+        else:
+            if part not in target:
+                if not create:
+                    return None, path[-1]
+                target[part] = {}
+            target = target[part]
+    return target, path[-1]
+
+
+def _set(document: dict, field: str, value: Any) -> None:
+    target, key = _parent(document, field.split("."))
+    if isinstance(target, list):
+        target[int(key)] = value
+    else:
+        target[key] = value
+
+
+def _get(document: dict, field: str, default: Any = _MISSING) -> Any:
+    target, key = _parent(document, field.split("."), create=False)
+    if target is None:
+        return default
+    if isinstance(target, list):
+        return target[int(key)] if int(key) < len(target) else default
+    return target.get(key, default)
+
+
+def _evaluate(document: dict, expression: Any) -> Any:
+    """Aggregation expression: `$field` references, `$dateToString` and literal values"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get(document, expression[1:], None)
+    if isinstance(expression, dict):
+        if "$dateToString" in expression:
+            options = expression["$dateToString"]
+            return _evaluate(document, options["date"]).strftime(options["format"])
+        return {key: _evaluate(document, value) for key, value in expression.items()}
+    return expression
+
+
+def _group(documents: Iterable[dict], stage: dict) -> List[dict]:
+    groups: Dict[Any, dict] = {}
+    for document in documents:
+        group_id = _evaluate(document, stage["_id"])
+        key = tuple(sorted(group_id.items())) if isinstance(group_id, dict) else group_id
+        group = groups.setdefault(key, {"_id": group_id})
+        for field, accumulator in stage.items():
+            if field == "_id":
+                continue
+            if set(accumulator) != {"$sum"}:
+                raise UnsupportedOperation(f"unsupported accumulator {accumulator}")
+            group[field] = group.get(field, 0) + (_evaluate(document, accumulator["$sum"]) or 0)
+    return list(groups.values())
+
+
+def apply_update(document: dict, update: dict) -> None:
+    for operator, fields in update.items():
+        for field, operand in fields.items():
+            if operator == "$set":
+                _set(document, field, _copy(operand))
+            elif operator == "$inc":
+                _set(document, field, _get(document, field, 0) + operand)
+            elif operator == "$max":
+                current = _get(document, field)
+                if current is _MISSING or operand > current:
+                    _set(document, field, operand)
+            elif operator == "$push":
+                array = _get(document, field)
+                if array is _MISSING:
+                    array = []
+                    _set(document, field, array)
+                array.append(_copy(operand))
+            elif operator == "$pop":
+                array = _get(document, field)
+                if array is not _MISSING and array:
+                    array.pop(0 if operand == -1 else -1)
+            else:
+                raise UnsupportedOperation(f"update operator {operator} is not supported")
+
+
+def _hashable(value: Any) -> Any:
+    try:
+        hash(value)
+    except TypeError:
+        return _UNHASHABLE
+    return value
+
+
+class _Index:
+    def __init__(self, field: str, unique: bool, partial_filter: Optional[dict], sparse: bool):
+        self.field = field
+        self.path = field.split(".")
+        self.unique = unique
+        self.partial_filter = partial_filter
+        self.sparse = sparse
+        self.entries: Dict[Any, Set[Any]] = {}
+
+    def keys(self, document: dict) -> List[Any]:
+        if self.partial_filter and not matches(document, self.partial_filter):
+            return []
+        values = _values(document, self.path)
+        if not values and not self.sparse:
+            values = [None]
+        return [value for value in set(map(_hashable, values)) if value is not _UNHASHABLE]
+
+    def covers(self, value: Any) -> bool:
+        """Whether every document whose field equals `value` is in this index"""
+        if _hashable(value) is _UNHASHABLE or (value is None and (self.sparse or self.partial_filter)):
+            return False
+        if self.partial_filter:
+            document: Any = value
+            for part in reversed(self.path):
+                document = {part: document}
+            return matches(document, self.partial_filter)
+        return True
+
+    def add(self, document: dict) -> None:
+        for key in self.keys(document):
+            ids = self.entries.setdefault(key, set())
+            if self.unique and ids and document["_id"] not in ids:
+                raise DuplicateKeyError(f"E11000 duplicate key error index: {self.field} dup key: {key!r}")
+            ids.add(document["_id"])
+
+    def remove(self, document: dict) -> None:
+        for key in self.keys(document):
+            ids = self.entries.get(key)
+            if ids:
+                ids.discard(document["_id"])
+                if not ids:
+                    del self.entries[key]
+
+
+class InMemoryCursor:
+    def __init__(self, collection: "InMemoryCollection", query: dict, projection: Optional[dict]):
+        self.collection = collection
+        self.query = query or {}
+        self.projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._limit = 0
+
+    def sort(self, key, direction: int = ASCENDING) -> "InMemoryCursor":
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def limit(self, limit: int) -> "InMemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "InMemoryCursor":
+        return self
+
+    def _documents(self) -> Iterator[dict]:
+        if self._sort and self._sort != [("_id", ASCENDING)] and self._sort != [("_id", DESCENDING)]:
+            documents: Iterable[dict] = list(self.collection._matching(self.query))
+            for field, direction in reversed(self._sort):
+                documents = sorted(documents, key=lambda doc: _get(doc, field, None), reverse=direction == DESCENDING)
+        else:
+            documents = self.collection._matching(self.query, reverse=self._sort == [("_id", DESCENDING)])
+
+        for count, document in enumerate(documents, start=1):
+            yield _project(document, self.projection)
+            if self._limit and count >= self._limit:
+                return
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        documents = []
+        for document in self._documents():
+            documents.append(document)
+            if length and len(documents) >= length:
+                break
+        return documents
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for document in self._documents():
+            yield document
+
+
+class InMemoryAggregateCursor:
+    def __init__(self, documents: List[dict]):
+        self.documents = documents
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        return self.documents[:length] if length else list(self.documents)
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for document in self.documents:
+            yield document
+
+
+class InMemoryCollection:
+    def __init__(self, database: "InMemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._documents: Dict[Any, dict] = {}
+        self._ids: List[Any] = []
+        self._indexes: Dict[str, _Index] = {}
+
+    async def create_index(self, keys, unique: bool = False, partialFilterExpression: Optional[dict] = None,
+                           sparse: bool = False, **kwargs) -> str:
+        field = keys[0][0] if isinstance(keys, list) else keys
+        if field not in self._indexes:
+            index = _Index(field, unique, partialFilterExpression, sparse)
+            for document in self._documents.values():
+                index.add(document)
+            self._indexes[field] = index
+        return f"{field}_1"
+
+    async def index_information(self) -> Dict[str, dict]:
+        information = {"_id_": {"key": [("_id", ASCENDING)]}}
+        for field, index in self._indexes.items():
+            information[f"{field}_1"] = {"key": [(field, ASCENDING)], **({"unique": True} if index.unique else {})}
+        return information
+
+    async def drop_index(self, name: str) -> None:
+        self._indexes.pop(name[:-len("_1")])
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> InMemoryCursor:
+        return InMemoryCursor(self, query or {}, projection)
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None,
+                       sort: Optional[List[Tuple[str, int]]] = None) -> Optional[dict]:
+        cursor = self.find(query, projection).limit(1)
+        if sort:
+            cursor.sort(sort)
+        documents = await cursor.to_list()
+        return documents[0] if documents else None
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        self._insert(document)
+        return InsertOneResult(document["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True) -> InsertManyResult:
+        inserted_ids = [self._insert(document) for document in documents]
+        return InsertManyResult(inserted_ids, acknowledged=True)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        matched, upserted_id = self._update_one(query, update, upsert)
+        raw_result = {"n": matched or int(upserted_id is not None), "nModified": matched}
+        if upserted_id is not None:
+            raw_result["upserted"] = upserted_id
+        return UpdateResult(raw_result, acknowledged=True)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection: Optional[dict] = None,
+                                  upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE) -> Optional[dict]:
+        document = next(self._matching(query), None)
+        if document is None:
+            if not upsert:
+                return None
+            _, upserted_id = self._update_one(query, update, upsert=True)
+            return _project(self._documents[upserted_id], projection) if return_document else None
+
+        before = _project(document, projection)
+        self._apply(document, update)
+        return _project(document, projection) if return_document else before
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True) -> BulkWriteResult:
+        matched = 0
+        upserted = []
+        for index, request in enumerate(requests):
+            if isinstance(request, ReplaceOne):
+                count, upserted_id = self._replace_one(request._filter, request._doc, request._upsert)
+            else:
+                count, upserted_id = self._update_one(request._filter, request._doc, request._upsert)
+            matched += count
+            if upserted_id is not None:
+                upserted.append({"index": index, "_id": upserted_id})
+        return BulkWriteResult(
+            {
+                "nInserted": 0,
+                "nUpserted": len(upserted),
+                "nMatched": matched,
+                "nModified": matched,
+                "nRemoved": 0,
+                "upserted": upserted,
+            },
+            acknowledged=True,
+        )
+
+    def aggregate(self, pipeline: List[dict]) -> InMemoryAggregateCursor:
+        """Supports `$match` (as the first stage, served from indexes), `$group` with `$sum`, and `$sort`"""
+        documents: Iterable[dict] = []
+        for position, stage in enumerate(pipeline):
+            (operator, argument), = stage.items()
+            if operator == "$match" and position == 0:
+                documents = self._matching(argument)
+            elif operator == "$group":
+                documents = _group(documents if position else self._documents.values(), argument)
+            elif operator == "$sort":
+                documents = list(documents)
+                for field, direction in reversed(list(argument.items())):
+                    documents.sort(key=lambda doc: _get(doc, field, None), reverse=direction == DESCENDING)
+            else:
+                raise UnsupportedOperation(f"unsupported aggregation stage {operator}")
+        return InMemoryAggregateCursor([_copy(document) for document in documents])
+
+    async def delete_many(self, query: dict) -> DeleteResult:
+        documents = list(self._matching(query))
+        for document in documents:
+            self._remove(document)
+        return DeleteResult({"n": len(documents)}, acknowledged=True)
+
+    async def count_documents(self, query: dict) -> int:
+        return sum(1 for _ in self._matching(query))
+
+    def _insert(self, document: dict) -> Any:
+        if "_id" not in document:
+            raise ValueError("documents inserted into the in-memory collection need an _id")
+        if document["_id"] in self._documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error index: _id dup key: {document['_id']!r}")
+        stored = _copy(document)
+        for index in self._indexes.values():
+            index.add(stored)
+        self._documents[stored["_id"]] = stored
+        if not self._ids or stored["_id"] > self._ids[-1]:
+            self._ids.append(stored["_id"])
+        else:
+            bisect.insort(self._ids, stored["_id"])
+        return stored["_id"]
+
+    def _remove(self, document: dict) -> None:
+        for index in self._indexes.values():
+            index.remove(document)
+        del self._documents[document["_id"]]
+        self._ids.pop(bisect.bisect_left(self._ids, document["_id"]))
+
+    def _replace_one(self, query: dict, replacement: dict, upsert: bool) -> Tuple[int, Any]:
+        document = next(self._matching(query), None)
+        if document is None and not upsert:
+            return 0, None
+        replacement = dict(replacement)
+        if document is not None:
+            replacement["_id"] = document["_id"]
+            self._remove(document)
+        elif "_id" not in replacement:
+            replacement["_id"] = query["_id"]
+        self._insert(replacement)
+        return (1, None) if document is not None else (0, replacement["_id"])
+
+    def _update_one(self, query: dict, update: dict, upsert: bool) -> Tuple[int, Any]:
+        document = next(self._matching(query), None)
+        if document is not None:
+            self._apply(document, update)
+            return 1, None
+        if not upsert:
+            return 0, None
+        document = {field: value for field, value in query.items() if not isinstance(value, dict)}
+        apply_update(document, update)
+        return 0, self._insert(document)
+
+    def _apply(self, document: dict, update: dict) -> None:
+        for index in self._indexes.values():
+            index.remove(document)
+        try:
+            apply_update(document, update)
+        finally:
+            for index in self._indexes.values():
+                index.add(document)
+
+    def _candidate_ids(self, query: dict) -> Optional[Set[Any]]:
+        """IDs that can match, from the indexes; None when the query needs a scan"""
+        candidates = None
+        for field, condition in query.items():
+            if field == "_id" and not isinstance(condition, dict):
+                ids = {condition} if condition in self._documents else set()
+            elif field in self._indexes:
+                index = self._indexes[field]
+                if isinstance(condition, dict):
+                    if set(condition) != {"$in"}:
+                        continue
+                    values = condition["$in"]
+                else:
+                    values = [condition]
+                if not all(index.covers(value) for value in values):
+                    continue
+                ids = set().union(*(index.entries.get(value, ()) for value in values))
+            else:
+                continue
+            candidates = ids if candidates is None else candidates & ids
+        return candidates
+
+    def _id_range(self, query: dict) -> Tuple[int, int]:
+        start, stop = 0, len(self._ids)
+        condition = query.get("_id")
+        if isinstance(condition, dict):
+            if "$gt" in condition:
+                start = bisect.bisect_right(self._ids, condition["$gt"])
+            if "$gte" in condition:
+                start = max(start, bisect.bisect_left(self._ids, condition["$gte"]))
+            if "$lt" in condition:
+                stop = bisect.bisect_left(self._ids, condition["$lt"])
+            if "$lte" in condition:
+                stop = min(stop, bisect.bisect_right(self._ids, condition["$lte"]))
+        return start, stop
+
+    def _matching(self, query: dict, reverse: bool = False) -> Iterator[dict]:
+        """Matching documents in _id order"""
+        candidates = self._candidate_ids(query)
+        if candidates is not None:
+            ids = sorted(candidates, reverse=reverse)
+        else:
+            start, stop = self._id_range(query)
+            ids = reversed(range(start, stop)) if reverse else range(start, stop)
+            ids = (self._ids[position] for position in ids)
+
+        for document_id in ids:
+            document = self._documents.get(document_id)
+            if document is not None and matches(document, query):
+                yield document
+
+
+class InMemoryDatabase:
+    def __init__(self, name: str = "benchmarks"):
+        self.name = name
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(self, name)
+        return self._collections[name]
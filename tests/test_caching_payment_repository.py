@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.adapters.cache.payment_cache import PaymentCache
+from app.adapters.repositories.caching_payment_repository import CachingPaymentRepository
+from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+from main import app
+
+pytestmark = pytest.mark.asyncio
+
+
+def _payment(payment_id=1, order_id=10, status=PaymentStatus.PENDING):
+    now = datetime.utcnow()
+    return PaymentDb(
+        id=payment_id, order_id=order_id, amount=Decimal("10.00"), status=status,
+        external_id=f"PAY-{payment_id}", created_at=now, updated_at=now,
+    )
+
+
+@pytest.fixture
+def repository():
+    repository = MagicMock(spec=PaymentRepository)
+    repository.get_by_id = AsyncMock(return_value=_payment())
+    repository.get_by_order_id = AsyncMock(return_value=None)
+    return repository
+
+
+@pytest.fixture
+def cache():
+    return PaymentCache(max_size=10, ttl=60)
+
+
+async def test_lookups_are_served_from_the_cache(repository, cache):
+    caching = CachingPaymentRepository(repository, cache)
+
+    assert (await caching.get_by_id(1)).id == 1
+    assert (await caching.get_by_id(1)).id == 1
+    assert await caching.get_by_order_id(10) is None
+    assert await caching.get_by_order_id(10) is None
+
+    assert repository.get_by_id.await_count == 1
+    # Orders without a payment are read again every time
+    assert repository.get_by_order_id.await_count == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["hit_ratio"] == 0.25
+
+
+async def test_missing_order_sees_a_payment_created_by_another_worker(repository, cache):
+    caching = CachingPaymentRepository(repository, cache)
+    assert await caching.get_by_order_id(10) is None
+
+    # Created through another process, so this cache was never invalidated
+    repository.get_by_order_id.return_value = _payment(order_id=10)
+
+    assert (await caching.get_by_order_id(10)).order_id == 10
+
+
+async def test_create_invalidates_the_cached_order(repository, cache):
+    repository.get_by_order_id.return_value = _payment(order_id=10)
+    caching = CachingPaymentRepository(repository, cache)
+    await caching.get_by_order_id(10)
+
+    repository.create = AsyncMock(return_value=_payment(payment_id=2, order_id=10))
+    await caching.create(Payment(order_id=10, amount=Decimal("10.00"), status=PaymentStatus.PENDING))
+    repository.get_by_order_id.return_value = _payment(payment_id=2, order_id=10)
+
+    assert (await caching.get_by_order_id(10)).id == 2
+
+
+@pytest.mark.parametrize("write", ["update_status", "update_external_id", "update_statuses_by_external_id"])
+async def test_writes_invalidate_both_keys(repository, cache, write):
+    repository.get_by_order_id.return_value = _payment()
+    caching = CachingPaymentRepository(repository, cache)
+    await caching.get_by_id(1)
+    await caching.get_by_order_id(10)
+
+    approved = _payment(status=PaymentStatus.APPROVED)
+    if write == "update_status":
+        repository.update_status = AsyncMock(return_value=approved)
+        await caching.update_status(1, PaymentStatus.APPROVED)
+    elif write == "update_external_id":
+        repository.update_external_id = AsyncMock(return_value=approved)
+        await caching.update_external_id(1, "PAY-new")
+    else:
+        repository.update_statuses_by_external_id = AsyncMock(return_value=[approved])
+        await caching.update_statuses_by_external_id({"PAY-1": PaymentStatus.APPROVED})
+    repository.get_by_id.return_value = approved
+    repository.get_by_order_id.return_value = approved
+
+    assert (await caching.get_by_id(1)).status == PaymentStatus.APPROVED
+    assert (await caching.get_by_order_id(10)).status == PaymentStatus.APPROVED
+
+
+async def test_read_racing_a_write_is_not_cached(repository, cache):
+    read_started = asyncio.Event()
+    release_read = asyncio.Event()
+
+    async def slow_get_by_id(payment_id):
+        read_started.set()
+        await release_read.wait()
+        return _payment()
+
+    repository.get_by_id = AsyncMock(side_effect=slow_get_by_id)
+    repository.update_status = AsyncMock(return_value=_payment(status=PaymentStatus.APPROVED))
+    caching = CachingPaymentRepository(repository, cache)
+
+    read = asyncio.create_task(caching.get_by_id(1))
+    await read_started.wait()
+    await caching.update_status(1, PaymentStatus.APPROVED)
+    release_read.set()
+    await read
+
+    assert len(cache.entries) == 0
+
+
+async def test_cache_stats_endpoint():
+    response = TestClient(app).get("/api/v1/stats/payments-cache")
+
+    assert response.status_code == 200
+    assert {"hits", "misses", "hit_ratio", "evictions"} <= set(response.json())
@@ -0,0 +1,31 @@
+import inspect
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.adapters.repositories.delegating_payment_repository import DelegatingPaymentRepository
+from app.domain.interfaces.payment_repository import PaymentRepository
+
+pytestmark = pytest.mark.asyncio
+
+PORT_METHODS = sorted(PaymentRepository.__abstractmethods__)
+
+
+@pytest.mark.parametrize("method", [name for name in PORT_METHODS if name != "iter_all"])
+async def test_calls_are_passed_through(method):
+    repository = MagicMock(spec=PaymentRepository)
+    setattr(repository, method, AsyncMock(return_value="result"))
+    parameters = list(inspect.signature(getattr(PaymentRepository, method)).parameters)[1:]
+    args = [object() for _ in parameters]
+
+    assert await getattr(DelegatingPaymentRepository(repository), method)(*args) == "result"
+    getattr(repository, method).assert_awaited_once_with(*args)
+
+
+async def test_iter_all_is_passed_through():
+    repository = MagicMock(spec=PaymentRepository)
+    stream = object()
+    repository.iter_all = MagicMock(return_value=stream)
+
+    assert DelegatingPaymentRepository(repository).iter_all(None, 10) is stream
+    repository.iter_all.assert_called_once_with(None, 10)
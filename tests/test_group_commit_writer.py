@@ -0,0 +1,100 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.adapters.models.sql.outbox_model import OutboxModel
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.adapters.workers.group_commit_writer import GroupCommitWriter
+from app.domain.entities.payment import Payment, PaymentStatus
+
+pytestmark = pytest.mark.asyncio
+
+
+def _payment(order_id, external_id=None):
+    return Payment(
+        order_id=order_id, amount=Decimal("10.00"), status=PaymentStatus.PENDING, external_id=external_id
+    )
+
+
+class CountingWriter(GroupCommitWriter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    async def _write(self, batch):
+        self.batches.append(len(batch))
+        return await super()._write(batch)
+
+
+async def test_concurrent_creates_are_committed_together(sql_session, sql_session_factory):
+    writer = CountingWriter(sql_session_factory, interval=0.05, max_batch=100)
+
+    created = await asyncio.gather(*(writer.create(_payment(order_id)) for order_id in range(1, 21)))
+    await writer.stop()
+
+    assert writer.batches == [20]
+    assert [payment.order_id for payment in created] == list(range(1, 21))
+    assert len({payment.id for payment in created}) == 20
+    assert len(await SQLPaymentRepository(sql_session).get_all()) == 20
+
+
+async def test_full_batch_is_flushed_without_waiting_for_the_interval(sql_session_factory):
+    writer = CountingWriter(sql_session_factory, interval=60, max_batch=5)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(writer.create(_payment(order_id)) for order_id in range(1, 11))), 5
+    )
+    await writer.stop()
+
+    assert writer.batches == [5, 5]
+
+
+async def test_status_updates_are_applied_in_order_with_their_outbox_messages(sql_session, sql_session_factory):
+    created = await SQLPaymentRepository(sql_session).create(_payment(1))
+    writer = GroupCommitWriter(sql_session_factory, interval=0.05, max_batch=100)
+
+    approved, rejected, missing = await asyncio.gather(
+        writer.update_status(created.id, PaymentStatus.APPROVED),
+        writer.update_status(created.id, PaymentStatus.REJECTED),
+        writer.update_status(created.id + 1, PaymentStatus.APPROVED),
+    )
+    await writer.stop()
+
+    assert approved.status == PaymentStatus.APPROVED
+    assert rejected.status == PaymentStatus.REJECTED
+    assert missing is None
+    async with sql_session_factory() as session:
+        statuses = await session.scalars(select(OutboxModel.payment_status).order_by(OutboxModel.id))
+        assert (await SQLPaymentRepository(session).get_by_id(created.id)).status == PaymentStatus.REJECTED
+    assert list(statuses) == [PaymentStatus.APPROVED.value, PaymentStatus.REJECTED.value]
+
+
+async def test_failed_batch_only_fails_the_offending_write(sql_session, sql_session_factory):
+    writer = CountingWriter(sql_session_factory, interval=0.05, max_batch=100)
+
+    results = await asyncio.gather(
+        writer.create(_payment(1, "PAY-1")),
+        writer.create(_payment(2, "PAY-1")),
+        writer.create(_payment(3)),
+        return_exceptions=True,
+    )
+    await writer.stop()
+
+    assert writer.batches == [3, 1, 1, 1]
+    assert results[0].order_id == 1
+    assert isinstance(results[1], IntegrityError)
+    assert results[2].order_id == 3
+    assert sorted(payment.order_id for payment in await SQLPaymentRepository(sql_session).get_all()) == [1, 3]
+
+
+async def test_stop_flushes_queued_writes(sql_session, sql_session_factory):
+    writer = GroupCommitWriter(sql_session_factory, interval=60, max_batch=100)
+    pending = asyncio.ensure_future(writer.create(_payment(1)))
+    await asyncio.sleep(0)
+
+    await asyncio.wait_for(writer.stop(), 5)
+
+    assert (await pending).order_id == 1
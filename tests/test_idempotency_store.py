@@ -0,0 +1,117 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.adapters.api.idempotency import IDEMPOTENT_REPLAY_HEADER, IdempotencyStore
+from app.adapters.cache.ttl_cache import TTLCache
+from app.adapters.models.sql.idempotency_model import IdempotencyKeyModel
+from app.adapters.repositories.sql_idempotency_repository import SQLIdempotencyRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def repository(sql_session):
+    return SQLIdempotencyRepository(sql_session)
+
+
+@pytest.fixture
+def store():
+    return IdempotencyStore(cache=TTLCache(max_size=100, ttl=60), ttl=60, purge_interval=300, claim_lease=5)
+
+
+class Operation:
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+async def test_retries_replay_the_first_response(repository, store):
+    operation = Operation(result={"qr_code": "PAY-1"})
+
+    first = await store.run(repository, "key", "fp", 200, operation)
+    retry = await store.run(repository, "key", "fp", 200, operation)
+
+    assert operation.calls == 1
+    assert json.loads(first.body) == json.loads(retry.body) == {"qr_code": "PAY-1"}
+    assert IDEMPOTENT_REPLAY_HEADER.lower() not in first.headers
+    assert retry.headers[IDEMPOTENT_REPLAY_HEADER] == "true"
+
+
+async def test_replay_from_another_worker_reads_the_stored_record(repository, store, sql_session_factory):
+    await store.run(repository, "key", "fp", 201, Operation(result={"id": 7}))
+    other_worker = IdempotencyStore(cache=TTLCache(max_size=100, ttl=60), ttl=60, purge_interval=300, claim_lease=5)
+    operation = Operation(result={"id": 8})
+
+    async with sql_session_factory() as session:
+        retry = await other_worker.run(SQLIdempotencyRepository(session), "key", "fp", 201, operation)
+
+    assert operation.calls == 0
+    assert retry.status_code == 201
+    assert json.loads(retry.body) == {"id": 7}
+
+
+async def test_concurrent_retries_run_the_operation_once(repository, store):
+    operation = Operation(result={"qr_code": "PAY-1"})
+
+    responses = await asyncio.gather(*(store.run(repository, "key", "fp", 200, operation) for _ in range(5)))
+
+    assert operation.calls == 1
+    assert len({response.body for response in responses}) == 1
+
+
+async def test_key_reused_for_a_different_request_is_rejected(repository, store):
+    await store.run(repository, "key", "fp", 200, Operation(result={}))
+
+    with pytest.raises(HTTPException) as error:
+        await store.run(repository, "key", "other-fp", 200, Operation(result={}))
+    assert error.value.status_code == 422
+
+
+async def test_failed_requests_are_not_stored(repository, store):
+    failing = Operation(error=HTTPException(status_code=400, detail="Order not found"))
+    with pytest.raises(HTTPException):
+        await store.run(repository, "key", "fp", 200, failing)
+
+    retry = Operation(result={"qr_code": "PAY-1"})
+    response = await store.run(repository, "key", "fp", 200, retry)
+
+    assert retry.calls == 1
+    assert json.loads(response.body) == {"qr_code": "PAY-1"}
+
+
+async def test_claim_is_leased_and_the_response_kept_for_the_ttl(repository, sql_session):
+    store = IdempotencyStore(cache=TTLCache(max_size=100, ttl=60), ttl=3600, purge_interval=300, claim_lease=5)
+    leases = []
+
+    async def operation():
+        leases.append(await sql_session.scalar(select(IdempotencyKeyModel.expires_at)))
+        return {}
+
+    started = datetime.utcnow()
+    await store.run(repository, "key", "fp", 200, operation)
+
+    assert leases[0] <= started + timedelta(seconds=6)
+    assert await sql_session.scalar(select(IdempotencyKeyModel.expires_at)) >= started + timedelta(seconds=3600)
+
+
+async def test_claim_left_by_a_crashed_request_is_taken_over_once_its_lease_runs_out(repository, store):
+    await repository.claim("key", "fp", datetime.utcnow() - timedelta(seconds=1))
+    operation = Operation(result={"id": 1})
+
+    response = await store.run(repository, "key", "fp", 201, operation)
+
+    assert operation.calls == 1
+    assert response.status_code == 201
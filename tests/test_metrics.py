@@ -0,0 +1,114 @@
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.adapters.api.payment_router import get_payment_use_cases
+from app.adapters.metrics.registry import MetricsRegistry
+from app.adapters.repositories.instrumented_payment_repository import InstrumentedPaymentRepository
+from app.domain.entities.payment import PaymentDb, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+from main import app
+
+client = TestClient(app)
+
+
+class TestMetricsRegistry:
+    def setup_method(self):
+        self.registry = MetricsRegistry()
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = self.registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        child = histogram.labels("/a")
+        for value in (0.05, 0.5, 0.7, 3.0):
+            child.observe(value)
+
+        lines = self.registry.render().splitlines()
+
+        assert "# TYPE latency_seconds histogram" in lines
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/a",le="1"} 3' in lines
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+        assert 'latency_seconds_sum{route="/a"} 4.25' in lines
+        assert 'latency_seconds_count{route="/a"} 4' in lines
+
+    def test_label_children_are_reused(self):
+        counter = self.registry.counter("calls_total", "Calls", ("method",))
+
+        counter.labels("get").inc()
+        counter.labels("get").inc(2)
+
+        assert counter.labels("get") is counter.labels("get")
+        assert 'calls_total{method="get"} 3' in self.registry.render()
+
+    def test_label_values_are_escaped(self):
+        gauge = self.registry.gauge("in_flight", "In flight", ("path",))
+        gauge.labels('a"b\\c').set(1)
+
+        assert 'in_flight{path="a\\"b\\\\c"} 1' in self.registry.render()
+
+    def test_children_labelled_while_rendering_are_tolerated(self):
+        counter = self.registry.counter("calls_total", "Calls", ("method",))
+        histogram = self.registry.histogram("latency_seconds", "Latency", ("route",), buckets=(1.0,))
+        counter.labels("get").inc()
+        histogram.labels("/a").observe(0.1)
+
+        samples = [counter._samples(), histogram._samples()]
+        for metric_samples in samples:
+            next(metric_samples)
+        counter.labels("post").inc()
+        histogram.labels("/b").observe(0.1)
+
+        # Iterating the live dicts would raise "dictionary changed size during iteration"
+        assert [len(list(metric_samples)) for metric_samples in samples] == [0, 3]
+
+    def test_wrong_label_count_is_rejected(self):
+        counter = self.registry.counter("calls_total", "Calls", ("method",))
+
+        with pytest.raises(ValueError):
+            counter.labels("get", "extra")
+
+
+def test_metrics_endpoint_reports_route_templates():
+    now = datetime.utcnow()
+    use_cases = AsyncMock()
+    use_cases.get_payment_by_id.return_value = PaymentDb(
+        id=7, order_id=1, amount=Decimal("10.0"), status=PaymentStatus.PENDING,
+        external_id=None, created_at=now, updated_at=now,
+    )
+    app.dependency_overrides[get_payment_use_cases] = lambda: use_cases
+    try:
+        assert client.get("/api/v1/payments/7").status_code == 200
+    finally:
+        app.dependency_overrides.pop(get_payment_use_cases, None)
+    client.get("/no-such-path")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'payments_http_request_duration_seconds_count{method="GET",route="/api/v1/payments/{payment_id}"}' in body
+    assert 'payments_http_requests_total{method="GET",route="/api/v1/payments/{payment_id}",status="200"}' in body
+    assert 'payments_http_requests_total{method="GET",route="<unmatched>",status="404"}' in body
+    assert "payments_http_requests_in_flight 1" in body
+
+
+@pytest.mark.asyncio
+async def test_instrumented_repository_times_calls_and_counts_errors():
+    repository = MagicMock(spec=PaymentRepository)
+    repository.get_by_id = AsyncMock(return_value=None)
+    repository.create = AsyncMock(side_effect=RuntimeError("database is down"))
+    instrumented = InstrumentedPaymentRepository(repository, "test")
+
+    assert await instrumented.get_by_id(1) is None
+    with pytest.raises(RuntimeError):
+        await instrumented.create(MagicMock())
+
+    repository.get_by_id.assert_awaited_once_with(1)
+    body = client.get("/metrics").text
+    assert 'payments_repository_call_duration_seconds_count{backend="test",method="get_by_id"} 1' in body
+    assert 'payments_repository_call_duration_seconds_count{backend="test",method="create"} 1' in body
+    assert 'payments_repository_call_errors_total{backend="test",method="create"} 1' in body
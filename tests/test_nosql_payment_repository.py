@@ -0,0 +1,147 @@
+import logging
+
+import pytest
+from decimal import Decimal
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.adapters.models.nosql.connection import ORDER_ID_INDEX, ensure_indexes
+from app.adapters.repositories.nosql_payment_repository import NoSQLPaymentRepository
+from app.application.use_cases.payment_use_cases import PaymentUseCases
+from app.domain.entities.payment import Payment, PaymentCallback, PaymentStatus
+from tests.fakes.mongo import InMemoryDatabase
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def collection(request):
+    # Indexes and ID allocators are kept per collection name, so each test gets its own
+    return InMemoryDatabase(request.node.name)["payments"]
+
+
+@pytest.fixture
+def repository(collection):
+    return NoSQLPaymentRepository(collection)
+
+
+async def _create(repository, order_id, external_id=None):
+    return await repository.create(
+        Payment(
+            order_id=order_id, amount=Decimal("10.00"),
+            status=PaymentStatus.PENDING, external_id=external_id
+        )
+    )
+
+
+async def _outbox_statuses(collection, payment_id):
+    document = await collection.find_one({"_id": payment_id})
+    return [message["payment_status"] for message in document.get("outbox", [])]
+
+
+async def test_update_status_writes_the_outbox_entry(repository, collection):
+    created = await _create(repository, 1)
+
+    updated = await repository.update_status(created.id, PaymentStatus.APPROVED)
+
+    assert updated.status == PaymentStatus.APPROVED
+    assert updated.updated_at >= created.updated_at
+    assert await repository.get_by_id(created.id) == updated
+    assert await _outbox_statuses(collection, created.id) == [PaymentStatus.APPROVED]
+    assert await repository.update_status(999, PaymentStatus.APPROVED) is None
+
+
+async def test_update_external_id(repository, collection):
+    created = await _create(repository, 1)
+
+    updated = await repository.update_external_id(created.id, "PAY-new")
+
+    assert updated.external_id == "PAY-new"
+    assert await repository.get_by_external_id("PAY-new") == updated
+    assert await _outbox_statuses(collection, created.id) == []
+    assert await repository.update_external_id(999, "PAY-other") is None
+
+
+async def test_update_statuses_by_external_id(repository, collection):
+    first = await _create(repository, 1, "PAY-1")
+    second = await _create(repository, 2, "PAY-2")
+    third = await _create(repository, 3, "PAY-3")
+
+    updated = await repository.update_statuses_by_external_id(
+        {"PAY-1": PaymentStatus.APPROVED, "PAY-2": PaymentStatus.DENIED, "PAY-missing": PaymentStatus.APPROVED}
+    )
+
+    assert {p.id: p.status for p in updated} == {
+        first.id: PaymentStatus.APPROVED, second.id: PaymentStatus.DENIED
+    }
+    assert (await repository.get_by_id(first.id)).status == PaymentStatus.APPROVED
+    assert (await repository.get_by_id(second.id)).status == PaymentStatus.DENIED
+    assert (await repository.get_by_id(third.id)).status == PaymentStatus.PENDING
+    assert await _outbox_statuses(collection, first.id) == [PaymentStatus.APPROVED]
+    assert await _outbox_statuses(collection, second.id) == [PaymentStatus.DENIED]
+    assert await _outbox_statuses(collection, third.id) == []
+
+
+async def test_update_statuses_by_external_id_without_matches(repository, collection):
+    created = await _create(repository, 1, "PAY-1")
+
+    assert await repository.update_statuses_by_external_id({"PAY-missing": PaymentStatus.APPROVED}) == []
+    assert await repository.update_statuses_by_external_id({}) == []
+    assert await _outbox_statuses(collection, created.id) == []
+
+
+async def test_repeated_callbacks_update_a_payment_once(repository, collection):
+    created = await _create(repository, 1, "PAY-1")
+    callbacks = [
+        PaymentCallback(external_id="PAY-1", is_approved=True),
+        PaymentCallback(external_id="PAY-1", is_approved=False),
+        PaymentCallback(external_id="PAY-missing", is_approved=True),
+    ]
+
+    results = await PaymentUseCases(repository).process_payment_callbacks(callbacks)
+
+    assert [result.status for result in results] == ["processed", "processed", "not_found"]
+    assert (await repository.get_by_id(created.id)).status == PaymentStatus.DENIED
+    assert await _outbox_statuses(collection, created.id) == [PaymentStatus.DENIED]
+
+
+async def test_create_many_returns_payments_in_input_order(repository):
+    payments = [
+        Payment(order_id=order_id, amount=Decimal("10.00"), status=PaymentStatus.PENDING)
+        for order_id in (5, 3, 4)
+    ]
+
+    created = await repository.create_many(payments)
+
+    assert [payment.order_id for payment in created] == [5, 3, 4]
+    assert created[0].id < created[1].id < created[2].id
+    assert [await repository.get_by_id(payment.id) for payment in created] == created
+    assert await repository.create_many([]) == []
+
+
+async def test_order_has_at_most_one_payment(repository):
+    await _create(repository, 1)
+
+    with pytest.raises(DuplicateKeyError):
+        await _create(repository, 1)
+
+
+async def test_non_unique_order_id_index_is_made_unique(collection):
+    await collection.create_index([("order_id", ASCENDING)])
+    await collection.insert_one({"_id": 1, "order_id": 7})
+
+    await ensure_indexes(collection)
+
+    assert (await collection.index_information())[ORDER_ID_INDEX]["unique"]
+
+
+async def test_duplicate_order_ids_keep_a_non_unique_index(collection, caplog):
+    await collection.create_index([("order_id", ASCENDING)])
+    await collection.insert_many([{"_id": 1, "order_id": 7}, {"_id": 2, "order_id": 7}])
+
+    with caplog.at_level(logging.ERROR):
+        await ensure_indexes(collection)
+
+    assert not (await collection.index_information())[ORDER_ID_INDEX].get("unique")
+    assert "duplicate values" in caplog.text
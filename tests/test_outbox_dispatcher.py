@@ -0,0 +1,177 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy import select, update
+
+from app.adapters.models.sql.outbox_model import OutboxDeadLetterModel, OutboxModel
+from app.adapters.repositories import RepositoryType, nosql_outbox_repository
+from app.adapters.repositories.nosql_payment_repository import NoSQLPaymentRepository
+from app.adapters.repositories.sql_outbox_repository import SQLOutboxRepository
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.adapters.workers.outbox_dispatcher import OutboxDispatcher
+from app.domain.entities.payment import Payment, PaymentStatus
+from tests.fakes.mongo import InMemoryDatabase
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def repository(sql_session):
+    return SQLPaymentRepository(sql_session)
+
+
+@pytest.fixture
+def service_client():
+    client = MagicMock()
+    client.update_order_payment_status = AsyncMock(return_value=True)
+    return client
+
+
+@pytest.fixture
+def dispatcher(service_client, sql_session_factory):
+    return OutboxDispatcher(service_client, session_factory=sql_session_factory, batch_size=10)
+
+
+async def _create_payment(repository, order_id):
+    return await repository.create(
+        Payment(order_id=order_id, amount=Decimal("10.00"), status=PaymentStatus.PENDING)
+    )
+
+
+async def _pending(session_factory):
+    async with session_factory() as session:
+        return (await session.scalars(select(OutboxModel).order_by(OutboxModel.id))).all()
+
+
+async def test_update_status_writes_outbox_message(repository, sql_session_factory):
+    payment = await _create_payment(repository, 1)
+
+    await repository.update_status(payment.id, PaymentStatus.APPROVED)
+
+    pending = await _pending(sql_session_factory)
+    assert len(pending) == 1
+    assert pending[0].order_id == 1
+    assert pending[0].payment_status == PaymentStatus.APPROVED
+
+
+async def test_dispatch_delivers_and_removes_messages(repository, dispatcher, service_client, sql_session_factory):
+    first = await _create_payment(repository, 1)
+    second = await _create_payment(repository, 2)
+    await repository.update_status(first.id, PaymentStatus.APPROVED)
+    await repository.update_status(second.id, PaymentStatus.DENIED)
+
+    fetched = await dispatcher.dispatch_once()
+
+    assert fetched == 2
+    assert await _pending(sql_session_factory) == []
+    service_client.update_order_payment_status.assert_any_await(1, PaymentStatus.APPROVED)
+    service_client.update_order_payment_status.assert_any_await(2, PaymentStatus.DENIED)
+
+
+async def test_failed_delivery_is_rescheduled_and_blocks_later_messages(
+    repository, dispatcher, service_client, sql_session_factory
+):
+    payment = await _create_payment(repository, 1)
+    await repository.update_status(payment.id, PaymentStatus.PENDING)
+    await repository.update_status(payment.id, PaymentStatus.APPROVED)
+    service_client.update_order_payment_status.return_value = False
+
+    await dispatcher.dispatch_once()
+
+    pending = await _pending(sql_session_factory)
+    assert [m.attempts for m in pending] == [1, 0]
+    assert pending[0].next_attempt_at > datetime.utcnow()
+    # The second message of the order waits for the first one
+    async with sql_session_factory() as session:
+        now = datetime.utcnow()
+        assert await SQLOutboxRepository(session).claim_due(now, 10, now) == []
+    service_client.update_order_payment_status.assert_awaited_once_with(1, PaymentStatus.PENDING)
+
+
+async def test_messages_of_one_order_are_delivered_in_order(
+    repository, dispatcher, service_client, sql_session_factory
+):
+    payment = await _create_payment(repository, 1)
+    await repository.update_status(payment.id, PaymentStatus.PENDING)
+    await repository.update_status(payment.id, PaymentStatus.APPROVED)
+
+    await dispatcher.dispatch_once()
+    await dispatcher.dispatch_once()
+
+    statuses = [call.args[1] for call in service_client.update_order_payment_status.await_args_list]
+    assert statuses == [PaymentStatus.PENDING, PaymentStatus.APPROVED]
+    assert await _pending(sql_session_factory) == []
+
+
+async def test_backoff_is_capped(service_client, sql_session_factory):
+    dispatcher = OutboxDispatcher(
+        service_client, session_factory=sql_session_factory,
+        retry_base_delay=1, retry_max_delay=60
+    )
+
+    assert dispatcher._backoff(0) == 1
+    assert dispatcher._backoff(3) == 8
+    assert dispatcher._backoff(100) == 60
+
+
+async def test_claimed_messages_are_skipped_by_other_dispatchers(
+    repository, dispatcher, service_client, sql_session_factory
+):
+    payment = await _create_payment(repository, 1)
+    await repository.update_status(payment.id, PaymentStatus.APPROVED)
+    now = datetime.utcnow()
+    async with sql_session_factory() as session:
+        claimed = await SQLOutboxRepository(session).claim_due(now, 10, now + timedelta(seconds=60))
+    assert [message.order_id for message in claimed] == [1]
+
+    assert await dispatcher.dispatch_once() == 0
+    service_client.update_order_payment_status.assert_not_awaited()
+
+
+async def test_message_is_dead_lettered_after_max_attempts(service_client, repository, sql_session_factory):
+    dispatcher = OutboxDispatcher(service_client, session_factory=sql_session_factory, max_attempts=2)
+    payment = await _create_payment(repository, 1)
+    await repository.update_status(payment.id, PaymentStatus.PENDING)
+    await repository.update_status(payment.id, PaymentStatus.APPROVED)
+    service_client.update_order_payment_status.return_value = False
+
+    for _ in range(2):
+        await dispatcher.dispatch_once()
+        async with sql_session_factory() as session:
+            await session.execute(update(OutboxModel).values(next_attempt_at=datetime.utcnow()))
+            await session.commit()
+
+    async with sql_session_factory() as session:
+        dead = (await session.scalars(select(OutboxDeadLetterModel))).all()
+    assert [(m.order_id, m.payment_status, m.attempts) for m in dead] == [(1, PaymentStatus.PENDING, 2)]
+
+    # The order's next message is no longer held back
+    service_client.update_order_payment_status.return_value = True
+    await dispatcher.dispatch_once()
+    service_client.update_order_payment_status.assert_awaited_with(1, PaymentStatus.APPROVED)
+    assert await _pending(sql_session_factory) == []
+
+
+async def test_dispatches_the_outbox_embedded_in_mongo_payments(service_client, sql_session_factory, monkeypatch):
+    database = InMemoryDatabase("outbox")
+    monkeypatch.setattr(nosql_outbox_repository, "get_payment_collection", lambda: database["payments"])
+    monkeypatch.setattr(
+        nosql_outbox_repository, "get_outbox_dead_letter_collection", lambda: database["dead_letters"]
+    )
+    repository = NoSQLPaymentRepository(database["payments"])
+    payment = await _create_payment(repository, 1)
+    await repository.update_status(payment.id, PaymentStatus.PENDING)
+    await repository.update_status(payment.id, PaymentStatus.APPROVED)
+    dispatcher = OutboxDispatcher(
+        service_client, session_factory=sql_session_factory, repository_type=RepositoryType.NOSQL
+    )
+
+    assert await dispatcher.dispatch_once() == 1
+    assert await dispatcher.dispatch_once() == 1
+    assert await dispatcher.dispatch_once() == 0
+
+    statuses = [call.args[1] for call in service_client.update_order_payment_status.await_args_list]
+    assert statuses == [PaymentStatus.PENDING, PaymentStatus.APPROVED]
+    assert (await database["payments"].find_one({"_id": payment.id}))["outbox"] == []
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.adapters.models.sql.payment_archive_model import PaymentArchiveModel
+from app.adapters.models.sql.payment_model import PaymentModel
+from app.adapters.repositories.archive_fallback_payment_repository import ArchiveFallbackPaymentRepository
+from app.adapters.repositories.nosql_outbox_repository import NoSQLOutboxRepository
+from app.adapters.repositories.nosql_payment_archiver import NoSQLPaymentArchiver
+from app.adapters.repositories.nosql_payment_repository import NoSQLPaymentRepository
+from app.adapters.repositories.sql_payment_archiver import SQLPaymentArchiver
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.application.use_cases.payment_use_cases import PaymentUseCases
+from app.domain.entities.payment import Payment, PaymentStatus, QRCodeRequest
+from tests.fakes.mongo import InMemoryDatabase
+
+pytestmark = pytest.mark.asyncio
+
+NOW = datetime(2024, 6, 1)
+OLD = NOW - timedelta(days=100)
+
+
+async def _create(session, order_id, status, at=OLD):
+    payment = await SQLPaymentRepository(session).create(
+        Payment(order_id=order_id, amount=Decimal("10.00"), status=PaymentStatus.PENDING)
+    )
+    await session.execute(
+        update(PaymentModel).where(PaymentModel.id == payment.id).values(status=status, created_at=at, updated_at=at)
+    )
+    await session.commit()
+    return payment.id
+
+
+async def _count(session, model):
+    return await session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.fixture
+def repository(sql_session):
+    return ArchiveFallbackPaymentRepository(
+        SQLPaymentRepository(sql_session), SQLPaymentRepository(sql_session, PaymentArchiveModel)
+    )
+
+
+async def test_archives_old_settled_payments_only(sql_session):
+    approved = await _create(sql_session, 1, PaymentStatus.APPROVED)
+    await _create(sql_session, 2, PaymentStatus.PENDING)
+    await _create(sql_session, 3, PaymentStatus.DENIED, at=NOW)
+    notified = await _create(sql_session, 4, PaymentStatus.PENDING)
+    await SQLPaymentRepository(sql_session).update_status(notified, PaymentStatus.REJECTED)
+    await sql_session.execute(update(PaymentModel).where(PaymentModel.id == notified).values(updated_at=OLD))
+    # The newest payment is never archived, so SQLite doesn't reuse its ID
+    await _create(sql_session, 5, PaymentStatus.APPROVED)
+
+    archiver = SQLPaymentArchiver(sql_session)
+    assert await archiver.archive_batch(NOW - timedelta(days=90), limit=10) == 1
+    assert await archiver.archive_batch(NOW - timedelta(days=90), limit=10) == 0
+
+    assert list(await sql_session.scalars(select(PaymentArchiveModel.id))) == [approved]
+    assert await _count(sql_session, PaymentModel) == 4
+
+
+async def test_archives_in_batches(sql_session):
+    for order_id in range(1, 7):
+        await _create(sql_session, order_id, PaymentStatus.APPROVED)
+
+    archiver = SQLPaymentArchiver(sql_session)
+    moved = [await archiver.archive_batch(NOW, limit=2) for _ in range(4)]
+
+    assert moved == [2, 2, 1, 0]
+    assert await _count(sql_session, PaymentArchiveModel) == 5
+
+
+async def test_reads_fall_through_to_the_archive(sql_session, repository):
+    archived = await _create(sql_session, 1, PaymentStatus.APPROVED)
+    hot = await _create(sql_session, 2, PaymentStatus.APPROVED, at=NOW)
+    await SQLPaymentRepository(sql_session).update_external_id(archived, "PAY-1")
+    await sql_session.execute(update(PaymentModel).where(PaymentModel.id == archived).values(updated_at=OLD))
+    await SQLPaymentArchiver(sql_session).archive_batch(NOW - timedelta(days=90), limit=10)
+
+    assert (await repository.get_by_id(archived)).order_id == 1
+    assert (await repository.get_by_order_id(1)).id == archived
+    assert (await repository.get_by_external_id("PAY-1")).id == archived
+    assert sorted(payment.id for payment in await repository.get_by_order_ids([1, 2, 3])) == [archived, hot]
+    assert await repository.get_by_id(hot + 1) is None
+    # Archived payments are read-only
+    assert await repository.update_status(archived, PaymentStatus.DENIED) is None
+
+
+async def test_qr_code_is_refused_for_an_archived_payment(sql_session, repository):
+    archived = await _create(sql_session, 1, PaymentStatus.APPROVED)
+    await _create(sql_session, 2, PaymentStatus.APPROVED, at=NOW)
+    await SQLPaymentArchiver(sql_session).archive_batch(NOW - timedelta(days=90), limit=10)
+
+    use_cases = PaymentUseCases(repository)
+    request = QRCodeRequest(description="Order 1", total=Decimal("10.00"), order_id=1)
+
+    assert await use_cases.generate_qr_code(request) is None
+    assert (await repository.get_by_order_id(1)).id == archived
+    assert await _count(sql_session, PaymentModel) == 1
+
+
+async def test_nosql_archives_settled_payments_once_their_outbox_is_drained():
+    database = InMemoryDatabase("archive")
+    payments = NoSQLPaymentRepository(database["payments"])
+    outbox = NoSQLOutboxRepository(database["payments"], database["dead_letters"])
+    drained = await payments.create(Payment(order_id=1, amount=Decimal("10.00"), status=PaymentStatus.PENDING))
+    pending = await payments.create(Payment(order_id=2, amount=Decimal("10.00"), status=PaymentStatus.PENDING))
+    for payment in (drained, pending):
+        await payments.update_status(payment.id, PaymentStatus.APPROVED)
+    claimed = await outbox.claim_due(datetime.utcnow(), 10, datetime.utcnow())
+    await outbox.mark_delivered([message for message in claimed if message.payment_id == drained.id])
+    for payment in (drained, pending):
+        await database["payments"].update_one(
+            {"_id": payment.id}, {"$set": {"created_at": OLD, "updated_at": OLD}}
+        )
+
+    archiver = NoSQLPaymentArchiver(database["payments"], database["payments_archive"])
+    assert await archiver.archive_batch(NOW, limit=10) == 1
+
+    assert [document["_id"] for document in await database["payments_archive"].find().to_list()] == [drained.id]
+    assert [document["_id"] for document in await database["payments"].find().to_list()] == [pending.id]
+
+
+async def test_listings_and_reports_include_the_archive(sql_session, repository):
+    ids = [await _create(sql_session, order_id, PaymentStatus.APPROVED) for order_id in range(1, 6)]
+    await sql_session.execute(update(PaymentModel).where(PaymentModel.id.in_(ids[1::2])).values(created_at=NOW, updated_at=NOW))
+    await SQLPaymentArchiver(sql_session).archive_batch(NOW - timedelta(days=90), limit=10)
+    assert await _count(sql_session, PaymentArchiveModel) == 2
+
+    assert [payment.id for payment in await repository.list_page(3)] == ids[:3]
+    assert [payment.id for payment in await repository.list_page(3, after_id=ids[2])] == ids[3:]
+    assert [payment.id for payment in await repository.get_all()] == ids
+    assert [payment.id async for payment in repository.iter_all(batch_size=1)] == ids
+
+    totals = await repository.daily_totals()
+    assert [(total.day, total.count, total.amount) for total in totals] == [
+        (OLD.date(), 3, Decimal("30.00")),
+        (NOW.date(), 2, Decimal("20.00")),
+    ]
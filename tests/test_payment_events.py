@@ -0,0 +1,151 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from app.adapters.api import payment_router
+from app.adapters.cache.payment_cache import payment_cache
+from app.adapters.events.payment_events import PaymentEvents, TooManySubscribers, payment_events
+from app.adapters.repositories.publishing_payment_repository import PublishingPaymentRepository
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.adapters.workers.payment_event_poller import PaymentEventPoller
+from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus
+from app.domain.interfaces.payment_repository import PaymentRepository
+
+pytestmark = pytest.mark.asyncio
+
+NOW = datetime(2024, 3, 1, 12)
+
+
+def _payment(payment_id=1, order_id=10, status=PaymentStatus.PENDING, seconds=0):
+    return PaymentDb(
+        id=payment_id, order_id=order_id, amount=Decimal("10.00"), status=status,
+        external_id=None, created_at=NOW, updated_at=NOW + timedelta(seconds=seconds),
+    )
+
+
+async def test_publish_reaches_subscribers_of_the_payment_and_its_order():
+    events = PaymentEvents(queue_size=4, max_subscribers=10)
+    by_id = events.subscribe(("payment", 1))
+    by_order = events.subscribe(("order", 10))
+    other = events.subscribe(("order", 11))
+
+    events.publish(_payment())
+
+    assert (await by_id.get()).id == 1
+    assert (await by_order.get()).id == 1
+    assert not other.queue
+
+
+async def test_full_queue_drops_the_oldest_update():
+    events = PaymentEvents(queue_size=2, max_subscribers=10)
+    subscription = events.subscribe(("payment", 1))
+
+    for seconds in range(3):
+        events.publish(_payment(seconds=seconds))
+
+    assert subscription.dropped == 1
+    assert [(await subscription.get()).updated_at.second for _ in range(2)] == [1, 2]
+
+
+async def test_subscriber_limit_and_unsubscribe():
+    events = PaymentEvents(queue_size=2, max_subscribers=1)
+    subscription = events.subscribe(("payment", 1))
+
+    with pytest.raises(TooManySubscribers):
+        events.subscribe(("payment", 2))
+
+    events.unsubscribe(subscription)
+    events.unsubscribe(subscription)
+    assert events.subscriber_count == 0
+    events.subscribe(("payment", 2))
+
+
+async def test_publishing_repository_publishes_committed_writes_only():
+    events = PaymentEvents(queue_size=4, max_subscribers=10)
+    subscription = events.subscribe(("payment", 1))
+    repository = MagicMock(spec=PaymentRepository)
+    repository.update_status = AsyncMock(side_effect=[_payment(status=PaymentStatus.APPROVED), None])
+    publishing = PublishingPaymentRepository(repository, events)
+
+    await publishing.update_status(1, PaymentStatus.APPROVED)
+    await publishing.update_status(2, PaymentStatus.APPROVED)
+
+    assert [payment.status for payment in subscription.queue] == [PaymentStatus.APPROVED]
+
+
+async def test_event_stream_sends_the_current_state_then_changes(sql_session, sql_session_factory, monkeypatch):
+    monkeypatch.setattr(payment_router, "SessionLocal", sql_session_factory)
+    payment_cache.clear()
+    created = await SQLPaymentRepository(sql_session).create(
+        Payment(order_id=42, amount=Decimal("10.00"), status=PaymentStatus.PENDING)
+    )
+    stream = payment_router._payment_event_stream(
+        payment_events.subscribe(("order", 42)), lambda use_cases: use_cases.get_payment_by_order_id(42)
+    )
+
+    first = await stream.__anext__()
+    assert first.startswith("event: payment\n")
+    assert json.loads(first.split("data: ", 1)[1])["status"] == "Pending"
+    assert payment_events.subscriber_count == 1
+
+    approved = created.model_copy(
+        update={"status": PaymentStatus.APPROVED, "updated_at": created.updated_at + timedelta(seconds=1)}
+    )
+    payment_events.publish(approved)
+    second = await asyncio.wait_for(stream.__anext__(), 1)
+    assert json.loads(second.split("data: ", 1)[1])["status"] == "Approved"
+
+    await stream.aclose()
+    assert payment_events.subscriber_count == 0
+
+
+async def test_idle_stream_sends_keepalives_without_reading(monkeypatch):
+    monkeypatch.setattr(payment_router.settings, "PAYMENT_EVENTS_KEEPALIVE_INTERVAL", 0.01)
+    lookup = AsyncMock(return_value=None)
+    stream = payment_router._payment_event_stream(payment_events.subscribe(("order", 7)), lookup)
+
+    assert [await stream.__anext__() for _ in range(3)] == [": keepalive\n\n"] * 3
+    assert lookup.await_count == 1
+
+    await stream.aclose()
+    assert payment_events.subscriber_count == 0
+
+
+async def test_event_stream_response_rejects_clients_over_the_limit(monkeypatch):
+    events = PaymentEvents(queue_size=2, max_subscribers=1)
+    monkeypatch.setattr(payment_router, "payment_events", events)
+    payment_router._event_stream_response(("order", 1), AsyncMock())
+
+    with pytest.raises(HTTPException) as raised:
+        payment_router._event_stream_response(("order", 2), AsyncMock())
+
+    assert raised.value.status_code == 503
+    assert events.subscriber_count == 1
+
+
+async def test_poller_publishes_changes_made_by_other_workers(sql_session, sql_session_factory):
+    events = PaymentEvents(queue_size=4, max_subscribers=10)
+    poller = PaymentEventPoller(events, sql_session_factory, overlap=5, batch_size=10)
+    # Written without a publishing repository, like a write through another worker
+    repository = SQLPaymentRepository(sql_session)
+    await repository.create(Payment(order_id=1, amount=Decimal("10.00"), status=PaymentStatus.PENDING))
+
+    assert await poller.poll_once() == 0
+
+    subscription = events.subscribe(("order", 1))
+    assert await poller.poll_once() == 1
+    assert [payment.status for payment in subscription.queue] == [PaymentStatus.PENDING]
+
+    # The overlap reads it again, but it is only published once per change
+    await poller.poll_once()
+    assert len(subscription.queue) == 1
+
+    created = subscription.queue[0]
+    await repository.update_status(created.id, PaymentStatus.APPROVED)
+    await poller.poll_once()
+    assert [payment.status for payment in subscription.queue] == [PaymentStatus.PENDING, PaymentStatus.APPROVED]
@@ -1,6 +1,7 @@
+import httpx
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock
 import sys
 import os
 
@@ -8,37 +9,86 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from main import app
-from app.domain.entities.payment import PaymentDb, PaymentStatus
-from app.adapters.api.payment_router import get_payment_use_cases
+from app.domain.entities.payment import (
+    PaymentCallbackResult,
+    PaymentCreateResult,
+    PaymentDb,
+    PaymentPage,
+    PaymentReport,
+    PaymentStatus,
+)
+from app.adapters.api.payment_router import (
+    get_idempotency_repository_for_request,
+    get_idempotency_store,
+    get_payment_use_cases,
+    get_service_client,
+)
+from app.adapters.api.idempotency import IdempotencyStore
+from app.adapters.http.deadline import remaining as deadline_remaining
+from app.adapters.http.service_client import CircuitOpenError, DeadlineExceeded, ServiceClient
+from app.adapters.cache.ttl_cache import TTLCache
+from app.config import settings
+from app.domain.entities.idempotency import IdempotencyRecord
 from datetime import datetime
 from decimal import Decimal
+from pymongo.errors import DuplicateKeyError
+from sqlalchemy.exc import IntegrityError
 
 client = TestClient(app)
 API_PREFIX = "/api/v1/payments"
 
 @pytest.fixture
 def mock_service_client():
-    with patch('app.adapters.api.payment_router.ServiceClient') as MockServiceClient:
-        instance = MockServiceClient.return_value
-        instance.get_order = AsyncMock(return_value={"id": 1, "status": "PENDING"})
-        instance.update_order_payment_status = AsyncMock(return_value=None)
-        yield instance
+    instance = MagicMock()
+    instance.get_order = AsyncMock(return_value={"id": 1, "status": "PENDING"})
+    instance.update_order_payment_status = AsyncMock(return_value=None)
+    app.dependency_overrides[get_service_client] = lambda: instance
+    yield instance
+    app.dependency_overrides.pop(get_service_client, None)
 
 @pytest.fixture
 def mock_use_cases():
-    with patch('app.adapters.api.payment_router.get_payment_use_cases') as mock_dep:
-        mock = MagicMock()
-        mock_dep.return_value = mock
-        yield mock
+    mock = AsyncMock()
+    app.dependency_overrides[get_payment_use_cases] = lambda: mock
+    yield mock
+    app.dependency_overrides.pop(get_payment_use_cases, None)
 
 def test_get_all_payments(mock_use_cases):
     now = datetime.utcnow()
-    mock_use_cases.get_all_payments.return_value = [
-        PaymentDb(id=1, order_id=1, amount=Decimal('10.0'), status=PaymentStatus.PENDING, external_id='PAY-1', created_at=now, updated_at=now)
-    ]
+    payment = PaymentDb(id=1, order_id=1, amount=Decimal('10.0'), status=PaymentStatus.PENDING, external_id='PAY-1', created_at=now, updated_at=now)
+    mock_use_cases.get_payments_page.return_value = PaymentPage(items=[payment])
     response = client.get(f"{API_PREFIX}/")
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    assert response.json() == [payment.model_dump(mode="json")]
+    assert "X-Next-Cursor" not in response.headers
+
+def test_get_all_payments_sets_next_cursor(mock_use_cases):
+    now = datetime.utcnow()
+    mock_use_cases.get_payments_page.return_value = PaymentPage(
+        items=[PaymentDb(id=1, order_id=1, amount=Decimal('10.0'), status=PaymentStatus.PENDING, external_id='PAY-1', created_at=now, updated_at=now)],
+        next_cursor=1
+    )
+    app.dependency_overrides[get_payment_use_cases] = lambda: mock_use_cases
+
+    try:
+        response = client.get(f"{API_PREFIX}/", params={"limit": 1, "status": "Pending"})
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == "1"
+        assert len(response.json()) == 1
+        args = mock_use_cases.get_payments_page.call_args[0]
+        assert args[0] == 1
+        assert args[2].status == PaymentStatus.PENDING
+    finally:
+        app.dependency_overrides.clear()
+
+def test_get_payment_report(mock_use_cases):
+    mock_use_cases.get_payment_report.return_value = PaymentReport(by_status=[], by_day=[])
+
+    response = client.get(f"{API_PREFIX}/report", params={"status": "Approved"})
+
+    assert response.status_code == 200
+    assert response.json() == {"by_status": [], "by_day": []}
+    assert mock_use_cases.get_payment_report.call_args[0][0].status == PaymentStatus.APPROVED
 
 def test_get_payment_by_id_found(mock_use_cases):
     now = datetime.utcnow()
@@ -61,13 +111,40 @@ def test_get_payment_by_id_not_found(mock_use_cases):
     response = client.get(f"{API_PREFIX}/999")
     assert response.status_code == 404
 
-def test_create_payment_order_not_found(mock_use_cases):
-    with patch('app.adapters.api.payment_router.ServiceClient') as MockServiceClient:
-        instance = MockServiceClient.return_value
-        instance.get_order = AsyncMock(return_value=None)
-        payload = {"order_id": 999, "amount": 10.0, "status": "Pending", "external_id": "PAY-1"}
-        response = client.post(f"{API_PREFIX}/", json=payload)
-        assert response.status_code == 400
+def test_create_payment_order_not_found(mock_use_cases, mock_service_client):
+    mock_service_client.get_order = AsyncMock(return_value=None)
+    payload = {"order_id": 999, "amount": 10.0, "status": "Pending", "external_id": "PAY-1"}
+    response = client.post(f"{API_PREFIX}/", json=payload)
+    assert response.status_code == 400
+
+DUPLICATE_ORDER_ERRORS = [
+    IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed")),
+    DuplicateKeyError("E11000 duplicate key error index: order_id_1"),
+]
+
+@pytest.mark.parametrize("error", DUPLICATE_ORDER_ERRORS, ids=["sql", "nosql"])
+def test_create_payment_racing_another_request_is_rejected(mock_use_cases, mock_service_client, error):
+    mock_use_cases.get_payment_by_order_id.return_value = None
+    mock_use_cases.create_payment.side_effect = error
+    payload = {"order_id": 5, "amount": 10.0, "status": "Pending"}
+    response = client.post(f"{API_PREFIX}/", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Payment for order ID 5 already exists"
+
+def test_create_payment_starts_the_orders_service_deadline(mock_use_cases, mock_service_client):
+    budgets = []
+
+    async def get_order(order_id):
+        budgets.append(deadline_remaining())
+        return None
+
+    mock_service_client.get_order = get_order
+    payload = {"order_id": 999, "amount": 10.0, "status": "Pending", "external_id": "PAY-1"}
+    response = client.post(f"{API_PREFIX}/", json=payload)
+    assert response.status_code == 400
+    assert 0 < budgets[0] <= settings.ORDERS_SERVICE_REQUEST_DEADLINE
+    # Each request gets its own budget; none is left behind in the client's context
+    assert deadline_remaining() is None
 
 def test_generate_qr_code_success(mock_use_cases, mock_service_client):
     mock_use_cases.generate_qr_code.return_value = "PAY-QR-123"
@@ -76,6 +153,20 @@ def test_generate_qr_code_success(mock_use_cases, mock_service_client):
     assert response.status_code == 200
     assert "qr_code" in response.json()
 
+def test_generate_qr_code_for_an_archived_payment(mock_use_cases, mock_service_client):
+    mock_use_cases.generate_qr_code.return_value = None
+    payload = {"description": "desc", "total": 10.0, "order_id": 1}
+    response = client.post(f"{API_PREFIX}/qrcode", json=payload)
+    assert response.status_code == 409
+
+@pytest.mark.parametrize("error", DUPLICATE_ORDER_ERRORS, ids=["sql", "nosql"])
+def test_generate_qr_code_racing_another_request_is_conflict(mock_use_cases, mock_service_client, error):
+    mock_use_cases.generate_qr_code.side_effect = error
+    payload = {"description": "desc", "total": 10.0, "order_id": 1}
+    response = client.post(f"{API_PREFIX}/qrcode", json=payload)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Payment for order ID 1 is being created, retry the request"
+
 def test_update_payment_status_success(mock_use_cases, mock_service_client):
     now = datetime.utcnow()
     mock_use_cases.update_payment_status.return_value = PaymentDb(id=1, order_id=1, amount=Decimal('10.0'), status=PaymentStatus.APPROVED, external_id='PAY-1', created_at=now, updated_at=now)
@@ -91,4 +182,136 @@ def test_update_payment_status_not_found(mock_use_cases, mock_service_client):
 def test_payment_webhook_not_found(mock_use_cases, mock_service_client):
     mock_use_cases.process_payment_callback.return_value = None
     response = client.post(f"{API_PREFIX}/webhook", params={"external_id": "PAY-999", "is_approved": True})
-    assert response.status_code == 404 
\ No newline at end of file
+    assert response.status_code == 404 
+
+def test_payment_webhook_batch(mock_use_cases):
+    mock_use_cases.process_payment_callbacks.return_value = [
+        PaymentCallbackResult(external_id="PAY-1", status="processed", payment_id=1, payment_status=PaymentStatus.APPROVED),
+        PaymentCallbackResult(external_id="PAY-2", status="not_found"),
+    ]
+    app.dependency_overrides[get_payment_use_cases] = lambda: mock_use_cases
+
+    try:
+        payload = [{"external_id": "PAY-1", "is_approved": True}, {"external_id": "PAY-2", "is_approved": False}]
+        response = client.post(f"{API_PREFIX}/webhook/batch", json=payload)
+        assert response.status_code == 200
+        assert [item["status"] for item in response.json()] == ["processed", "not_found"]
+        callbacks = mock_use_cases.process_payment_callbacks.call_args[0][0]
+        assert [c.external_id for c in callbacks] == ["PAY-1", "PAY-2"]
+    finally:
+        app.dependency_overrides.clear()
+
+def test_create_payments_batch(mock_use_cases, mock_service_client):
+    mock_service_client.get_order.side_effect = lambda order_id: None if order_id == 2 else {"id": order_id}
+    mock_use_cases.create_payments.return_value = [
+        PaymentCreateResult(order_id=1, status="created"),
+        PaymentCreateResult(order_id=2, status="order_not_found"),
+    ]
+
+    payload = [
+        {"order_id": 1, "amount": "10.00", "status": "Pending"},
+        {"order_id": 2, "amount": "10.00", "status": "Pending"},
+    ]
+    response = client.post(f"{API_PREFIX}/batch", json=payload)
+
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()] == ["created", "order_not_found"]
+    payments, missing, unavailable = mock_use_cases.create_payments.call_args[0]
+    assert [p.order_id for p in payments] == [1, 2]
+    assert missing == {2}
+    assert unavailable == set()
+    assert mock_service_client.get_order.await_count == 2
+
+def test_create_payments_batch_reports_orders_the_orders_service_could_not_check(mock_use_cases, mock_service_client):
+    async def get_order(order_id):
+        if order_id == 2:
+            raise CircuitOpenError("open")
+        return {"id": order_id}
+
+    mock_service_client.get_order = get_order
+    mock_use_cases.create_payments.return_value = []
+    payload = [
+        {"order_id": 1, "amount": "10.00", "status": "Pending"},
+        {"order_id": 2, "amount": "10.00", "status": "Pending"},
+    ]
+    response = client.post(f"{API_PREFIX}/batch", json=payload)
+
+    assert response.status_code == 200
+    _, missing, unavailable = mock_use_cases.create_payments.call_args[0]
+    assert missing == set()
+    assert unavailable == {2}
+
+@pytest.mark.parametrize("error, status_code", [(CircuitOpenError("open"), 503), (DeadlineExceeded("late"), 504)])
+def test_create_payment_when_the_orders_service_cannot_answer(mock_use_cases, mock_service_client, error, status_code):
+    mock_service_client.get_order = AsyncMock(side_effect=error)
+    payload = {"order_id": 1, "amount": 10.0, "status": "Pending"}
+
+    qr_code_payload = {"description": "desc", "total": 10.0, "order_id": 1}
+
+    assert client.post(f"{API_PREFIX}/", json=payload).status_code == status_code
+    assert client.post(f"{API_PREFIX}/qrcode", json=qr_code_payload).status_code == status_code
+    mock_use_cases.create_payment.assert_not_awaited()
+    mock_use_cases.generate_qr_code.assert_not_awaited()
+
+@pytest.mark.parametrize(
+    "answer", [httpx.ConnectError("refused"), httpx.Response(502)], ids=["connect_error", "bad_gateway"]
+)
+def test_unreachable_orders_service_is_not_reported_as_a_missing_order(mock_use_cases, answer):
+    def handler(request):
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    orders = ServiceClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    app.dependency_overrides[get_service_client] = lambda: orders
+    mock_use_cases.create_payments.return_value = []
+
+    try:
+        payload = {"order_id": 1, "amount": 10.0, "status": "Pending"}
+        response = client.post(f"{API_PREFIX}/", json=payload)
+        assert response.status_code == 503
+        assert response.json()["detail"] == "Orders service is unavailable, retry later"
+
+        response = client.post(f"{API_PREFIX}/batch", json=[payload])
+        assert response.status_code == 200
+        _, missing, unavailable = mock_use_cases.create_payments.call_args[0]
+        assert missing == set()
+        assert unavailable == {1}
+        mock_use_cases.create_payment.assert_not_awaited()
+    finally:
+        app.dependency_overrides.pop(get_service_client, None)
+
+def test_generate_qr_code_replays_retries_with_the_same_idempotency_key(mock_use_cases, mock_service_client):
+    records = {}
+
+    async def claim(key, fingerprint, expires_at):
+        records[key] = IdempotencyRecord(key=key, fingerprint=fingerprint, expires_at=expires_at)
+        return None
+
+    async def complete(key, status_code, body, expires_at):
+        records[key] = records[key].model_copy(
+            update={"status_code": status_code, "body": body, "expires_at": expires_at}
+        )
+        return records[key]
+
+    repository = MagicMock(claim=AsyncMock(side_effect=claim), complete=AsyncMock(side_effect=complete))
+    store = IdempotencyStore(cache=TTLCache(max_size=10, ttl=60), ttl=60, purge_interval=300, claim_lease=5)
+    app.dependency_overrides[get_idempotency_repository_for_request] = lambda: repository
+    app.dependency_overrides[get_idempotency_store] = lambda: store
+    mock_use_cases.generate_qr_code.return_value = "PAY-QR-123"
+
+    try:
+        payload = {"description": "desc", "total": 10.0, "order_id": 1}
+        headers = {"Idempotency-Key": "retry-1"}
+        first = client.post(f"{API_PREFIX}/qrcode", json=payload, headers=headers)
+        retry = client.post(f"{API_PREFIX}/qrcode", json=payload, headers=headers)
+
+        assert first.status_code == retry.status_code == 200
+        assert first.json() == retry.json() == {"qr_code": "PAY-QR-123"}
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert mock_use_cases.generate_qr_code.await_count == 1
+        assert mock_service_client.get_order.await_count == 1
+        assert repository.claim.await_count == 1
+    finally:
+        app.dependency_overrides.pop(get_idempotency_repository_for_request, None)
+        app.dependency_overrides.pop(get_idempotency_store, None)
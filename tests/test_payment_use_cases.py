@@ -1,10 +1,17 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime
 
 from app.application.use_cases.payment_use_cases import PaymentUseCases
-from app.domain.entities.payment import Payment, PaymentDb, PaymentStatus, QRCodeRequest
+from app.domain.entities.payment import (
+    Payment,
+    PaymentCallback,
+    PaymentDailyTotal,
+    PaymentDb,
+    PaymentStatus,
+    QRCodeRequest,
+)
 from app.domain.interfaces.payment_repository import PaymentRepository
 
 
@@ -13,7 +20,8 @@ class TestPaymentUseCases:
         self.mock_repo = MagicMock(spec=PaymentRepository)
         self.use_cases = PaymentUseCases(self.mock_repo)
 
-    def test_get_all_payments(self):
+    @pytest.mark.asyncio
+    async def test_get_all_payments(self):
         now = datetime.utcnow()
         payments = [
             PaymentDb(
@@ -29,14 +37,48 @@ class TestPaymentUseCases:
         ]
         self.mock_repo.get_all.return_value = payments
 
-        result = self.use_cases.get_all_payments()
+        result = await self.use_cases.get_all_payments()
 
         assert len(result) == 2
         assert result[0].id == 1
         assert result[1].id == 2
         self.mock_repo.get_all.assert_called_once()
 
-    def test_get_payment_by_id(self):
+    @pytest.mark.asyncio
+    async def test_get_payments_page_with_next_cursor(self):
+        now = datetime.utcnow()
+        payments = [
+            PaymentDb(
+                id=i, order_id=i, amount=Decimal("10.00"),
+                status=PaymentStatus.PENDING, created_at=now, updated_at=now
+            )
+            for i in (4, 5, 6)
+        ]
+        self.mock_repo.list_page.return_value = payments
+
+        page = await self.use_cases.get_payments_page(2, cursor=3)
+
+        assert [p.id for p in page.items] == [4, 5]
+        assert page.next_cursor == 5
+        self.mock_repo.list_page.assert_called_once_with(3, after_id=3, filters=None)
+
+    @pytest.mark.asyncio
+    async def test_get_payments_page_last_page(self):
+        now = datetime.utcnow()
+        self.mock_repo.list_page.return_value = [
+            PaymentDb(
+                id=7, order_id=7, amount=Decimal("10.00"),
+                status=PaymentStatus.PENDING, created_at=now, updated_at=now
+            )
+        ]
+
+        page = await self.use_cases.get_payments_page(2, cursor=6)
+
+        assert [p.id for p in page.items] == [7]
+        assert page.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_get_payment_by_id(self):
         now = datetime.utcnow()
         payment = PaymentDb(
             id=1, order_id=1, amount=Decimal("25.98"),
@@ -45,14 +87,15 @@ class TestPaymentUseCases:
         )
         self.mock_repo.get_by_id.return_value = payment
 
-        result = self.use_cases.get_payment_by_id(1)
+        result = await self.use_cases.get_payment_by_id(1)
 
         assert result.id == 1
         assert result.order_id == 1
         assert result.status == PaymentStatus.PENDING
         self.mock_repo.get_by_id.assert_called_once_with(1)
         
-    def test_get_payment_by_order_id(self):
+    @pytest.mark.asyncio
+    async def test_get_payment_by_order_id(self):
         now = datetime.utcnow()
         order_id = 1
         payment = PaymentDb(
@@ -62,13 +105,14 @@ class TestPaymentUseCases:
         )
         self.mock_repo.get_by_order_id.return_value = payment
 
-        result = self.use_cases.get_payment_by_order_id(order_id)
+        result = await self.use_cases.get_payment_by_order_id(order_id)
 
         assert result.id == 1
         assert result.order_id == order_id
         self.mock_repo.get_by_order_id.assert_called_once_with(order_id)
         
-    def test_create_payment(self):
+    @pytest.mark.asyncio
+    async def test_create_payment(self):
         now = datetime.utcnow()
         payment = Payment(
             order_id=1, amount=Decimal("25.98"),
@@ -84,7 +128,7 @@ class TestPaymentUseCases:
         
         self.mock_repo.create.return_value = created_payment
 
-        result = self.use_cases.create_payment(payment)
+        result = await self.use_cases.create_payment(payment)
 
         assert result.id == 1
         assert result.status == PaymentStatus.PENDING
@@ -92,7 +136,8 @@ class TestPaymentUseCases:
         create_call_args = self.mock_repo.create.call_args[0][0]
         assert create_call_args.status == PaymentStatus.PENDING
         
-    def test_update_payment_status(self):
+    @pytest.mark.asyncio
+    async def test_update_payment_status(self):
         now = datetime.utcnow()
         payment_id = 1
         new_status = PaymentStatus.APPROVED
@@ -105,13 +150,14 @@ class TestPaymentUseCases:
         
         self.mock_repo.update_status.return_value = updated_payment
 
-        result = self.use_cases.update_payment_status(payment_id, new_status)
+        result = await self.use_cases.update_payment_status(payment_id, new_status)
 
         assert result.status == new_status
         self.mock_repo.update_status.assert_called_once_with(payment_id, new_status)
         
     @patch('uuid.uuid4')
-    def test_generate_qr_code_new_payment(self, mock_uuid4):
+    @pytest.mark.asyncio
+    async def test_generate_qr_code_new_payment(self, mock_uuid4):
         mock_uuid4.return_value = "test-uuid-4321"
         now = datetime.utcnow()
         request = QRCodeRequest(
@@ -130,14 +176,15 @@ class TestPaymentUseCases:
         
         self.mock_repo.create.return_value = created_payment
 
-        result = self.use_cases.generate_qr_code(request)
+        result = await self.use_cases.generate_qr_code(request)
 
         assert result == "PAY-test-uuid-4321"
         self.mock_repo.get_by_order_id.assert_called_once_with(1)
         self.mock_repo.create.assert_called_once()
         
     @patch('uuid.uuid4')
-    def test_generate_qr_code_existing_payment(self, mock_uuid4):
+    @pytest.mark.asyncio
+    async def test_generate_qr_code_existing_payment(self, mock_uuid4):
         mock_uuid4.return_value = "test-uuid-5678"
         now = datetime.utcnow()
         request = QRCodeRequest(
@@ -154,30 +201,24 @@ class TestPaymentUseCases:
         
         self.mock_repo.get_by_order_id.return_value = existing_payment
         
-        result = self.use_cases.generate_qr_code(request)
+        result = await self.use_cases.generate_qr_code(request)
 
         assert result == "PAY-test-uuid-5678"
         self.mock_repo.get_by_order_id.assert_called_once_with(1)
         self.mock_repo.update_external_id.assert_called_once_with(1, "PAY-test-uuid-5678")
         self.mock_repo.create.assert_not_called()
         
-    def test_process_payment_callback_approved(self):
+    @pytest.mark.asyncio
+    async def test_process_payment_callback_approved(self):
         now = datetime.utcnow()
         external_id = "PAY-test-123"
         is_approved = True
         
-        payments = [
-            PaymentDb(
-                id=1, order_id=1, amount=Decimal("25.98"),
-                status=PaymentStatus.PENDING, external_id=external_id,
-                created_at=now, updated_at=now
-            ),
-            PaymentDb(
-                id=2, order_id=2, amount=Decimal("15.99"),
-                status=PaymentStatus.PENDING, external_id="PAY-other",
-                created_at=now, updated_at=now
-            )
-        ]
+        payment = PaymentDb(
+            id=1, order_id=1, amount=Decimal("25.98"),
+            status=PaymentStatus.PENDING, external_id=external_id,
+            created_at=now, updated_at=now
+        )
         
         updated_payment = PaymentDb(
             id=1, order_id=1, amount=Decimal("25.98"),
@@ -185,26 +226,27 @@ class TestPaymentUseCases:
             created_at=now, updated_at=now
         )
         
-        self.mock_repo.get_all.return_value = payments
+        self.mock_repo.get_by_external_id.return_value = payment
         self.mock_repo.update_status.return_value = updated_payment
 
-        result = self.use_cases.process_payment_callback(external_id, is_approved)
+        result = await self.use_cases.process_payment_callback(external_id, is_approved)
 
         assert result.status == PaymentStatus.APPROVED
+        self.mock_repo.get_by_external_id.assert_called_once_with(external_id)
+        self.mock_repo.get_all.assert_not_called()
         self.mock_repo.update_status.assert_called_once_with(1, PaymentStatus.APPROVED)
         
-    def test_process_payment_callback_denied(self):
+    @pytest.mark.asyncio
+    async def test_process_payment_callback_denied(self):
         now = datetime.utcnow()
         external_id = "PAY-test-123"
         is_approved = False
         
-        payments = [
-            PaymentDb(
-                id=1, order_id=1, amount=Decimal("25.98"),
-                status=PaymentStatus.PENDING, external_id=external_id,
-                created_at=now, updated_at=now
-            )
-        ]
+        payment = PaymentDb(
+            id=1, order_id=1, amount=Decimal("25.98"),
+            status=PaymentStatus.PENDING, external_id=external_id,
+            created_at=now, updated_at=now
+        )
         
         updated_payment = PaymentDb(
             id=1, order_id=1, amount=Decimal("25.98"),
@@ -212,21 +254,92 @@ class TestPaymentUseCases:
             created_at=now, updated_at=now
         )
         
-        self.mock_repo.get_all.return_value = payments
+        self.mock_repo.get_by_external_id.return_value = payment
         self.mock_repo.update_status.return_value = updated_payment
 
-        result = self.use_cases.process_payment_callback(external_id, is_approved)
+        result = await self.use_cases.process_payment_callback(external_id, is_approved)
 
         assert result.status == PaymentStatus.DENIED
         self.mock_repo.update_status.assert_called_once_with(1, PaymentStatus.DENIED)
         
-    def test_process_payment_callback_not_found(self):
+    @pytest.mark.asyncio
+    async def test_process_payment_callback_not_found(self):
         external_id = "PAY-nonexistent"
         is_approved = True
         
-        self.mock_repo.get_all.return_value = []
+        self.mock_repo.get_by_external_id.return_value = None
 
-        result = self.use_cases.process_payment_callback(external_id, is_approved)
+        result = await self.use_cases.process_payment_callback(external_id, is_approved)
 
         assert result is None
-        self.mock_repo.update_status.assert_not_called() 
\ No newline at end of file
+        self.mock_repo.update_status.assert_not_called() 
+
+    @pytest.mark.asyncio
+    async def test_process_payment_callbacks(self):
+        now = datetime.utcnow()
+        self.mock_repo.update_statuses_by_external_id.return_value = [
+            PaymentDb(
+                id=1, order_id=1, amount=Decimal("25.98"),
+                status=PaymentStatus.DENIED, external_id="PAY-1",
+                created_at=now, updated_at=now
+            )
+        ]
+        callbacks = [
+            PaymentCallback(external_id="PAY-1", is_approved=True),
+            PaymentCallback(external_id="PAY-missing", is_approved=True),
+            PaymentCallback(external_id="PAY-1", is_approved=False),
+        ]
+
+        results = await self.use_cases.process_payment_callbacks(callbacks)
+
+        self.mock_repo.update_statuses_by_external_id.assert_called_once_with(
+            {"PAY-1": PaymentStatus.DENIED, "PAY-missing": PaymentStatus.APPROVED}
+        )
+        assert [r.status for r in results] == ["processed", "not_found", "processed"]
+        assert results[0].payment_id == 1
+        assert results[0].payment_status == PaymentStatus.DENIED
+
+    @pytest.mark.asyncio
+    async def test_create_payments(self):
+        now = datetime.utcnow()
+        existing = PaymentDb(
+            id=1, order_id=2, amount=Decimal("10.00"), status=PaymentStatus.APPROVED,
+            external_id=None, created_at=now, updated_at=now
+        )
+        created = PaymentDb(
+            id=2, order_id=1, amount=Decimal("10.00"), status=PaymentStatus.PENDING,
+            external_id=None, created_at=now, updated_at=now
+        )
+        self.mock_repo.get_by_order_ids.return_value = [existing]
+        self.mock_repo.create_many.return_value = [created]
+        payments = [
+            Payment(order_id=order_id, amount=Decimal("10.00"), status=PaymentStatus.APPROVED)
+            for order_id in (1, 2, 3, 1, 4)
+        ]
+
+        results = await self.use_cases.create_payments(payments, missing_order_ids={3}, unavailable_order_ids={4})
+
+        assert sorted(self.mock_repo.get_by_order_ids.call_args[0][0]) == [1, 2]
+        to_create = self.mock_repo.create_many.call_args[0][0]
+        assert [(p.order_id, p.status) for p in to_create] == [(1, PaymentStatus.PENDING)]
+        assert [r.status for r in results] == [
+            "created", "already_exists", "order_not_found", "duplicate", "order_unavailable"
+        ]
+        assert results[0].payment == created
+        assert results[1].payment == existing
+
+    @pytest.mark.asyncio
+    async def test_get_payment_report(self):
+        self.mock_repo.daily_totals.return_value = [
+            PaymentDailyTotal(day=date(2024, 3, 1), status=PaymentStatus.PENDING, count=2, amount=Decimal("20.00")),
+            PaymentDailyTotal(day=date(2024, 3, 1), status=PaymentStatus.APPROVED, count=1, amount=Decimal("5.50")),
+            PaymentDailyTotal(day=date(2024, 3, 2), status=PaymentStatus.PENDING, count=3, amount=Decimal("30.00")),
+        ]
+
+        report = await self.use_cases.get_payment_report()
+
+        assert [(t.status, t.count, t.amount) for t in report.by_status] == [
+            (PaymentStatus.APPROVED, 1, Decimal("5.50")),
+            (PaymentStatus.PENDING, 5, Decimal("50.00")),
+        ]
+        assert report.by_day == self.mock_repo.daily_totals.return_value
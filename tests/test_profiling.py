@@ -0,0 +1,167 @@
+import asyncio
+import sys
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import main
+from app.adapters.api import profiles_router
+from app.adapters.profiling.middleware import ProfilingMiddleware
+from app.adapters.profiling.profiler import RequestProfiler, render_call_tree, render_collapsed_stacks
+from app.adapters.profiling.store import ProfileStore, new_profile_id
+from app.config import settings
+
+TOKEN = "secret-token"
+
+
+def _checksum(values):
+    return sum(value * value for value in values)
+
+
+async def _handler():
+    await asyncio.sleep(0.01)
+    return _checksum(range(100))
+
+
+async def _background_noise():
+    for _ in range(3):
+        _checksum(range(10))
+        await asyncio.sleep(0.002)
+
+
+@pytest.mark.asyncio
+async def test_profiler_records_calls_and_awaits_of_its_own_task_only():
+    async def profiled():
+        profiler = RequestProfiler()
+        profiler.start()
+        await _handler()
+        return profiler.stop()
+
+    root, _ = await asyncio.gather(profiled(), _background_noise())
+
+    handler = next(node for key, node in root.children.items() if key[2] == "_handler")
+    assert handler.calls == 1
+    assert {key[2] for key in handler.children} >= {"sleep", "_checksum"}
+    sleep = next(node for key, node in handler.children.items() if key[2] == "sleep")
+    assert any(key[2] == "<await>" for key in sleep.children)
+    assert not any(key[2] == "_background_noise" for key in root.children)
+
+    tree = render_call_tree(root)
+    assert "_handler (" in tree and "<await>" in tree
+    for line in render_collapsed_stacks(root).splitlines():
+        stack, self_us = line.rsplit(" ", 1)
+        assert stack.startswith("test_profiler_records_calls_and_awaits_of_its_own_task_only.<locals>.profiled")
+        assert int(self_us) > 0
+
+
+def test_store_keeps_only_the_newest_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path), max_profiles=2)
+    profile_ids = [new_profile_id() for _ in range(3)]
+    for profile_id in profile_ids:
+        store.save(profile_id, {"path": "/"}, "tree", "a;b 1")
+
+    assert [profile["id"] for profile in store.list(10)] == profile_ids[:0:-1]
+    assert store.path(profile_ids[0], "tree") is None
+    assert store.path(profile_ids[2], "collapsed").read_text() == "a;b 1"
+    assert store.path("../../etc/passwd", "tree") is None
+
+
+@pytest.fixture
+def profiled_client(tmp_path, monkeypatch):
+    store = ProfileStore(str(tmp_path), max_profiles=10)
+    monkeypatch.setattr(profiles_router, "profile_store", store)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", TOKEN)
+
+    app = FastAPI()
+
+    @app.post("/webhook")
+    async def webhook():
+        return {"checksum": await _handler()}
+
+    app.add_middleware(ProfilingMiddleware, store=store, token=TOKEN)
+    app.include_router(profiles_router.router, prefix="/profiles")
+    return TestClient(app)
+
+
+def test_only_requests_with_the_token_are_profiled(profiled_client):
+    assert "x-profile-id" not in profiled_client.post("/webhook").headers
+    assert "x-profile-id" not in profiled_client.post("/webhook", headers={"X-Profile-Token": "wrong"}).headers
+
+    response = profiled_client.post("/webhook", headers={"X-Profile-Token": TOKEN})
+    profile_id = response.headers["x-profile-id"]
+
+    profiles = profiled_client.get("/profiles/", headers={"X-Profile-Token": TOKEN}).json()
+    assert [profile["id"] for profile in profiles] == [profile_id]
+    assert profiles[0]["path"] == "/webhook" and profiles[0]["status_code"] == 200
+
+    tree = profiled_client.get(f"/profiles/{profile_id}/tree", headers={"X-Profile-Token": TOKEN})
+    assert tree.status_code == 200 and "_handler (" in tree.text
+    collapsed = profiled_client.get(f"/profiles/{profile_id}/collapsed", headers={"X-Profile-Token": TOKEN})
+    assert "_checksum" in collapsed.text
+
+
+def test_profiles_require_the_token(profiled_client):
+    assert profiled_client.get("/profiles/").status_code == 403
+    assert profiled_client.get("/profiles/missing/tree", headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+
+def test_profiles_are_refused_when_no_token_is_configured(profiled_client, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "")
+    assert profiled_client.get("/profiles/").status_code == 403
+    assert profiled_client.get("/profiles/", headers={"X-Profile-Token": ""}).status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_only_one_request_is_profiled_at_a_time(tmp_path):
+    store = ProfileStore(str(tmp_path), max_profiles=10)
+    app = FastAPI()
+
+    @app.post("/webhook")
+    async def webhook():
+        return {"checksum": await _handler()}
+
+    app.add_middleware(ProfilingMiddleware, store=store, token=TOKEN)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            *(client.post("/webhook", headers={"X-Profile-Token": TOKEN}) for _ in range(3))
+        )
+
+    assert all(response.status_code == 200 for response in responses)
+    assert sum("x-profile-id" in response.headers for response in responses) == 1
+    assert len(store.list(10)) == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_response_releases_the_profiler_when_it_starts(tmp_path):
+    store = ProfileStore(str(tmp_path), max_profiles=10)
+    app = FastAPI()
+    during_stream = []
+
+    async def events():
+        during_stream.append((sys.getprofile(), ProfilingMiddleware._profiling, len(store.list(10))))
+        yield "data: {}\n\n"
+
+    @app.get("/events")
+    async def stream():
+        await _handler()
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_middleware(ProfilingMiddleware, store=store, token=TOKEN)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/events", headers={"X-Profile-Token": TOKEN})
+
+    assert response.status_code == 200
+    # The stream runs with the hook removed and another request free to be profiled
+    assert during_stream == [(None, False, 1)]
+    profile = store.list(10)[0]
+    assert profile["id"] == response.headers["x-profile-id"]
+    assert profile["streamed"] is True
+
+
+def test_profiling_is_not_installed_by_default():
+    assert not settings.PROFILING_TOKEN and not settings.PROFILING_SAMPLE_RATE
+    assert all(middleware.cls is not ProfilingMiddleware for middleware in main.app.user_middleware)
+    assert not any(route.path.startswith(f"{settings.API_PREFIX}/profiles") for route in main.app.routes)
@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.adapters.models.sql.schema import create_schema
+from app.adapters.models.sql.session import build_engine
+from app.adapters.repositories import RepositoryType, get_payment_repository
+from app.adapters.repositories.routing_payment_repository import RecentWrites, RoutingPaymentRepository
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.domain.entities.payment import Payment, PaymentStatus
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest_asyncio.fixture
+async def sessions(tmp_path):
+    """A primary and a 'replica' on two SQLite files; nothing replicates between them"""
+    engines = [build_engine(f"sqlite:///{tmp_path / name}") for name in ("primary.db", "replica.db")]
+    for engine in engines:
+        await create_schema(engine)
+    primary, replica = [
+        async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)() for engine in engines
+    ]
+    yield primary, replica
+    for session, engine in zip((primary, replica), engines):
+        await session.close()
+        await engine.dispose()
+
+
+def _payment(order_id):
+    return Payment(order_id=order_id, amount=Decimal("10.00"), status=PaymentStatus.PENDING)
+
+
+async def test_reads_go_to_the_replica_after_the_read_your_writes_window(sessions):
+    primary, replica = sessions
+    clock = FakeClock()
+    repository = RoutingPaymentRepository(
+        SQLPaymentRepository(primary), SQLPaymentRepository(replica), RecentWrites(window=5, clock=clock)
+    )
+
+    created = await repository.create(_payment(1))
+
+    assert (await repository.get_by_id(created.id)).order_id == 1
+    assert (await repository.get_by_order_id(1)).id == created.id
+    assert await repository.list_page(10) == []
+
+    clock.now = 5
+    assert await repository.get_by_id(created.id) is None
+    assert await repository.get_by_order_id(1) is None
+
+
+async def test_updates_open_a_new_window(sessions):
+    primary, replica = sessions
+    clock = FakeClock()
+    repository = RoutingPaymentRepository(
+        SQLPaymentRepository(primary), SQLPaymentRepository(replica), RecentWrites(window=5, clock=clock)
+    )
+    created = await repository.create(_payment(1))
+    clock.now = 10
+
+    await repository.update_status(created.id, PaymentStatus.APPROVED)
+
+    assert (await repository.get_by_id(created.id)).status == PaymentStatus.APPROVED
+
+
+async def test_lookups_before_writes_read_the_primary(sessions):
+    primary, replica = sessions
+    repository = RoutingPaymentRepository(
+        SQLPaymentRepository(primary), SQLPaymentRepository(replica), RecentWrites(window=0)
+    )
+    created = await repository.create(_payment(1))
+    await repository.update_external_id(created.id, "PAY-1")
+
+    assert (await repository.get_by_external_id("PAY-1")).id == created.id
+    assert [payment.id for payment in await repository.get_by_order_ids([1])] == [created.id]
+    assert await repository.get_by_id(created.id) is None
+
+
+async def test_factory_routes_reads_only_when_given_a_read_session(sessions):
+    primary, replica = sessions
+    await SQLPaymentRepository(primary).create(_payment(7))
+
+    assert await get_payment_repository(RepositoryType.SQL, primary).list_page(10) != []
+    assert await get_payment_repository(RepositoryType.SQL, primary, replica).list_page(10) == []
+    assert await get_payment_repository(RepositoryType.SQL, primary, primary).list_page(10) != []
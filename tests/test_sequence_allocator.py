@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.adapters.models.nosql.sequence import SequenceAllocator
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeCounters:
+    def __init__(self):
+        self.documents = {}
+        self.reservations = 0
+
+    async def find_one_and_update(self, query, update, upsert, return_document):
+        self.reservations += 1
+        await asyncio.sleep(0)
+        document = self.documents.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        document["seq"] += update["$inc"]["seq"]
+        return dict(document)
+
+    async def update_one(self, query, update, upsert):
+        document = self.documents.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        document["seq"] = max(document["seq"], update["$max"]["seq"])
+
+
+class FakePayments:
+    name = "payments"
+
+    def __init__(self, counters, last_id=None):
+        self.database = {"counters": counters}
+        self.last_id = last_id
+
+    async def find_one(self, sort, projection):
+        return {"_id": self.last_id} if self.last_id is not None else None
+
+
+async def test_ids_are_handed_out_from_reserved_blocks():
+    counters = FakeCounters()
+    allocator = SequenceAllocator(FakePayments(counters), block_size=3)
+
+    ids = [await allocator.next_id() for _ in range(7)]
+
+    assert ids == [1, 2, 3, 4, 5, 6, 7]
+    assert counters.reservations == 3
+
+
+async def test_concurrent_callers_get_unique_ids():
+    counters = FakeCounters()
+    allocator = SequenceAllocator(FakePayments(counters), block_size=5)
+
+    ids = await asyncio.gather(*(allocator.next_id() for _ in range(23)))
+
+    assert sorted(ids) == list(range(1, 24))
+    assert counters.reservations == 5
+
+
+async def test_allocators_sharing_a_counter_do_not_overlap():
+    counters = FakeCounters()
+    first = SequenceAllocator(FakePayments(counters), block_size=10)
+    second = SequenceAllocator(FakePayments(counters), block_size=10)
+
+    first_ids = {await first.next_id() for _ in range(5)}
+    second_ids = {await second.next_id() for _ in range(5)}
+
+    assert first_ids.isdisjoint(second_ids)
+
+
+async def test_counter_is_seeded_from_existing_documents():
+    counters = FakeCounters()
+    allocator = SequenceAllocator(FakePayments(counters, last_id=41), block_size=10)
+
+    assert await allocator.next_id() == 42
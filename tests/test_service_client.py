@@ -0,0 +1,245 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.adapters.http.circuit_breaker import CircuitBreaker
+from app.adapters.http.deadline import deadline
+from app.adapters.http.service_client import (
+    CircuitOpenError,
+    DeadlineExceeded,
+    OrdersServiceUnavailable,
+    ServiceClient,
+)
+from app.adapters.metrics.instruments import (
+    orders_service_errors,
+    orders_service_hedged_requests,
+    orders_service_request_duration,
+    orders_service_requests_in_flight,
+)
+from app.config import settings
+from app.domain.entities.payment import PaymentStatus
+from benchmarks.orders_stub import OrdersStub
+
+
+def _client_for(handler):
+    return ServiceClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+@pytest.mark.asyncio
+async def test_get_order_found():
+    def handler(request):
+        assert request.url.path == "/api/v1/orders/1"
+        assert request.extensions["timeout"]["read"] == settings.ORDERS_SERVICE_GET_ORDER_TIMEOUT
+        return httpx.Response(200, json={"id": 1})
+
+    client = _client_for(handler)
+
+    assert await client.get_order(1) == {"id": 1}
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_order_not_found_and_transport_error():
+    def handler(request):
+        if request.url.path.endswith("/2"):
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path.endswith("/3"):
+            return httpx.Response(502)
+        return httpx.Response(404)
+
+    client = _client_for(handler)
+
+    assert await client.get_order(1) is None
+    # An unreachable or failing orders service says nothing about the order
+    with pytest.raises(OrdersServiceUnavailable):
+        await client.get_order(2)
+    with pytest.raises(OrdersServiceUnavailable):
+        await client.get_order(3)
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_update_order_payment_status():
+    def handler(request):
+        assert request.method == "PATCH"
+        assert request.url.path == "/api/v1/orders/1/payment-status/Approved"
+        return httpx.Response(200)
+
+    client = _client_for(handler)
+
+    assert await client.update_order_payment_status(1, PaymentStatus.APPROVED) is True
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_http_client_is_reused_until_closed():
+    client = ServiceClient()
+    await client.start()
+    pooled = client.http_client
+
+    assert client.http_client is pooled
+
+    await client.close()
+    assert pooled.is_closed
+
+
+@pytest.mark.asyncio
+async def test_get_order_is_cached():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path.endswith("/2"):
+            return httpx.Response(404)
+        return httpx.Response(200, json={"id": 1})
+
+    client = _client_for(handler)
+
+    assert await client.get_order(1) == {"id": 1}
+    assert await client.get_order(1) == {"id": 1}
+    assert await client.get_order(2) is None
+    assert await client.get_order(2) is None
+    assert len(calls) == 2
+    assert client.order_cache_stats()["hits"] == 2
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_order_transport_errors_are_not_cached():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        raise httpx.ConnectError("refused", request=request)
+
+    client = _client_for(handler)
+
+    for _ in range(2):
+        with pytest.raises(OrdersServiceUnavailable):
+            await client.get_order(1)
+    assert len(calls) == 2
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_order_is_coalesced():
+    calls = []
+    release = asyncio.Event()
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await release.wait()
+        return httpx.Response(200, json={"id": 1})
+
+    client = _client_for(handler)
+
+    lookups = [asyncio.ensure_future(client.get_order(1)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*lookups)
+
+    assert results == [{"id": 1}] * 5
+    assert len(calls) == 1
+    assert client.order_cache_stats()["coalesced_lookups"] == 4
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_orders_service_calls_are_measured():
+    def handler(request):
+        if request.url.path.endswith("/2"):
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path.endswith("/3"):
+            return httpx.Response(503)
+        return httpx.Response(404)
+
+    client = _client_for(handler)
+    errors = orders_service_errors.labels("get_order", "transport").value
+    status_errors = orders_service_errors.labels("get_order", "status").value
+    calls = sum(orders_service_request_duration.labels("get_order").counts)
+
+    await client.get_order(1)
+    for order_id in (2, 3):
+        with pytest.raises(OrdersServiceUnavailable):
+            await client.get_order(order_id)
+
+    assert orders_service_errors.labels("get_order", "transport").value == errors + 1
+    assert orders_service_errors.labels("get_order", "status").value == status_errors + 1
+    assert sum(orders_service_request_duration.labels("get_order").counts) == calls + 3
+    assert orders_service_requests_in_flight.value == 0
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_order_gives_up_at_the_deadline():
+    stub = OrdersStub(latency=1)
+    client = stub.service_client()
+    deadline_errors = orders_service_errors.labels("get_order", "deadline").value
+
+    started = time.perf_counter()
+    with deadline(0.05):
+        with pytest.raises(DeadlineExceeded):
+            await client.get_order(1)
+        # Nothing is sent once the deadline has passed
+        await asyncio.sleep(0.01)
+        with pytest.raises(DeadlineExceeded):
+            await client.get_order(2)
+
+    assert time.perf_counter() - started < 0.5
+    assert stub.get_order_calls == 1
+    assert orders_service_errors.labels("get_order", "deadline").value == deadline_errors + 2
+    # Running out of time is the caller's problem, not a sign the orders service is down
+    assert client.circuit_breaker.failures == 0
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_consecutive_failures_and_fails_fast():
+    stub = OrdersStub(failing=True)
+    client = stub.service_client()
+    client.circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    update_errors = orders_service_errors.labels("update_order_payment_status", "circuit_open").value
+
+    for order_id in (1, 2):
+        with pytest.raises(OrdersServiceUnavailable):
+            await client.get_order(order_id)
+    stub.failing = False
+    with pytest.raises(CircuitOpenError):
+        await client.get_order(3)
+    assert await client.update_order_payment_status(3, PaymentStatus.APPROVED) is False
+
+    assert stub.get_order_calls == 2
+    assert stub.status_updates == []
+    assert orders_service_errors.labels("update_order_payment_status", "circuit_open").value == update_errors + 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_get_order_is_hedged():
+    stub = OrdersStub(latencies=[1, 0])
+    client = stub.service_client()
+    client.hedge_get_order = True
+    hedged = orders_service_hedged_requests.labels("get_order").value
+
+    started = time.perf_counter()
+    assert await client.get_order(1) == {"id": 1, "status": "RECEIVED"}
+
+    assert time.perf_counter() - started < 0.5
+    assert stub.get_order_calls == 2
+    assert orders_service_hedged_requests.labels("get_order").value == hedged + 1
+    assert orders_service_requests_in_flight.value == 0
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_fast_get_order_is_not_hedged():
+    stub = OrdersStub()
+    client = stub.service_client()
+    client.hedge_get_order = True
+
+    assert await client.get_order(1) == {"id": 1, "status": "RECEIVED"}
+
+    assert stub.get_order_calls == 1
+    await client.close()
@@ -0,0 +1,72 @@
+import pytest
+from datetime import datetime, timedelta
+
+from app.adapters.repositories.sql_idempotency_repository import SQLIdempotencyRepository
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def repository(sql_session):
+    return SQLIdempotencyRepository(sql_session)
+
+
+def _in(seconds):
+    return datetime.utcnow() + timedelta(seconds=seconds)
+
+
+async def test_claim_then_complete(repository):
+    assert await repository.claim("key-1", "fp", _in(60)) is None
+
+    pending = await repository.claim("key-1", "fp", _in(60))
+    assert pending.fingerprint == "fp"
+    assert not pending.completed
+
+    completed = await repository.complete("key-1", 201, '{"id": 1}', _in(60))
+    assert completed.status_code == 201
+    assert (await repository.claim("key-1", "fp", _in(60))).body == '{"id": 1}'
+
+
+async def test_expired_keys_can_be_claimed_again(repository):
+    await repository.claim("key-1", "old", _in(-1))
+    await repository.complete("key-1", 200, "{}", _in(-1))
+
+    assert await repository.claim("key-1", "new", _in(60)) is None
+    assert (await repository.claim("key-1", "new", _in(60))).fingerprint == "new"
+
+
+async def test_claim_whose_lease_ran_out_is_taken_over(repository):
+    await repository.claim("key-1", "fp", _in(-1))
+
+    assert await repository.claim("key-1", "fp", _in(60)) is None
+    assert not (await repository.claim("key-1", "fp", _in(60))).completed
+
+
+async def test_complete_keeps_the_record_past_the_claim_lease(repository):
+    await repository.claim("key-1", "fp", _in(5))
+    expires_at = _in(3600)
+
+    completed = await repository.complete("key-1", 200, "{}", expires_at)
+
+    assert completed.expires_at == expires_at
+    assert await repository.purge_expired(_in(60)) == 0
+
+
+async def test_release_only_drops_unfinished_claims(repository):
+    await repository.claim("pending", "fp", _in(60))
+    await repository.claim("done", "fp", _in(60))
+    await repository.complete("done", 200, "{}", _in(60))
+
+    await repository.release("pending")
+    await repository.release("done")
+
+    assert await repository.claim("pending", "fp", _in(60)) is None
+    assert (await repository.claim("done", "fp", _in(60))).completed
+
+
+async def test_purge_expired(repository):
+    await repository.claim("expired", "fp", _in(-1))
+    await repository.claim("live", "fp", _in(60))
+
+    assert await repository.purge_expired(datetime.utcnow()) == 1
+    assert await repository.claim("live", "fp", _in(60)) is not None
@@ -0,0 +1,251 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from app.adapters.models.sql.payment_model import PaymentModel
+from app.adapters.repositories.sql_payment_repository import SQLPaymentRepository
+from app.domain.entities.payment import Payment, PaymentDb, PaymentFilter, PaymentStatus
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def repository(sql_session):
+    return SQLPaymentRepository(sql_session)
+
+
+async def _create(repository, order_id, external_id=None):
+    return await repository.create(
+        Payment(
+            order_id=order_id, amount=Decimal("10.00"),
+            status=PaymentStatus.PENDING, external_id=external_id
+        )
+    )
+
+
+async def test_get_by_external_id(repository):
+    await _create(repository, 1, "PAY-1")
+    created = await _create(repository, 2, "PAY-2")
+
+    result = await repository.get_by_external_id("PAY-2")
+
+    assert result.id == created.id
+    assert result.order_id == 2
+
+
+async def test_get_by_external_id_not_found(repository):
+    await _create(repository, 1, "PAY-1")
+
+    assert await repository.get_by_external_id("PAY-missing") is None
+
+
+async def test_read_payments_match_validated_entities(repository):
+    created = await _create(repository, 1, "PAY-1")
+
+    result = await repository.get_by_id(created.id)
+
+    assert result == PaymentDb.model_validate(result.model_dump())
+    assert result.model_dump_json() == created.model_dump_json()
+    assert [payment async for payment in repository.iter_all()] == [result]
+
+
+async def test_from_stored_matches_a_validated_payment():
+    now = datetime.utcnow()
+    fields = dict(
+        id=1, order_id=1, amount=Decimal("10.00"), status=PaymentStatus.PENDING,
+        external_id="PAY-1", created_at=now, updated_at=now,
+    )
+
+    stored = PaymentDb.from_stored(**fields)
+    validated = PaymentDb(**fields)
+
+    assert stored == validated
+    assert stored.model_dump() == validated.model_dump()
+    assert stored.model_dump_json() == validated.model_dump_json()
+    assert stored.model_fields_set == validated.model_fields_set
+    assert stored.model_copy(update={"external_id": None}) == validated.model_copy(update={"external_id": None})
+
+
+async def test_list_updated_since(repository, sql_session):
+    first = await _create(repository, 1)
+    second = await _create(repository, 2)
+    await _create(repository, 3)
+    await sql_session.execute(update(PaymentModel).values(updated_at=datetime(2024, 3, 1)))
+    await sql_session.execute(
+        update(PaymentModel).where(PaymentModel.id == first.id).values(updated_at=datetime(2024, 3, 3))
+    )
+    await sql_session.execute(
+        update(PaymentModel).where(PaymentModel.id == second.id).values(updated_at=datetime(2024, 3, 2))
+    )
+    await sql_session.commit()
+
+    result = await repository.list_updated_since(datetime(2024, 3, 2), 10)
+    assert [payment.id for payment in result] == [second.id, first.id]
+    assert [payment.id for payment in await repository.list_updated_since(datetime(2024, 3, 2), 1)] == [second.id]
+
+
+async def test_get_by_order_ids(repository):
+    first = await _create(repository, 1)
+    await _create(repository, 2)
+    third = await _create(repository, 3)
+
+    result = await repository.get_by_order_ids([1, 3, 99])
+
+    assert sorted(payment.id for payment in result) == [first.id, third.id]
+    assert await repository.get_by_order_ids([]) == []
+
+
+async def test_create_many_returns_payments_in_input_order(repository):
+    payments = [
+        Payment(order_id=order_id, amount=Decimal("10.00"), status=PaymentStatus.PENDING)
+        for order_id in (5, 3, 4)
+    ]
+
+    created = await repository.create_many(payments)
+
+    assert [payment.order_id for payment in created] == [5, 3, 4]
+    assert created[0].id < created[1].id < created[2].id
+    assert [await repository.get_by_id(payment.id) for payment in created] == created
+
+
+async def test_create_many_without_returning_support(repository, sql_engine, monkeypatch):
+    monkeypatch.setattr(sql_engine.sync_engine.dialect, "insert_executemany_returning", False)
+    payments = [
+        Payment(order_id=order_id, amount=Decimal("10.00"), status=PaymentStatus.PENDING)
+        for order_id in (5, 3, 4)
+    ]
+    # A payment created at the same moment outside the batch must not be picked up
+    await _create(repository, 9)
+
+    created = await repository.create_many(payments)
+
+    assert [payment.order_id for payment in created] == [5, 3, 4]
+    assert [await repository.get_by_id(payment.id) for payment in created] == created
+
+
+async def test_daily_totals_group_by_day_and_status(repository, sql_session):
+    days = [datetime(2024, 3, 1, 9), datetime(2024, 3, 1, 23, 59), datetime(2024, 3, 2, 0, 1)]
+    for order_id, created_at in enumerate(days, start=1):
+        payment = await _create(repository, order_id)
+        await sql_session.execute(
+            update(PaymentModel).where(PaymentModel.id == payment.id).values(created_at=created_at)
+        )
+    await sql_session.commit()
+    await repository.update_status(3, PaymentStatus.APPROVED)
+
+    totals = await repository.daily_totals()
+
+    assert [(t.day.isoformat(), t.status, t.count, t.amount) for t in totals] == [
+        ("2024-03-01", PaymentStatus.PENDING, 2, Decimal("20.00")),
+        ("2024-03-02", PaymentStatus.APPROVED, 1, Decimal("10.00")),
+    ]
+    filtered = await repository.daily_totals(PaymentFilter(created_from=datetime(2024, 3, 2)))
+    assert [t.day.isoformat() for t in filtered] == ["2024-03-02"]
+
+
+async def test_external_id_is_unique(repository):
+    await _create(repository, 1, "PAY-1")
+
+    with pytest.raises(IntegrityError):
+        await _create(repository, 2, "PAY-1")
+
+
+async def test_order_has_at_most_one_payment(repository):
+    await _create(repository, 5)
+
+    with pytest.raises(IntegrityError):
+        await _create(repository, 5)
+
+
+async def test_payments_without_external_id_do_not_collide(repository):
+    await _create(repository, 1)
+    await _create(repository, 2)
+
+    assert (await repository.get_by_order_id(2)).external_id is None
+
+
+async def test_list_page_uses_keyset_cursor(repository):
+    created = [await _create(repository, order_id) for order_id in range(1, 6)]
+
+    first = await repository.list_page(2)
+    second = await repository.list_page(2, after_id=first[-1].id)
+
+    assert [p.id for p in first] == [created[0].id, created[1].id]
+    assert [p.id for p in second] == [created[2].id, created[3].id]
+
+
+async def test_list_page_filters(repository):
+    await _create(repository, 1)
+    approved = await _create(repository, 2)
+    await repository.update_status(approved.id, PaymentStatus.APPROVED)
+
+    by_status = await repository.list_page(10, filters=PaymentFilter(status=PaymentStatus.APPROVED))
+    future = await repository.list_page(
+        10, filters=PaymentFilter(created_from=datetime.utcnow() + timedelta(days=1))
+    )
+
+    assert [p.id for p in by_status] == [approved.id]
+    assert future == []
+
+
+async def test_iter_all_streams_in_id_order(repository):
+    created = [await _create(repository, order_id) for order_id in range(1, 6)]
+
+    streamed = [payment async for payment in repository.iter_all(batch_size=2)]
+
+    assert [p.id for p in streamed] == [p.id for p in created]
+
+
+async def test_update_status(repository):
+    created = await _create(repository, 1)
+
+    updated = await repository.update_status(created.id, PaymentStatus.APPROVED)
+
+    assert updated.status == PaymentStatus.APPROVED
+    assert (await repository.get_by_id(created.id)).status == PaymentStatus.APPROVED
+    assert await repository.update_status(999, PaymentStatus.APPROVED) is None
+
+
+async def test_update_status_without_returning_support(repository, sql_engine, monkeypatch):
+    monkeypatch.setattr(sql_engine.sync_engine.dialect, "update_returning", False)
+    created = await _create(repository, 1, "PAY-1")
+
+    updated = await repository.update_status(created.id, PaymentStatus.APPROVED)
+    bulk = await repository.update_statuses_by_external_id({"PAY-1": PaymentStatus.DENIED})
+
+    assert updated.status == PaymentStatus.APPROVED
+    assert [p.status for p in bulk] == [PaymentStatus.DENIED]
+    assert await repository.update_status(999, PaymentStatus.APPROVED) is None
+
+
+async def test_update_external_id(repository):
+    created = await _create(repository, 1)
+
+    updated = await repository.update_external_id(created.id, "PAY-new")
+
+    assert updated.external_id == "PAY-new"
+    assert await repository.update_external_id(999, "PAY-other") is None
+
+
+async def test_update_statuses_by_external_id(repository):
+    first = await _create(repository, 1, "PAY-1")
+    second = await _create(repository, 2, "PAY-2")
+    await _create(repository, 3, "PAY-3")
+
+    updated = await repository.update_statuses_by_external_id(
+        {"PAY-1": PaymentStatus.APPROVED, "PAY-2": PaymentStatus.DENIED, "PAY-missing": PaymentStatus.APPROVED}
+    )
+
+    assert {p.id: p.status for p in updated} == {
+        first.id: PaymentStatus.APPROVED, second.id: PaymentStatus.DENIED
+    }
+    assert (await repository.get_by_id(first.id)).status == PaymentStatus.APPROVED
+    assert (await repository.get_by_id(second.id)).status == PaymentStatus.DENIED
+    assert (await repository.get_by_external_id("PAY-3")).status == PaymentStatus.PENDING
+
+
+async def test_update_statuses_by_external_id_without_matches(repository):
+    assert await repository.update_statuses_by_external_id({"PAY-missing": PaymentStatus.APPROVED}) == []
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.adapters.models.sql.schema import create_schema
+
+
+@pytest.mark.asyncio
+async def test_create_schema_adds_indexes_missing_from_existing_tables(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'payments.db'}")
+    try:
+        # A payments table deployed before the external_id index existed
+        async with engine.begin() as connection:
+            await connection.execute(text(
+                "CREATE TABLE payments (id INTEGER PRIMARY KEY, order_id INTEGER NOT NULL, "
+                "amount NUMERIC(10, 2) NOT NULL, status VARCHAR NOT NULL, external_id VARCHAR, "
+                "created_at DATETIME, updated_at DATETIME)"
+            ))
+
+        await create_schema(engine)
+        await create_schema(engine)
+
+        async with engine.connect() as connection:
+            indexes = await connection.run_sync(lambda sync: inspect(sync).get_indexes("payments"))
+        external_id_index = next(index for index in indexes if index["name"] == "ix_payments_external_id")
+        assert external_id_index["unique"]
+    finally:
+        await engine.dispose()
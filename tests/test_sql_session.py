@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from app.adapters.models.sql.pool import InstrumentedQueuePool, pool_stats
+from app.adapters.models.sql.session import async_database_url, build_engine
+from app.config import settings
+
+
+def test_async_database_url_maps_plain_dialects():
+    assert async_database_url("sqlite:///./payments.db") == "sqlite+aiosqlite:///./payments.db"
+    assert async_database_url("postgresql://u:p@db/payments") == "postgresql+asyncpg://u:p@db/payments"
+    assert async_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+
+@pytest.mark.asyncio
+async def test_file_sqlite_engine_uses_wal_and_instrumented_pool(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'payments.db'}")
+    try:
+        async with engine.connect() as connection:
+            journal_mode = (await connection.execute(text("PRAGMA journal_mode"))).scalar()
+            synchronous = (await connection.execute(text("PRAGMA synchronous"))).scalar()
+            busy_timeout = (await connection.execute(text("PRAGMA busy_timeout"))).scalar()
+
+        assert isinstance(engine.pool, InstrumentedQueuePool)
+        assert journal_mode == "wal"
+        assert synchronous == 1
+        assert busy_timeout == settings.SQLITE_BUSY_TIMEOUT_MS
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_report_checkouts(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'payments.db'}")
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await asyncio.gather(first.execute(text("SELECT 1")), second.execute(text("SELECT 1")))
+            busy = pool_stats(engine)
+
+        idle = pool_stats(engine)
+
+        assert busy["checked_out"] == 2
+        assert idle["checked_out"] == 0
+        assert idle["checkouts"] == 2
+        assert idle["max_wait_ms"] >= 0
+    finally:
+        await engine.dispose()
@@ -0,0 +1,24 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_importing_main_has_no_side_effects(tmp_path):
+    database = tmp_path / "payments.db"
+    env = {**os.environ, "SQL_DATABASE_URL": f"sqlite:///{database}"}
+    script = (
+        "import json, sys, threading, main; "
+        "print(json.dumps({'mongo': 'motor' in sys.modules, 'threads': threading.active_count()}))"
+    )
+
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert not database.exists()
+    assert result == {"mongo": False, "threads": 1}
@@ -0,0 +1,56 @@
+from app.adapters.cache.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(max_size=2, ttl=10, clock=self.clock)
+
+    def test_get_hit_and_miss(self):
+        self.cache.set("a", 1)
+
+        assert self.cache.get("a") == 1
+        assert self.cache.get("b", "default") == "default"
+        assert self.cache.hits == 1
+        assert self.cache.misses == 1
+
+    def test_entries_expire(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2, ttl=1)
+        self.clock.now = 5
+
+        assert self.cache.get("a") == 1
+        assert self.cache.get("b") is None
+        assert self.cache.expirations == 1
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        assert self.cache.get("b") is None
+        assert self.cache.get("a") == 1
+        assert self.cache.get("c") == 3
+        assert self.cache.evictions == 1
+
+    def test_cached_none_is_distinguishable_from_miss(self):
+        missing = object()
+        self.cache.set("a", None)
+
+        assert self.cache.get("a", missing) is None
+        assert self.cache.get("b", missing) is missing
+
+    def test_zero_size_disables_cache(self):
+        cache = TTLCache(max_size=0, ttl=10)
+        cache.set("a", 1)
+
+        assert len(cache) == 0